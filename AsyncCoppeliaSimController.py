@@ -0,0 +1,179 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncCoppeliaSimController:
+    """
+    Versión asyncio de CoppeliaSimController.
+
+    Un socket REQ de ZeroMQ solo admite una petición en vuelo, así que cada
+    operación se ejecuta en un hilo de un ejecutor propio y usa la conexión de ese
+    hilo en el ClientPool del controlador síncrono; con varios hilos, las llamadas
+    independientes (detectar muchos objetos, crear muchos cubos, consultar varios
+    robots) avanzan a la vez sobre un único bucle de eventos. Al pasar por el
+    controlador síncrono se comparten también sus funciones Lua del sandbox, las
+    capacidades sondeadas, los registros de cubos y los tiempos límite de call().
+
+    Cualquier método del controlador que no esté redefinido aquí se puede esperar
+    igual, p. ej. 'await async_controller.start_simulation()'.
+    """
+
+    def __init__(self, controller, concurrency=4):
+        """
+        Args:
+            controller: CoppeliaSimController cuyo pool, registros y tiempos límite se usan
+            concurrency: Número de hilos (y de conexiones del pool) usados a la vez; debe
+                         dejar sitio en el pool a la interfaz, al worker y a la navegación
+        """
+        self.controller = controller
+        self.concurrency = max(1, min(concurrency, controller.pool_size))
+        self.executor = None
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                               thread_name_prefix="sim-async")
+        return self.executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Ejecuta una función bloqueante del controlador en un hilo del ejecutor.
+
+        Args:
+            func: Función a ejecutar (p. ej. un método de CoppeliaSimController)
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            El resultado de la función
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), functools.partial(func, *args, **kwargs))
+
+    async def call(self, name, *args, timeout=None):
+        """
+        Llama a una función de 'sim' con el tiempo límite de CoppeliaSimController.call().
+
+        Raises:
+            SimTimeoutError: Si no hay respuesta a tiempo
+        """
+        return await self.run(self.controller.call, name, *args, timeout=timeout)
+
+    async def call_helper(self, name, *args):
+        """Llama a una función auxiliar Lua del sandbox, instalándola si hace falta"""
+        return await self.run(self.controller.call_helper, name, *args)
+
+    async def gather(self, calls, timeout=None):
+        """
+        Ejecuta en paralelo una lista de llamadas independientes.
+
+        Args:
+            calls: Lista de tuplas (nombre, arg1, arg2, ...)
+            timeout: Tiempo límite de cada llamada (None = el de call())
+
+        Returns:
+            list: Resultados en el mismo orden (las excepciones se devuelven como valor)
+        """
+        return await asyncio.gather(*(self.call(name, *args, timeout=timeout) for name, *args in calls),
+                                    return_exceptions=True)
+
+    async def detect_objects(self):
+        """
+        Carga o actualiza el índice de la escena del controlador (una consulta masiva
+        con iaSceneInfo/iaScenePoses, o por objetos si el sandbox no está disponible).
+
+        Returns:
+            list: Diccionarios de SceneIndex.objects() con alias, tipo, posición y tamaño
+        """
+        scene_index = self.controller.scene_index
+        if scene_index.loaded:
+            await self.run(scene_index.refresh)
+        else:
+            await self.run(scene_index.load)
+        objects = list(scene_index.objects())
+        print(f"Se detectaron {len(objects)} objetos")
+        return objects
+
+    async def create_obstacles(self, specs, mode='auto'):
+        """
+        Crea un lote de cubos con CoppeliaSimController.create_obstacles(): ya es una
+        sola petición (iaCreateCuboids o plantillas), así que no se reparte entre
+        hilos; solo deja de bloquear el bucle de eventos mientras se espera.
+
+        Returns:
+            list: Handle de cada cubo en el mismo orden que specs (None si falló)
+        """
+        return await self.run(self.controller.create_obstacles, specs, mode=mode)
+
+    async def poll_robots(self, robot_handles):
+        """
+        Lee en paralelo la posición y orientación de varios robots.
+
+        Returns:
+            dict: handle -> (posición, orientación) de los robots que respondieron
+        """
+        calls = []
+        for handle in robot_handles:
+            calls.append(('getObjectPosition', handle, -1))
+            calls.append(('getObjectOrientation', handle, -1))
+        results = await self.gather(calls)
+        poses = {}
+        for i, handle in enumerate(robot_handles):
+            position, orientation = results[2 * i], results[2 * i + 1]
+            if not isinstance(position, Exception) and not isinstance(orientation, Exception):
+                poses[handle] = (position, orientation)
+        return poses
+
+    def close(self):
+        """Termina los hilos del ejecutor (sus conexiones las cierra el pool al desconectar)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def __getattr__(self, name):
+        attr = getattr(self.controller, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        method.__name__ = name
+        method.__doc__ = attr.__doc__
+        return method
+
+
+def event_loop_running():
+    """True si hay un bucle asyncio en marcha en este hilo (p. ej. el de qasync en la interfaz)"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def run_in_qt(coroutine, callback=None):
+    """
+    Programa una corrutina en el bucle de eventos actual (el de qasync cuando la
+    aplicación Qt se ejecuta con él) y llama a callback con el resultado.
+
+    Args:
+        coroutine: Corrutina a ejecutar
+        callback: Función que recibe el resultado (opcional)
+
+    Returns:
+        asyncio.Future: La tarea programada
+    """
+    task = asyncio.ensure_future(coroutine)
+
+    def done(future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"❌ Error en operación asíncrona: {e}")
+            return
+        if callback is not None:
+            callback(result)
+
+    task.add_done_callback(done)
+    return task
@@ -0,0 +1,129 @@
+from SimPipeline import PendingResult
+
+
+class BulkEditSession:
+    """
+    Sesión de edición masiva de la escena (ver CoppeliaSimController.bulk_edit).
+
+    Desactiva el renderizado de CoppeliaSim mientras dura, encola las creaciones,
+    eliminaciones y cambios de pose y al salir los envía agrupados: una petición
+    para todas las creaciones, otra para todas las poses y otra para todas las
+    eliminaciones. Al terminar restaura el estado anterior de la visualización.
+
+    En una sesión anidada los PendingResult no tienen valor al salir del bloque
+    interior, sino al salir del más externo: el código que necesite los resultados
+    debe leerlos en una función registrada con on_commit().
+    """
+
+    def __init__(self, controller):
+        """
+        Args:
+            controller: CoppeliaSimController sobre el que se edita la escena
+        """
+        self.controller = controller
+        self.depth = 0  # Sesiones anidadas: solo la más externa envía los cambios
+        self.display_was_enabled = None
+        self.creates = []  # (especificación, PendingResult)
+        self.poses = []  # (handle, posición, PendingResult)
+        self.removes = []  # handles
+        self.callbacks = []  # Funciones a llamar tras enviar los cambios
+
+    def create(self, spec):
+        """
+        Encola la creación de un cubo (misma especificación que create_obstacles).
+
+        Returns:
+            PendingResult: Su valor es el handle creado, disponible al salir del bloque
+        """
+        pending = PendingResult('create')
+        self.creates.append((spec, pending))
+        return pending
+
+    def set_position(self, handle, position):
+        """
+        Encola un cambio de posición.
+
+        Returns:
+            PendingResult: Indica si la posición se aplicó al salir del bloque
+        """
+        pending = PendingResult('setObjectPosition')
+        self.poses.append((handle, list(position), pending))
+        return pending
+
+    def remove(self, handle):
+        """Encola la eliminación de un objeto"""
+        self.removes.append(handle)
+
+    def on_commit(self, callback):
+        """
+        Registra una función sin argumentos que se llama cuando la sesión más externa
+        ha enviado los cambios (los PendingResult ya tienen su valor). Las funciones
+        se llaman en el orden en que se registraron; si el envío falla, no se llaman.
+        """
+        self.callbacks.append(callback)
+
+    def _set_display(self, enabled):
+        if not self.controller.capabilities.get('setBoolParam'):
+            return
+        sim = self.controller.sim
+        try:
+            if enabled is None:
+                self.display_was_enabled = sim.getBoolParam(sim.boolparam_display_enabled)
+                sim.setBoolParam(sim.boolparam_display_enabled, False)
+            else:
+                sim.setBoolParam(sim.boolparam_display_enabled, enabled)
+        except Exception as e:
+            print(f"⚠️ No se pudo cambiar la visualización de CoppeliaSim: {e}")
+
+    def commit(self):
+        """Envía agrupados todos los cambios encolados"""
+        creates, self.creates = self.creates, []
+        poses, self.poses = self.poses, []
+        removes, self.removes = self.removes, []
+        controller = self.controller
+
+        if creates:
+            handles = controller.create_obstacles([spec for spec, _ in creates])
+            for (_, pending), handle in zip(creates, handles):
+                if handle is None:
+                    pending.set(error="no se pudo crear el cubo")
+                else:
+                    pending.set(handle)
+
+        if poses:
+            with controller.pipeline() as batch:
+                results = [batch.setObjectPosition(handle, -1, position) for handle, position, _ in poses]
+            for (handle, position, pending), result in zip(poses, results):
+                pending.set(result.ok, result.error)
+                if result.ok:
+                    controller.update_descriptor(handle, position)
+
+        if removes:
+            controller.eliminar_cubos_por_handles(removes)
+
+        if creates or poses or removes:
+            print(f"📦 Edición masiva aplicada: {len(creates)} creados, {len(poses)} movidos, "
+                  f"{len(removes)} eliminados")
+
+    def __enter__(self):
+        if self.depth == 0:
+            self._set_display(None)
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth > 0:
+            return False
+        try:
+            if exc_type is None:
+                self.commit()
+                callbacks, self.callbacks = self.callbacks, []
+                for callback in callbacks:
+                    callback()
+        finally:
+            self.creates, self.poses, self.removes, self.callbacks = [], [], [], []
+            if self.display_was_enabled is not None:
+                self._set_display(bool(self.display_was_enabled))
+            self.controller.bulk_session = None
+        return False
@@ -0,0 +1,156 @@
+import threading
+import time
+
+
+class ClientPool:
+    """
+    Pool de clientes de la API remota con un cliente conectado por hilo.
+
+    Los sockets REQ de ZeroMQ no son seguros entre hilos: si la interfaz, el worker,
+    los hilos de navegación y el monitor de señales comparten un cliente, sus
+    peticiones se serializan o se corrompen. Cada hilo recibe aquí su propia
+    conexión, de modo que el bucle de navegación nunca espera detrás de una
+    consulta de la escena lanzada desde la interfaz.
+    """
+
+    def __init__(self, factory, max_size=8, health_interval=5.0, probe_timeout=1.0):
+        """
+        Args:
+            factory: Función sin argumentos que crea un RemoteAPIClient conectado
+            max_size: Número máximo de clientes abiertos a la vez
+            health_interval: Segundos entre comprobaciones de salud de un cliente
+            probe_timeout: Tiempo límite (s) de la comprobación de salud, para que un
+                           simulador congelado no bloquee al hilo que pide el cliente
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._entries = {}  # ident del hilo -> {'thread', 'client', 'sim', 'checked', 'generation'}
+        self._generation = 0  # Se incrementa al invalidar; los clientes anteriores caducan
+        self._lock = threading.Lock()
+
+    def sim(self, timeout=None):
+        """
+        Devuelve el objeto 'sim' del hilo actual, creando su cliente si hace falta.
+
+        Args:
+            timeout: Tiempo límite (s) de la comprobación de salud y de la creación
+                     del cliente (None = probe_timeout para la comprobación y sin
+                     límite para la creación)
+
+        Returns:
+            El objeto 'sim' de la API remota para este hilo
+        """
+        ident = threading.get_ident()
+        entry = self._entries.get(ident)
+        if entry is not None and entry['generation'] != self._generation:
+            # Invalidado (p. ej. tras una reconexión): este hilo cierra su propio cliente
+            self.discard()
+            entry = None
+        if entry is not None:
+            start = time.monotonic()
+            if start - entry['checked'] < self.health_interval:
+                return entry['sim']
+            if self._is_healthy(entry, self.probe_timeout if timeout is None else timeout):
+                entry['checked'] = time.monotonic()
+                return entry['sim']
+            print(f"⚠️ Cliente del hilo {threading.current_thread().name} sin respuesta, reconectando")
+            self.discard()
+            if timeout is not None:
+                timeout = max(0.001, timeout - (time.monotonic() - start))
+        return self._create(ident, timeout)
+
+    def client(self, timeout=None):
+        """Devuelve el RemoteAPIClient del hilo actual (sin volver a comprobar su salud)"""
+        ident = threading.get_ident()
+        if ident not in self._entries:
+            self.sim(timeout)
+        return self._entries[ident]['client']
+
+    def _create(self, ident, timeout=None):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._evict_dead()
+            if len(self._entries) >= self.max_size:
+                raise RuntimeError(f"El pool de clientes está lleno ({self.max_size} conexiones)")
+
+        client = self.factory()
+        try:
+            self._set_timeout(client, timeout)
+            sim = client.getObject('sim')
+            self._set_timeout(client, None)
+        except Exception:
+            self._close(client)
+            raise
+        with self._lock:
+            self._entries[ident] = {
+                'thread': threading.current_thread(),
+                'client': client,
+                'sim': sim,
+                'checked': time.monotonic(),
+                'generation': self._generation,
+            }
+        return sim
+
+    def _is_healthy(self, entry, timeout):
+        try:
+            self._set_timeout(entry['client'], timeout)
+            entry['sim'].getSimulationState()
+            self._set_timeout(entry['client'], None)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _set_timeout(client, timeout):
+        """Fija el tiempo límite de recepción del socket del cliente (None = sin límite)"""
+        import zmq
+
+        socket = getattr(client, 'socket', None)
+        if socket is not None:
+            socket.setsockopt(zmq.RCVTIMEO, -1 if timeout is None else max(1, int(timeout * 1000)))
+
+    def _evict_dead(self):
+        """Cierra los clientes de hilos que ya terminaron (llamar con el lock tomado)"""
+        for ident, entry in list(self._entries.items()):
+            if not entry['thread'].is_alive():
+                del self._entries[ident]
+                self._close(entry['client'])
+
+    def discard(self):
+        """Cierra el cliente del hilo actual; la próxima llamada abrirá uno nuevo"""
+        with self._lock:
+            entry = self._entries.pop(threading.get_ident(), None)
+        if entry is not None:
+            self._close(entry['client'])
+
+    def invalidate_all(self):
+        """
+        Marca como caducados los clientes de todos los hilos; cada hilo cierra el suyo
+        y abre uno nuevo en su próximo acceso.
+
+        Es la forma segura de renovar las conexiones desde otro hilo (p. ej. el del
+        latido): un socket REQ no admite que otro hilo lo cierre a mitad de una petición.
+        """
+        with self._lock:
+            self._generation += 1
+
+    def close_all(self):
+        """Cierra todos los clientes del pool (solo si ningún otro hilo los está usando)"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries = {}
+        for entry in entries:
+            self._close(entry['client'])
+
+    def _close(self, client):
+        try:
+            socket = getattr(client, 'socket', None)
+            if socket is not None:
+                socket.close(linger=0)
+        except Exception as e:
+            print(f"Error al cerrar cliente: {e}")
+
+    def __len__(self):
+        return len(self._entries)
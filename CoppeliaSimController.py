@@ -1,28 +1,207 @@
 from coppeliasim_zmqremoteapi_client import RemoteAPIClient
 import math
+import threading
 from heapq import heappush, heappop
 from PyQt5.QtWidgets import (QMessageBox, QApplication)
 from constants import GRID_SIZE, EMPTY, OBSTACLE, CELL_SIZE, START, END
+from PurePursuit import PurePursuitFollower
+from RobotHandles import RobotHandles
+from Telemetry import TelemetryBuffer, ThrottledLog, LOG_INFO
+from TrajectoryRecorder import TrajectoryRecorder
+from ObstacleAvoidance import BraitenbergAvoidance
+from SimHelpers import LUA_HELPERS, helper_source
+from SceneIndex import SceneIndex
+from ClientPool import ClientPool
+from SimProfiler import SimProfiler, ProfiledSim, profiled_operation
+from SimPipeline import SimPipeline
+from BulkEdit import BulkEditSession
+from GridTransform import GridTransform
+
+
+class SimTimeoutError(TimeoutError):
+    """El simulador no respondió a una llamada dentro del tiempo límite"""
+    
+    def __init__(self, name, timeout):
+        super().__init__(f"CoppeliaSim no respondió a '{name}' en {timeout:.1f}s")
+        self.name = name
+        self.timeout = timeout
+
 
 class CoppeliaSimController:
-    def __init__(self, host="localhost", port=23000):
+    def __init__(self, host="localhost", port=23000, client_factory=None, pool_size=8):
         self.host = host
         self.port = port
-        self.client = None
-        self.sim = None
+        # Crea un RemoteAPIClient conectado; cada hilo obtiene el suyo a través del pool
+        self.client_factory = client_factory or (lambda: RemoteAPIClient(host=self.host, port=self.port))
+        self.pool_size = pool_size
+        self.pool = None
         self.connected = False
-        self.created_cubes = []  # Lista para rastrear los handles de cubos creados
+        self.created_cubes = set()  # Handles de los cubos creados
+        self.object_descriptors = {}  # handle -> tamaño, posición, color y celda de cada cubo creado
+        self.handle_remap = {}  # handle antiguo -> nuevo de los cubos recreados en el último inicio
+        self.robot_handles_cache = {}  # Descriptores RobotHandles ya resueltos
+        self.nav_target_handle = None  # Dummy visual del último recorrido
+        self.telemetry = TelemetryBuffer()  # Telemetría de los ciclos de control
+        self.log = ThrottledLog(level=LOG_INFO, interval=1.0)  # Registro por consola limitado
+        self.recorder = None  # TrajectoryRecorder activo, si se está grabando
+        self.avoidance = BraitenbergAvoidance()  # Evasión reactiva con los sensores ultrasónicos
+        self.avoidance_enabled = True
+        self.installed_helpers = set()  # Funciones Lua ya instaladas en el sandbox
+        self.scene_index = SceneIndex(self)  # Alias, tipo, pose y caja de cada objeto
+        self.capabilities = {}  # Funciones de la API disponibles, sondeadas al conectar
+        self.cube_templates = {}  # (tamaño, color) -> handle del cubo plantilla fuera del mapa
+        self.bulk_session = None  # BulkEditSession en curso, si hay una edición masiva abierta
+        self.transform = GridTransform(GRID_SIZE)  # Conversión celda <-> mundo (la escala la fija la interfaz)
+        self.connection_listeners = []  # Funciones (estado, mensaje) avisadas por el latido
+        self.heartbeat_thread = None
+        self.heartbeat_stop = None
+        self.heartbeat_client = None  # Conexión propia del latido, con tiempo límite
+        self.pending_commands = {}  # Último comando reenviable por acción, pendiente de reconexión
+        self.calls_in_flight = {}  # Llamadas de call() en curso -> instante límite (time.monotonic)
+        self.calls_lock = threading.Lock()
+        self.default_timeout = 2.0  # Tiempo límite (s) de las llamadas hechas con call()
+        # Operaciones lentas por naturaleza, con su propio tiempo límite
+        self.operation_timeouts = {
+            "loadScene": 30.0, "saveScene": 30.0, "loadModel": 15.0, "saveModel": 15.0,
+            "executeScriptString": 5.0, "callScriptFunction": 10.0, "removeObjects": 10.0,
+        }
+        self.profiler = None  # SimProfiler activo, si se están midiendo las llamadas
+        self._profiled_sims = {}  # id del objeto 'sim' -> ProfiledSim
+    
+    @property
+    def sim(self):
+        """Objeto 'sim' de la conexión propia del hilo que llama (None sin conexión)"""
+        return self._thread_sim()
+    
+    def _thread_sim(self, timeout=None):
+        """Objeto 'sim' del hilo; 'timeout' limita la comprobación de salud del pool"""
+        if self.pool is None:
+            return None
+        sim = self.pool.sim(timeout)
+        if self.profiler is None:
+            return sim
+        proxy = self._profiled_sims.get(id(sim))
+        if proxy is None or proxy._sim is not sim:
+            proxy = self._profiled_sims[id(sim)] = ProfiledSim(sim, self.profiler)
+        return proxy
+    
+    @sim.setter
+    def sim(self, value):
+        if value is None and self.pool is not None:
+            self.pool.close_all()
+            self.pool = None
+    
+    @property
+    def client(self):
+        """RemoteAPIClient del hilo que llama (None sin conexión)"""
+        if self.pool is None:
+            return None
+        return self.pool.client()
+    
+    def enable_profiling(self, profiler=None):
+        """
+        Empieza a medir todas las llamadas remotas del controlador.
+        
+        Args:
+            profiler: SimProfiler a usar (None = uno nuevo)
+        
+        Returns:
+            SimProfiler: El perfilador activo; ver snapshot() y to_csv()
+        """
+        self.profiler = profiler or SimProfiler()
+        self._profiled_sims = {}
+        return self.profiler
+    
+    def disable_profiling(self):
+        """Deja de medir las llamadas remotas y devuelve el perfilador usado"""
+        profiler, self.profiler = self.profiler, None
+        self._profiled_sims = {}
+        return profiler
+    
+    def operation(self, name):
+        """
+        Contexto que atribuye a la operación 'name' las llamadas remotas hechas
+        dentro del bloque por este hilo (sin efecto si el perfilado está desactivado).
+        """
+        from contextlib import nullcontext
+        
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.operation(name)
+    
+    def call(self, name, *args, timeout=None):
+        """
+        Llama a una función de 'sim' con tiempo límite, para que un simulador ocupado
+        o congelado retrase solo esta operación en lugar de bloquear la interfaz.
+        
+        Args:
+            name: Nombre de la función (p. ej. 'getObjectPosition')
+            *args: Argumentos de la función
+            timeout: Segundos máximos de espera; por defecto el de operation_timeouts
+                     para esa función o default_timeout
+        
+        Returns:
+            El resultado de la llamada remota
+        
+        Raises:
+            SimTimeoutError: Si no hay respuesta a tiempo
+        """
+        import time
+        import zmq
+        
+        if timeout is None:
+            timeout = self.operation_timeouts.get(name, self.default_timeout)
+        
+        # El tiempo límite cubre también la obtención del cliente del hilo (comprobación
+        # de salud o creación de una conexión nueva), no solo la llamada
+        deadline = time.monotonic() + timeout
+        if self.pool is None or not self.connected:
+            raise ConnectionError("No hay conexión activa con CoppeliaSim")
+        socket = None
+        token = object()
+        with self.calls_lock:
+            self.calls_in_flight[token] = deadline  # El latido espera a que termine
+        try:
+            sim = self._thread_sim(timeout)
+            socket = getattr(self.client, 'socket', None)
+            if socket is not None:
+                remaining = max(0.001, deadline - time.monotonic())
+                socket.setsockopt(zmq.RCVTIMEO, int(remaining * 1000) or 1)
+            return getattr(sim, name)(*args)
+        except (zmq.Again, TimeoutError):
+            # El socket REQ queda a la espera de una respuesta que ya no se leerá:
+            # descartar el cliente de este hilo para que la próxima llamada abra otro
+            socket = None
+            self.pool.discard()
+            raise SimTimeoutError(name, timeout)
+        finally:
+            with self.calls_lock:
+                self.calls_in_flight.pop(token, None)
+            if socket is not None:
+                socket.setsockopt(zmq.RCVTIMEO, -1)
     
     def connect(self):
         """Establece conexión con CoppeliaSim usando ZeroMQ"""
         try:
-            # Usar el cliente de API remota ZeroMQ
-            self.client = RemoteAPIClient(host=self.host, port=self.port)
-            self.sim = self.client.getObject('sim')
+            # Usar el cliente de API remota ZeroMQ, con una conexión por hilo. Si ya había
+            # un pool (reconexión, quizá desde el hilo del latido), no se cierran aquí los
+            # sockets que otros hilos pueden estar usando: se invalidan y cada hilo
+            # reabre el suyo en su próximo acceso
+            if self.pool is None:
+                self.pool = ClientPool(self.client_factory, max_size=self.pool_size)
+            else:
+                self.pool.invalidate_all()
             
             # Verificar que podemos acceder a CoppeliaSim obteniendo el estado de simulación
             state = self.sim.getSimulationState()
             self.connected = True
+            self.invalidate_robot_handles()
+            self.installed_helpers = set()
+            self.scene_index.clear()
+            self.probe_capabilities()
+            # Las plantillas de una conexión anterior siguen en la escena: se eliminan
+            # y se vuelven a crear cuando hagan falta
+            self._remove_templates()
             print(f"✅ Conectado a CoppeliaSim usando ZeroMQ. Estado de simulación: {state}")
             
             # Opcional: Verificar tiempo de simulación como prueba adicional
@@ -36,16 +215,85 @@ class CoppeliaSimController:
         except Exception as e:
             print(f"❌ Error de conexión ZeroMQ: {e}")
             self.connected = False
+            if self.pool is not None:
+                self.pool.invalidate_all()
             return False
     
+    # Funciones cuya presencia se sondea una sola vez al conectar
+    PROBED_FUNCTIONS = [
+        "createPrimitiveShape", "createPureShape", "setObjectAlias", "setObjectName",
+        "pauseSimulation", "setSimulationState", "isHandle", "removeObjects",
+        "copyPasteObjects", "executeScriptString", "callScriptFunction",
+        "saveScene", "loadScene", "saveModel", "loadModel", "getBoolParam", "setBoolParam",
+    ]
+    
+    def probe_capabilities(self):
+        """
+        Sondea una sola vez la API del CoppeliaSim conectado y guarda la tabla de
+        capacidades, para despachar directamente en lugar de encadenar intentos
+        fallidos (cada uno con su viaje de ida y vuelta y su excepción).
+        
+        El cliente ZeroMQ crea un atributo por cada función de 'sim' al conectar,
+        así que comprobar su existencia no requiere peticiones adicionales.
+        
+        Returns:
+            dict: Tabla de capacidades
+        """
+        capabilities = {name: hasattr(self.sim, name) for name in self.PROBED_FUNCTIONS}
+        
+        # Elegir una implementación por operación
+        capabilities['create_shape'] = ('primitive' if capabilities['createPrimitiveShape']
+                                        else 'pure' if capabilities['createPureShape'] else None)
+        capabilities['set_alias'] = ('setObjectAlias' if capabilities['setObjectAlias']
+                                     else 'setObjectName' if capabilities['setObjectName'] else None)
+        capabilities['pause'] = ('pauseSimulation' if capabilities['pauseSimulation']
+                                 else 'setSimulationState' if capabilities['setSimulationState']
+                                 else 'stopSimulation')
+        
+        # Ruta de modelos que funcionó; se completa con la primera carga correcta
+        capabilities['model_path'] = self.capabilities.get('model_path')
+        
+        self.capabilities = capabilities
+        print(f"Capacidades de la API: forma={capabilities['create_shape']}, "
+              f"alias={capabilities['set_alias']}, pausa={capabilities['pause']}")
+        return capabilities
+    
+    def create_shape(self, kind, size):
+        """
+        Crea una forma primitiva usando la función disponible en esta versión de CoppeliaSim.
+        
+        Args:
+            kind: 'cuboid' o 'cylinder'
+            size: Lista [x, y, z] con las dimensiones
+        
+        Returns:
+            int: Handle de la forma creada
+        """
+        if self.capabilities.get('create_shape') == 'primitive':
+            handle = self.sim.createPrimitiveShape(getattr(self.sim, f"primitiveshape_{kind}"), size, 0)
+            # Equivalente a la opción 16 (estática) de createPureShape
+            self.sim.setObjectInt32Param(handle, self.sim.shapeintparam_static, 1)
+            return handle
+        # createPureShape: 0 = cuboide, 2 = cilindro; 18 = estático + respondable
+        pure_types = {'cuboid': 0, 'cylinder': 2}
+        return self.sim.createPureShape(pure_types[kind], 18, size, 1.0)
+    
+    def set_alias(self, handle, alias):
+        """Asigna el alias con la función disponible en esta versión de CoppeliaSim"""
+        method = self.capabilities.get('set_alias') or 'setObjectAlias'
+        getattr(self.sim, method)(handle, alias)
+    
     def disconnect(self):
         """Cierra la conexión con CoppeliaSim"""
+        self.stop_heartbeat()
+        self.pending_commands = {}
         if self.connected:
             try:
                 # ZeroMQ no requiere cerrar la conexión explícitamente
-                self.sim = None
-                self.client = None
+                self.stop_recording()
+                self.sim = None  # Cierra todas las conexiones del pool
                 self.connected = False
+                self.invalidate_robot_handles()
                 print("Desconectado de CoppeliaSim")
                 return True
             except Exception as e:
@@ -53,6 +301,146 @@ class CoppeliaSimController:
                 return False
         return False
     
+    # Acciones que pueden reenviarse tras una reconexión sin efectos duplicados:
+    # solo fijan un estado, así que basta con enviar la última de cada tipo
+    REPLAYABLE_ACTIONS = ("updateObjects", "moveRobot")
+    
+    def start_heartbeat(self, interval=2.0, deadline=1.0, max_backoff=30.0):
+        """
+        Inicia un hilo que comprueba periódicamente la conexión y, si se pierde,
+        reconecta con espera exponencial, vuelve a resolver los handles guardados y
+        reenvía los comandos pendientes.
+        
+        Args:
+            interval: Segundos entre latidos
+            deadline: Segundos máximos de espera de la respuesta a un latido
+            max_backoff: Espera máxima (s) entre intentos de reconexión
+        """
+        import threading
+        
+        self.heartbeat_interval = interval
+        self.heartbeat_deadline = deadline
+        self.heartbeat_max_backoff = max_backoff
+        if self.heartbeat_thread is not None and self.heartbeat_thread.is_alive():
+            return
+        
+        self.heartbeat_stop = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self._heartbeat_loop, args=(self.heartbeat_stop,),
+                                                 name="heartbeat", daemon=True)
+        self.heartbeat_thread.start()
+        print(f"💓 Latido iniciado (cada {interval}s, límite {deadline}s)")
+    
+    def stop_heartbeat(self):
+        """Detiene el hilo de latido, si está activo"""
+        if self.heartbeat_stop is not None:
+            self.heartbeat_stop.set()
+        self.heartbeat_thread = None
+        self.heartbeat_stop = None
+    
+    def _notify_connection(self, state, message):
+        print(f"💓 {message}")
+        for listener in list(self.connection_listeners):
+            try:
+                listener(state, message)
+            except Exception as e:
+                print(f"Error en listener de conexión: {e}")
+    
+    def _heartbeat_loop(self, stop):
+        while not stop.wait(self.heartbeat_interval):
+            if self.connected and self._ping():
+                continue
+            
+            if self.connected:
+                self.connected = False
+                self._notify_connection('lost', "Conexión con CoppeliaSim perdida")
+            self._reconnect(stop)
+        self._close_heartbeat_client()
+    
+    def _heartbeat_timeout(self):
+        """
+        Tiempo límite (s) del próximo latido. El servidor atiende las peticiones de una
+        en una, así que si otro hilo espera una llamada lenta (p. ej. loadScene) el
+        latido queda en cola detrás de ella: el límite se amplía hasta el plazo de la
+        llamada en curso que más tarde vence.
+        """
+        import time
+        
+        with self.calls_lock:
+            latest = max(self.calls_in_flight.values(), default=0.0)
+        return self.heartbeat_deadline + max(0.0, latest - time.monotonic())
+    
+    def _ping(self):
+        """Latido con tiempo límite sobre una conexión propia; False si no hay respuesta"""
+        import zmq
+        
+        try:
+            if self.heartbeat_client is None:
+                client = self.client_factory()
+                client.socket.setsockopt(zmq.LINGER, 0)
+                self.heartbeat_client = (client, None)  # Para poder cerrarlo si getObject falla
+            client, sim = self.heartbeat_client
+            client.socket.setsockopt(zmq.RCVTIMEO, int(self._heartbeat_timeout() * 1000))
+            if sim is None:
+                sim = client.getObject('sim')
+                self.heartbeat_client = (client, sim)
+            sim.getSimulationState()
+            return True
+        except Exception:
+            # Un socket REQ sin respuesta queda inutilizable: se abrirá otro en el próximo latido
+            self._close_heartbeat_client()
+            return False
+    
+    def _close_heartbeat_client(self):
+        if self.heartbeat_client is not None:
+            try:
+                self.heartbeat_client[0].socket.close(linger=0)
+            except Exception:
+                pass
+            self.heartbeat_client = None
+    
+    def _reconnect(self, stop):
+        """Reintenta la conexión con espera exponencial hasta lograrlo o detener el latido"""
+        robot_keys = list(self.robot_handles_cache)
+        delay = 1.0
+        attempt = 0
+        while not stop.is_set():
+            if self.connected:
+                return  # Reconectado desde la interfaz
+            
+            attempt += 1
+            self._notify_connection('reconnecting', f"Reintentando conexión (intento {attempt})")
+            if self._ping() and self.connect():
+                self._reresolve_handles(robot_keys)
+                self._replay_commands()
+                self._notify_connection('reconnected', f"Reconectado a CoppeliaSim tras {attempt} intento(s)")
+                return
+            
+            if stop.wait(delay):
+                return
+            delay = min(delay * 2, self.heartbeat_max_backoff)
+    
+    def _reresolve_handles(self, robot_keys):
+        """Vuelve a resolver los robots en caché y descarta los handles que ya no existen"""
+        for key in robot_keys:
+            try:
+                self.get_robot_handles(None if key == 'default' else key)
+            except Exception as e:
+                print(f"⚠️ No se pudo volver a resolver el robot {key}: {e}")
+        
+        try:
+            alive, dead = self.check_handles(list(self.created_cubes) + [self.nav_target_handle])
+            self.created_cubes &= alive
+            if self.nav_target_handle in dead:
+                self.nav_target_handle = None
+        except Exception as e:
+            print(f"⚠️ No se pudieron revalidar los handles: {e}")
+    
+    def _replay_commands(self):
+        """Reenvía los comandos que quedaron pendientes durante la desconexión"""
+        pending, self.pending_commands = self.pending_commands, {}
+        for command in pending.values():
+            self.send_command_to_coppelia(command)
+    
     def eliminar_cubos(self):
         """
         Elimina todos los cubos que fueron creados por esta instancia.
@@ -68,9 +456,10 @@ class CoppeliaSimController:
         
         try:
             # Usar removeObjects (plural) en lugar de removeObject
-            self.sim.removeObjects(self.created_cubes)
+            self.sim.removeObjects(list(self.created_cubes))
             count = len(self.created_cubes)
-            self.created_cubes = []  # Limpiar la lista después de eliminar
+            self.created_cubes = set()  # Limpiar el registro después de eliminar
+            self.object_descriptors = {}
             
             print(f"🧹 Se eliminaron {count} cubos correctamente")
             return True
@@ -86,18 +475,47 @@ class CoppeliaSimController:
             print("❌ No se puede eliminar el cubo: no hay conexión activa")
             return False
 
+        # Olvidarlo aunque ya no exista: se eliminó a propósito y no debe recrearse
+        self.created_cubes.discard(handle)
+        self.object_descriptors.pop(handle, None)
         try:
             print(f"Intentando eliminar cubo con handle: {handle}")
             self.sim.removeObject(handle)
-            
-            if handle in self.created_cubes:
-                self.created_cubes.remove(handle)
             print(f"✅ Cubo con handle {handle} eliminado exitosamente")
             return True
         except Exception as e:
             print(f"❌ Excepción al eliminar cubo con handle {handle}: {e}")
             return False
     
+    def eliminar_cubos_por_handles(self, handles):
+        """
+        Elimina varios cubos con una sola petición.
+        
+        Args:
+            handles: Handles de los cubos a eliminar
+        
+        Returns:
+            bool: True si se eliminaron correctamente
+        """
+        if not self.connected:
+            print("❌ No se pueden eliminar cubos: no hay conexión activa")
+            return False
+        
+        handles = list(dict.fromkeys(handles))  # Sin duplicados, conservando el orden
+        if not handles:
+            return True
+        
+        try:
+            self.sim.removeObjects(handles)
+            self.created_cubes.difference_update(handles)
+            for handle in handles:
+                self.object_descriptors.pop(handle, None)
+            print(f"🧹 Se eliminaron {len(handles)} cubos")
+            return True
+        except Exception as e:
+            print(f"❌ Error al eliminar cubos: {e}")
+            return False
+    
     def start_simulation(self):
         """Inicia la simulación en CoppeliaSim y recrea objetos si es necesario"""
         if not self.connected:
@@ -105,25 +523,14 @@ class CoppeliaSimController:
             return False
 
         try:
-            # Antes de iniciar, verificar si necesitamos recrear objetos
-            need_recreate = False
-            
-            # Verificar si los cubos y robot existen
-            if hasattr(self, 'created_cubes') and self.created_cubes:
-                for handle in self.created_cubes:
-                    try:
-                        # Intentar obtener la posición para verificar si existe
-                        self.sim.getObjectPosition(handle, -1)
-                    except:
-                        # El objeto no existe, necesitamos recrearlo
-                        need_recreate = True
-                        break
-            
-            # Si necesitamos recrear objetos, informar pero continuar
-            if need_recreate:
-                print("⚠️ Algunos objetos ya no existen y necesitan ser recreados")
-                # Aquí podrías implementar lógica para recrear los objetos
-                # basándote en la información guardada
+            # Antes de iniciar, verificar con una sola consulta si los cubos existen
+            # y recrear de una vez los que falten a partir de sus descriptores
+            self.handle_remap = {}
+            if self.object_descriptors:
+                _, dead = self.check_handles(self.object_descriptors)
+                if dead:
+                    print(f"⚠️ {len(dead)} objetos ya no existen; recreándolos...")
+                    self.recreate_objects(dead)
             
             # Iniciar la simulación
             self.sim.startSimulation()
@@ -140,33 +547,25 @@ class CoppeliaSimController:
             return False
 
         try:
-            # Intentar pausar la simulación usando pauseSimulation primero
-            try:
+            method = self.capabilities.get('pause', 'pauseSimulation')
+            
+            if method == 'pauseSimulation':
                 self.sim.pauseSimulation()
                 print("✅ Simulación pausada usando pauseSimulation")
                 return True
-            except Exception as e:
-                print(f"Error al usar pauseSimulation: {e}, intentando método alternativo...")
-                
-            # Si el método anterior falla, intentar obtener el estado actual y pausar basado en eso
-            try:
-                # Obtener el estado actual de la simulación
-                sim_state = self.sim.getSimulationState()
-                
+            
+            if method == 'setSimulationState':
                 # Verificar si la simulación está en ejecución
+                sim_state = self.sim.getSimulationState()
                 if sim_state == 0x01:  # simulation_running = 0x01 en muchas versiones
                     # Pausar la simulación estableciendo el estado a pausado
                     self.sim.setSimulationState(0x00)  # simulation_paused = 0x00 en muchas versiones
                     print("✅ Simulación pausada usando setSimulationState")
                     return True
-                else:
-                    print("⚠️ La simulación no está en ejecución, no se puede pausar")
-                    return False
-            except Exception as alt_e:
-                print(f"Error en método alternativo: {alt_e}")
-                
-            # Si todos los métodos anteriores fallan, intentar detenerla (último recurso)
-            print("⚠️ Intentando método de último recurso (detener)")
+                print("⚠️ La simulación no está en ejecución, no se puede pausar")
+                return False
+            
+            # Sin función de pausa disponible: detenerla (último recurso)
             self.sim.stopSimulation()
             print("⚠️ Simulación detenida como recurso alternativo")
             return True
@@ -184,7 +583,247 @@ class CoppeliaSimController:
         except Exception as e:
             print(f"❌ Error al detener simulación: {e}")
             return False
+    
+    def _wait_until_stopped(self, timeout=5.0):
+        """Detiene la simulación (si está en marcha) y espera a que termine de detenerse"""
+        import time
         
+        if self.call('getSimulationState') == self.sim.simulation_stopped:
+            return True
+        self.call('stopSimulation')
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.call('getSimulationState') == self.sim.simulation_stopped:
+                return True
+            time.sleep(0.05)
+        return False
+    
+    def save_snapshot(self, path, grid, objects, robot_handle=None, goal_handle=None):
+        """
+        Guarda la escena completa (robot, meta y obstáculos) en un archivo .ttt y, junto
+        a él (path + '.json'), la cuadrícula y el mapa celda -> objeto por alias.
+        
+        Los cubos creados por la aplicación reciben un alias único (IA_obs_fila_columna)
+        para poder volver a encontrar sus handles después de restaurar. Los objetos
+        propios de la escena conservan su alias; se guardan su alias y su posición.
+        
+        Args:
+            path: Ruta del archivo de escena (.ttt)
+            grid: Cuadrícula (lista de listas) a guardar
+            objects: Diccionario (fila, columna) -> handle
+            robot_handle: Handle del robot (conserva su alias)
+            goal_handle: Handle de la meta (conserva su alias)
+        
+        Returns:
+            bool: True si se guardó correctamente
+        """
+        import json
+        
+        if not self.connected:
+            print("❌ No se puede guardar la instantánea: no hay conexión activa")
+            return False
+        
+        try:
+            # Agrupar las celdas de cada handle (un obstáculo fusionado cubre varias)
+            cells_by_handle = {}
+            for (row, col), handle in objects.items():
+                cells_by_handle.setdefault(handle, []).append([row, col])
+            
+            entries = []
+            for handle, cells in cells_by_handle.items():
+                if handle == robot_handle:
+                    role = 'robot'
+                elif handle == goal_handle:
+                    role = 'goal'
+                else:
+                    role = 'obstacle'
+                    # Solo se renombran los cubos propios, nunca los objetos del usuario
+                    if handle in self.created_cubes:
+                        row, col = min(cells)
+                        self.set_alias(handle, f"IA_obs_{row}_{col}")
+                entries.append({'handle': handle, 'role': role, 'cells': sorted(cells),
+                                'created': handle in self.created_cubes})
+            for handle, role in ((robot_handle, 'robot'), (goal_handle, 'goal')):
+                if handle is not None and handle not in cells_by_handle:
+                    entries.append({'handle': handle, 'role': role, 'cells': [], 'created': False})
+            
+            # Alias completos y posiciones tal y como los devuelve el índice de la escena
+            # (una sola consulta); la posición distingue objetos con el mismo alias
+            info = self.call_helper('iaSceneInfo', [entry['handle'] for entry in entries])
+            for index, (entry, alias) in enumerate(zip(entries, info[1])):
+                del entry['handle']
+                entry['alias'] = alias
+                entry['position'] = list(info[3][index * 4:index * 4 + 3])
+            
+            if not self._wait_until_stopped():
+                print("❌ No se pudo detener la simulación para guardar la escena")
+                return False
+            self._remove_templates()  # Las plantillas no forman parte de la instantánea
+            self.call('saveScene', path)
+            
+            with open(path + '.json', 'w') as f:
+                json.dump({'scene': path, 'grid': grid, 'objects': entries}, f)
+            
+            print(f"📸 Instantánea guardada en {path} ({len(entries)} objetos)")
+            return True
+        except Exception as e:
+            print(f"❌ Error al guardar la instantánea: {e}")
+            return False
+    
+    def restore_snapshot(self, path):
+        """
+        Restaura una instantánea con una sola carga de escena y vuelve a indexar los
+        handles por alias.
+        
+        Args:
+            path: Ruta del archivo de escena (.ttt) guardado con save_snapshot
+        
+        Returns:
+            dict: {'grid', 'objects' ((fila, columna) -> handle), 'robot', 'goal', 'merged'
+                   (lista de (celdas, handle) de los obstáculos que cubren varias celdas)}
+                  o None si falló
+        """
+        import json
+        
+        if not self.connected:
+            print("❌ No se puede restaurar la instantánea: no hay conexión activa")
+            return None
+        
+        try:
+            with open(path + '.json') as f:
+                sidecar = json.load(f)
+            
+            self.navigation_active = False
+            if not self._wait_until_stopped():
+                print("❌ No se pudo detener la simulación para restaurar la escena")
+                return None
+            self.call('loadScene', path)
+            
+            # Todos los handles anteriores dejaron de ser válidos
+            self.invalidate_robot_handles()
+            self.nav_target_handle = None
+            self.scene_index.clear()
+            self.scene_index.load()
+            self.cube_templates = {}
+            self._remove_templates()  # Instantáneas antiguas pueden contener plantillas
+            
+            result = {'grid': sidecar['grid'], 'objects': {}, 'robot': None, 'goal': None, 'merged': []}
+            obstacles = []
+            self.object_descriptors = {}
+            for entry in sidecar['objects']:
+                handle = self._find_restored(entry)
+                if handle is None:
+                    print(f"⚠️ No se encontró '{entry['alias']}' en la escena restaurada")
+                    continue
+                if entry['role'] in ('robot', 'goal'):
+                    result[entry['role']] = handle
+                elif entry.get('created', True):
+                    obstacles.append(handle)
+                    info = self.scene_index.get(handle)
+                    self.object_descriptors[handle] = {
+                        'size': info['size'], 'position': info['position'], 'color': None,
+                        'alias': entry['alias'], 'cell': tuple(entry['cells'][0])}
+                    if len(entry['cells']) > 1:
+                        result['merged'].append(([tuple(cell) for cell in entry['cells']], handle))
+                for row, col in entry['cells']:
+                    result['objects'][(row, col)] = handle
+            self.created_cubes = set(obstacles)
+            
+            print(f"♻️ Instantánea restaurada desde {path} ({len(result['objects'])} celdas con objeto)")
+            return result
+        except Exception as e:
+            print(f"❌ Error al restaurar la instantánea: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+        
+    def _find_restored(self, entry):
+        """
+        Handle de la escena restaurada con el alias de una entrada de la instantánea;
+        si varios objetos lo comparten, el más cercano a la posición guardada.
+        """
+        index = self.scene_index
+        candidates = [int(handle) for handle, alias in zip(index.handles, index.aliases)
+                      if alias == entry['alias']]
+        if len(candidates) <= 1 or 'position' not in entry:
+            return candidates[0] if candidates else None
+        return min(candidates, key=lambda handle: sum(
+            (a - b) ** 2 for a, b in zip(index.get(handle)['position'], entry['position'])))
+    
+    def plan_grid_path(self, start, end, obstacles=()):
+        """
+        Camino más corto entre dos celdas de la cuadrícula evitando los obstáculos
+        (A* con 8 vecinos; las diagonales no cortan esquinas ocupadas).
+        
+        Args:
+            start: Celda (fila, columna) de partida
+            end: Celda (fila, columna) de llegada
+            obstacles: Celdas (fila, columna) ocupadas
+        
+        Returns:
+            list: Celdas desde start hasta end (ambas incluidas), o None si no hay camino
+        """
+        start, end = tuple(start), tuple(end)
+        blocked = set(map(tuple, obstacles)) - {start, end}
+        size = self.transform.grid_size
+        
+        def heuristic(cell):
+            dr, dc = abs(cell[0] - end[0]), abs(cell[1] - end[1])
+            return max(dr, dc) + (math.sqrt(2) - 1) * min(dr, dc)
+        
+        came_from = {start: None}
+        cost = {start: 0.0}
+        queue = [(heuristic(start), start)]
+        while queue:
+            _, cell = heappop(queue)
+            if cell == end:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path[::-1]
+            row, col = cell
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    neighbor = (row + dr, col + dc)
+                    if (dr == dc == 0 or not (0 <= neighbor[0] < size and 0 <= neighbor[1] < size)
+                            or neighbor in blocked):
+                        continue
+                    if dr and dc and ((row + dr, col) in blocked or (row, col + dc) in blocked):
+                        continue
+                    new_cost = cost[cell] + (math.sqrt(2) if dr and dc else 1.0)
+                    if new_cost < cost.get(neighbor, float('inf')):
+                        cost[neighbor] = new_cost
+                        came_from[neighbor] = cell
+                        heappush(queue, (new_cost + heuristic(neighbor), neighbor))
+        return None
+    
+    def path_waypoints(self, robot_pos, target_pos, obstacles=()):
+        """
+        Puntos a seguir desde la posición del robot hasta el objetivo: los centros de
+        las celdas del camino planificado en la cuadrícula, o la línea recta si el
+        robot está fuera de la cuadrícula o no hay camino.
+        
+        Args:
+            robot_pos: Posición [x, y, ...] del robot
+            target_pos: Posición [x, y, ...] del objetivo
+            obstacles: Celdas (fila, columna) ocupadas
+        
+        Returns:
+            list: Puntos [x, y] en coordenadas de CoppeliaSim
+        """
+        transform = self.transform
+        start = transform.world_to_cell(robot_pos[0], robot_pos[1])
+        end = transform.world_to_cell(target_pos[0], target_pos[1])
+        cells = None
+        if transform.in_bounds(*start) and transform.in_bounds(*end):
+            cells = self.plan_grid_path(start, end, obstacles or ())
+        if not cells:
+            return [list(robot_pos[:2]), list(target_pos[:2])]
+        # El primer y el último centro se sustituyen por las posiciones reales
+        middle = transform.cells_to_world(cells[1:-1]).tolist()
+        return [list(robot_pos[:2])] + middle + [list(target_pos[:2])]
+    
         # Añadimos esta función para reemplazar execute_path en CoppeliaSimController
     def execute_path(self, start_pos, end_pos, obstacles=None):
         """
@@ -193,7 +832,7 @@ class CoppeliaSimController:
         Args:
             start_pos: Tupla (row, col) con la posición inicial del robot
             end_pos: Tupla (row, col) con la posición final deseada
-            obstacles: Lista de obstáculos (no utilizada en esta implementación simplificada)
+            obstacles: Celdas (fila, columna) ocupadas que el camino planificado evita
         """
         if not self.connected:
             print("❌ No se puede ejecutar recorrido: no hay conexión activa")
@@ -203,72 +842,34 @@ class CoppeliaSimController:
         
         try:
             # 1. Convertir coordenadas de cuadrícula a coordenadas CoppeliaSim
-            reference_scale = 0.5
-            
             # Calcular la posición objetivo
-            end_x = (end_pos[1] - 5 + 0.5) * reference_scale
-            end_y = (5 - end_pos[0] - 0.5) * reference_scale
+            end_x, end_y = self.transform.cell_to_world(*end_pos)
             end_z = 0.1384  # Altura del Pioneer P3DX
             target_position = [end_x, end_y, end_z]
             
             print(f"Posición objetivo en coordenadas CoppeliaSim: {target_position}")
             
-            # 2. Buscar el robot
-            robot_handle = None
-            possible_robot_names = ["Pioneer_p3dx", "/PioneerP3DX", "PioneerP3DX", "/Pioneer_p3dx"]
-            
-            for name in possible_robot_names:
-                try:
-                    robot_handle = self.sim.getObject(name)
-                    if robot_handle:
-                        print(f"Robot encontrado: {name}")
-                        break
-                except:
-                    continue
-            
-            if not robot_handle:
-                print("❌ No se pudo encontrar el robot")
-                return False
-            
-            print(f"✅ Robot encontrado con handle: {robot_handle}")
-            
-            # 3. Buscar los motores
-            left_motor = None
-            right_motor = None
-            
-            motor_names = [
-                ["Pioneer_p3dx_leftMotor", "Pioneer_p3dx_rightMotor"],
-                ["/PioneerP3DX/leftMotor", "/PioneerP3DX/rightMotor"],
-                ["leftMotor", "rightMotor"]
-            ]
-            
-            for left_name, right_name in motor_names:
-                try:
-                    left_motor = self.sim.getObject(left_name)
-                    right_motor = self.sim.getObject(right_name)
-                    if left_motor and right_motor:
-                        print(f"Motores encontrados: {left_name}, {right_name}")
-                        break
-                except:
-                    continue
-            
-            if not left_motor or not right_motor:
-                print("❌ No se pudieron encontrar los motores")
+            # 2. Obtener el robot y sus motores (resueltos una vez y guardados en caché)
+            robot = self.get_robot_handles()
+            if robot is None:
+                print("❌ No se pudo encontrar el robot o sus motores")
                 return False
             
             # 4. Crear un objetivo visual (targetDummy)
             try:
-                # Eliminar objetivo anterior si existe
-                try:
-                    old_target = self.sim.getObject("NavTarget")
-                    self.sim.removeObject(old_target)
-                except:
-                    pass
+                # Eliminar objetivo anterior si existe (por handle, sin buscarlo por nombre)
+                if self.nav_target_handle is not None:
+                    try:
+                        self.sim.removeObject(self.nav_target_handle)
+                    except:
+                        pass
+                    self.nav_target_handle = None
                 
                 # Crear un dummy como objetivo
                 target_handle = self.sim.createDummy(0.1)  # 10cm de diámetro
+                self.nav_target_handle = target_handle
                 self.sim.setObjectPosition(target_handle, -1, target_position)
-                self.sim.setObjectAlias(target_handle, "NavTarget")
+                self.set_alias(target_handle, "NavTarget")
                 
                 # Intento de cambiar el color a blanco
                 try:
@@ -280,104 +881,10 @@ class CoppeliaSimController:
             except Exception as e:
                 print(f"⚠️ Error al crear objetivo visual: {e}")
             
-            # 5. Iniciar navegación simple
-            import threading
-            import time
-            import math
-            
-            # Variable de control para el hilo
-            self.navigation_active = True
-            
-            def navigation_controller():
-                """Controlador simple de navegación hacia el objetivo"""
-                print("🚀 Iniciando navegación hacia el objetivo")
-                
-                try:
-                    # Variables para control
-                    max_velocity = 2.0  # Velocidad máxima
-                    distance_threshold = 0.5  # Distancia para considerar llegada
-                    
-                    # Bucle de navegación
-                    while self.navigation_active:
-                        # Obtener posición y orientación del robot
-                        robot_pos = self.sim.getObjectPosition(robot_handle, -1)
-                        robot_orient = self.sim.getObjectOrientation(robot_handle, -1)
-                        robot_angle = robot_orient[2]  # Yaw (rotación en Z)
-                        
-                        # Calcular distancia al objetivo
-                        dx = target_position[0] - robot_pos[0]
-                        dy = target_position[1] - robot_pos[1]
-                        distance = math.sqrt(dx*dx + dy*dy)
-                        
-                        print(f"Distancia al objetivo: {distance:.2f}m")
-                        
-                        # Verificar llegada al objetivo
-                        if distance < distance_threshold:
-                            print("🏁 ¡Objetivo alcanzado!")
-                            self.sim.setJointTargetVelocity(left_motor, 0)
-                            self.sim.setJointTargetVelocity(right_motor, 0)
-                            break
-                        
-                        # Calcular ángulo hacia el objetivo
-                        target_angle = math.atan2(dy, dx)
-                        
-                        # Calcular error de orientación
-                        orientation_error = target_angle - robot_angle
-                        
-                        # Normalizar el error a [-π, π]
-                        while orientation_error > math.pi:
-                            orientation_error -= 2 * math.pi
-                        while orientation_error < -math.pi:
-                            orientation_error += 2 * math.pi
-                        
-                        print(f"Orientación: actual={robot_angle:.2f}, objetivo={target_angle:.2f}, error={orientation_error:.2f}")
-                        
-                        # Calcular velocidades de los motores
-                        if abs(orientation_error) > 0.3:  # Si la orientación es muy diferente, corregir primero
-                            if orientation_error > 0:  # Girar a la izquierda
-                                left_velocity = -max_velocity * 0.5
-                                right_velocity = max_velocity * 0.5
-                            else:  # Girar a la derecha
-                                left_velocity = max_velocity * 0.5
-                                right_velocity = -max_velocity * 0.5
-                            print("Girando para orientarse al objetivo")
-                        else:
-                            # Avanzar con corrección de dirección
-                            forward_speed = max_velocity * min(1.0, distance)
-                            steering = orientation_error * 1.5
-                            
-                            left_velocity = forward_speed - steering
-                            right_velocity = forward_speed + steering
-                            print(f"Avanzando hacia el objetivo: L={left_velocity:.2f}, R={right_velocity:.2f}")
-                        
-                        # Aplicar velocidades a los motores
-                        self.sim.setJointTargetVelocity(left_motor, left_velocity)
-                        self.sim.setJointTargetVelocity(right_motor, right_velocity)
-                        
-                        # Pausa breve para no saturar la CPU
-                        time.sleep(0.1)
-                    
-                    print("✅ Navegación finalizada")
-                    
-                except Exception as e:
-                    print(f"❌ Error en navegación: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    
-                finally:
-                    # Detener motores al finalizar
-                    try:
-                        if left_motor and right_motor:
-                            self.sim.setJointTargetVelocity(left_motor, 0)
-                            self.sim.setJointTargetVelocity(right_motor, 0)
-                            print("Robot detenido")
-                    except:
-                        pass
-            
-            # Iniciar el hilo de navegación
-            nav_thread = threading.Thread(target=navigation_controller)
-            nav_thread.daemon = True
-            nav_thread.start()
+            # 5. Seguir con pure-pursuit el camino planificado en la cuadrícula
+            robot_pos = self.sim.getObjectPosition(robot.body, -1)
+            waypoints = self.path_waypoints(robot_pos, target_position, obstacles)
+            self.follow_waypoints(robot, waypoints, goal_tolerance=0.5)
             
             return True
             
@@ -387,14 +894,353 @@ class CoppeliaSimController:
             traceback.print_exc()
             self.navigation_active = False
             return False
-        
+        
+    def get_robot_handles(self, robot_handle=None):
+        """
+        Devuelve el descriptor RobotHandles del robot, resolviéndolo solo la primera vez.
+
+        Args:
+            robot_handle: Handle del cuerpo del robot, o None para buscar el Pioneer P3DX por nombre
+
+        Returns:
+            RobotHandles o None si no se encontró el robot o sus motores
+        """
+        key = robot_handle if robot_handle is not None else 'default'
+        robot = self.robot_handles_cache.get(key)
+        if robot is not None:
+            return robot
+
+        robot = self._resolve_robot_handles(robot_handle)
+        if robot is not None:
+            self.robot_handles_cache[key] = robot
+            print(f"✅ Robot resuelto y guardado en caché: {robot}")
+        return robot
+
+    def invalidate_robot_handles(self, robot_handle=None):
+        """
+        Descarta los descriptores de robot guardados. Se usa al recargar la escena,
+        al (re)conectar o cuando un handle deja de existir.
+
+        Args:
+            robot_handle: Handle del robot a invalidar, o None para invalidar todos
+        """
+        if robot_handle is None:
+            self.robot_handles_cache = {}
+            return
+        for key, robot in list(self.robot_handles_cache.items()):
+            if robot.body == robot_handle:
+                del self.robot_handles_cache[key]
+
+    def _resolve_robot_handles(self, robot_handle=None):
+        """Busca en CoppeliaSim el cuerpo, los motores y los sensores de un robot"""
+        name = None
+        if robot_handle is None:
+            possible_robot_names = ["Pioneer_p3dx", "/PioneerP3DX", "PioneerP3DX", "/Pioneer_p3dx"]
+            for candidate in possible_robot_names:
+                try:
+                    robot_handle = self.sim.getObject(candidate)
+                    if robot_handle:
+                        name = candidate
+                        break
+                except:
+                    continue
+            if not robot_handle:
+                return None
+
+        try:
+            # Una sola consulta por tipo en el árbol del robot
+            joints = self.sim.getObjectsInTree(robot_handle, self.sim.object_joint_type, 0)
+            sensors = self.sim.getObjectsInTree(robot_handle, self.sim.object_proximitysensor_type, 0)
+        except Exception as e:
+            print(f"Error al buscar motores y sensores del robot: {e}")
+            return None
+
+        if len(joints) < 2:
+            return None
+
+        # Preferir los motores cuyo nombre indica el lado
+        left_motor, right_motor = joints[0], joints[1]
+        aliases = {}
+        for joint in joints:
+            try:
+                aliases[joint] = self.sim.getObjectAlias(joint).lower()
+            except:
+                aliases[joint] = ''
+        left = [j for j in joints if 'left' in aliases[j]]
+        right = [j for j in joints if 'right' in aliases[j]]
+        if left and right:
+            left_motor, right_motor = left[0], right[0]
+
+        return RobotHandles(robot_handle, left_motor, right_motor,
+                            self._order_sensors(sensors), name=name)
+
+    def _order_sensors(self, sensors):
+        """Ordena los sensores por el índice de su nombre (p. ej. ultrasonicSensor[3])"""
+        import re
+
+        indexed = []
+        for position, sensor in enumerate(sensors):
+            index = position
+            try:
+                match = re.search(r'(\d+)\D*$', self.sim.getObjectAlias(sensor, 1))
+                if match:
+                    index = int(match.group(1))
+            except:
+                pass
+            indexed.append((index, position, sensor))
+        return [sensor for _, _, sensor in sorted(indexed)]
+
+    def call_helper(self, name, *args):
+        """
+        Llama a una función auxiliar Lua del sandbox, instalándola si hace falta.
+        Permite agrupar varias operaciones en una sola petición al simulador.
+
+        Args:
+            name: Nombre de la función definida en SimHelpers.LUA_HELPERS
+            *args: Argumentos de la función
+
+        Returns:
+            El resultado devuelto por la función Lua
+        """
+        if name not in self.installed_helpers:
+            # Instalar de una vez todas las funciones que aún no lo estén
+            missing = [helper for helper in LUA_HELPERS if helper not in self.installed_helpers]
+            self.sim.executeScriptString(helper_source(missing), self.sim.scripttype_sandboxscript)
+            self.installed_helpers.update(missing)
+
+        return self.sim.callScriptFunction(name, self.sim.scripttype_sandboxscript, *args)
+
+    def check_handles(self, handles):
+        """
+        Comprueba de una vez qué handles siguen existiendo en la escena.
+
+        Usa la función Lua iaAliveHandles (una sola petición); si el script sandbox
+        no está disponible, pide todos los handles de la escena y los compara.
+
+        Args:
+            handles: Handles a comprobar
+
+        Returns:
+            tuple: (conjunto de handles vivos, conjunto de handles que ya no existen)
+        """
+        handles = [handle for handle in set(handles) if handle is not None]
+        if not handles:
+            return set(), set()
+
+        if self.capabilities.get('executeScriptString') and self.capabilities.get('callScriptFunction'):
+            try:
+                flags = self.call_helper('iaAliveHandles', handles)
+                alive = {handle for handle, valid in zip(handles, flags) if valid}
+                return alive, set(handles) - alive
+            except Exception as e:
+                print(f"⚠️ No se pudo usar iaAliveHandles, consultando la escena completa: {e}")
+
+        scene = set(self.sim.getObjectsInTree(self.sim.handle_scene))
+        alive = scene.intersection(handles)
+        return alive, set(handles) - alive
+
+    def pipeline(self):
+        """
+        Devuelve un SimPipeline para enviar varias llamadas independientes en una sola
+        petición; usar como contexto (las llamadas se ejecutan al salir del bloque).
+        """
+        return SimPipeline(self)
+
+    def bulk_edit(self):
+        """
+        Abre una sesión de edición masiva: desactiva el renderizado, encola las
+        creaciones, eliminaciones y cambios de pose y los envía agrupados al salir
+        del bloque, restaurando después la visualización. Las sesiones anidadas
+        comparten la de nivel superior.
+
+            with controller.bulk_edit() as edit:
+                pending = edit.create({'size': size, 'position': position})
+                edit.remove(handle)
+        """
+        if self.bulk_session is None:
+            self.bulk_session = BulkEditSession(self)
+        return self.bulk_session
+
+    def read_proximity_sensors(self, sensor_handles):
+        """
+        Lee varios sensores de proximidad con una sola petición.
+
+        Args:
+            sensor_handles: Lista de handles de sensores
+
+        Returns:
+            list: Distancia detectada por cada sensor, o -1 si no detecta nada
+        """
+        return self.call_helper('iaReadProximity', list(sensor_handles))
+
+    def start_recording(self, path, chunk_size=4096):
+        """
+        Empieza a grabar la pose, los comandos de rueda y la meta de cada robot
+        navegado en columnas binarias.
+
+        Args:
+            path: Directorio de salida (una columna .npy por campo)
+            chunk_size: Muestras acumuladas en memoria antes de escribir a disco
+
+        Returns:
+            TrajectoryRecorder: El grabador activo
+        """
+        self.stop_recording()
+        self.recorder = TrajectoryRecorder(path, chunk_size)
+        print(f"⏺️ Grabando trayectorias en {path}")
+        return self.recorder
+
+    def stop_recording(self):
+        """Detiene la grabación activa (si existe) y cierra el archivo"""
+        if self.recorder is None:
+            return False
+        recorder = self.recorder
+        self.recorder = None
+        recorder.close()
+        return True
+
     # Método para detener la navegación desde fuera
     def stop_navigation(self):
         """Detiene el proceso de navegación activo"""
         self.navigation_active = False
         print("Navegación detenida manualmente")
         return True
-    
+
+    # Desplazamiento mínimo (m) del objetivo seguido para recalcular el final del camino
+    GOAL_RETARGET_DISTANCE = 0.05
+
+    def follow_waypoints(self, robot, waypoints, goal_handle=None, **follower_options):
+        """
+        Sigue una lista de puntos con un controlador pure-pursuit en un hilo separado.
+
+        El perfil de velocidad se precalcula al crear el seguidor, de modo que cada
+        ciclo de control solo lee la pose, consulta la tabla y escribe las ruedas.
+
+        Args:
+            robot: RobotHandles con el cuerpo y los motores del robot
+            waypoints: Lista de puntos [x, y] en coordenadas de CoppeliaSim
+            goal_handle: Objeto cuya posición se vuelve a leer en cada ciclo (en la misma
+                         petición que la pose del robot); si se mueve, el último punto
+                         del camino lo sigue
+            **follower_options: Parámetros adicionales para PurePursuitFollower
+
+        Returns:
+            PurePursuitFollower: El seguidor en uso
+        """
+        import threading
+        import time
+
+        follower = PurePursuitFollower(waypoints, **follower_options)
+        robot_handle = robot.body
+        left_motor = robot.left_motor
+        right_motor = robot.right_motor
+
+        # Variable de control para el hilo
+        self.navigation_active = True
+
+        def navigation_controller():
+            """Bucle de control pure-pursuit"""
+            print(f"🚀 Iniciando navegación pure-pursuit ({len(follower.path)} puntos)")
+            use_avoidance = self.avoidance_enabled and bool(robot.sensors)
+
+            try:
+                while self.navigation_active:
+                    try:
+                        # Posición y orientación del robot (y del objetivo) en una sola petición
+                        with self.pipeline() as batch:
+                            position = batch.getObjectPosition(robot_handle, -1)
+                            orientation = batch.getObjectOrientation(robot_handle, -1)
+                            goal = batch.getObjectPosition(goal_handle, -1) if goal_handle is not None else None
+                        robot_pos = position.value
+                        robot_angle = orientation.value[2]  # Yaw (rotación en Z)
+
+                        # Un objetivo que se mueve arrastra el final del camino
+                        if goal is not None and goal.ok:
+                            goal_pos = goal.value
+                            if math.hypot(goal_pos[0] - follower.goal[0], goal_pos[1] - follower.goal[1]) \
+                                    > self.GOAL_RETARGET_DISTANCE:
+                                follower.set_goal(goal_pos)
+
+                        distance = follower.distance_to_goal(robot_pos[0], robot_pos[1])
+
+                        # Verificar llegada al objetivo
+                        if follower.is_finished(robot_pos[0], robot_pos[1]):
+                            print("🏁 ¡Objetivo alcanzado!")
+                            self.navigation_active = False
+                            break
+
+                        linear, angular, heading_error = follower.compute(robot_pos[0], robot_pos[1], robot_angle)
+                        left_velocity, right_velocity = follower.wheel_velocities(linear, angular)
+
+                        # Evasión reactiva: una sola petición para leer todos los sensores
+                        if use_avoidance:
+                            try:
+                                distances = self.read_proximity_sensors(robot.sensors)
+                                left_correction, right_correction = self.avoidance.correction(distances)
+                                left_velocity += left_correction
+                                right_velocity += right_correction
+                            except Exception as sensor_error:
+                                print(f"⚠️ Evasión desactivada, no se pudieron leer los sensores: {sensor_error}")
+                                use_avoidance = False
+
+                        # Aplicar velocidades a los motores (ambas en la misma petición)
+                        with self.pipeline() as batch:
+                            batch.setJointTargetVelocity(left_motor, left_velocity)
+                            batch.setJointTargetVelocity(right_motor, right_velocity)
+                        batch.check()
+
+                        # Telemetría del ciclo (sin imprimir) y registro limitado para humanos
+                        self.telemetry.record(robot_handle, robot_pos[0], robot_pos[1], robot_angle,
+                                              distance, heading_error, left_velocity, right_velocity,
+                                              linear, angular)
+                        if self.recorder is not None:
+                            self.recorder.record(robot_handle, robot_pos[0], robot_pos[1], robot_angle,
+                                                 left_velocity, right_velocity,
+                                                 follower.goal[0], follower.goal[1])
+                        self.log.log('navigation', f"Distancia al objetivo: {distance:.2f}m, "
+                                                   f"error={heading_error:.2f}, "
+                                                   f"L={left_velocity:.2f}, R={right_velocity:.2f}")
+
+                    except Exception as loop_error:
+                        self.log.log('navigation_error', f"Error en bucle de navegación: {loop_error}")
+                        # Si el robot desapareció de la escena, invalidar la caché y terminar
+                        if not robot.is_alive(self.sim):
+                            print("⚠️ Los handles del robot ya no son válidos")
+                            self.invalidate_robot_handles()
+                            self.navigation_active = False
+                            break
+
+                    # Pausa breve para no saturar la CPU
+                    time.sleep(0.1)
+
+                print("✅ Navegación finalizada")
+
+            except Exception as e:
+                print(f"❌ Error en navegación: {e}")
+                import traceback
+                traceback.print_exc()
+
+            finally:
+                # Detener motores al finalizar
+                try:
+                    with self.pipeline() as batch:
+                        batch.setJointTargetVelocity(left_motor, 0)
+                        batch.setJointTargetVelocity(right_motor, 0)
+                    print("Robot detenido")
+                except:
+                    pass
+
+        def run_navigation():
+            with self.operation('navigation_tick'):
+                navigation_controller()
+
+        # Iniciar el hilo de navegación
+        nav_thread = threading.Thread(target=run_navigation)
+        nav_thread.daemon = True
+        nav_thread.start()
+
+        return follower
+
     def cargar_muro_personalizado(self, size=[0.1, 0.1, 0.1], position=[0, 0, 0], color=None):
         """
         Crea un cubo/muro personalizado con el tamaño especificado, asegurando 
@@ -404,27 +1250,22 @@ class CoppeliaSimController:
             print("❌ No se puede crear muro personalizado: no hay conexión activa")
             return None
         
+        return self.create_obstacles([{'size': size, 'position': position, 'color': color}])[0]
+    
+    @profiled_operation('create_cuboid')
+    def _cargar_muro_individual(self, size, position, color=None):
+        """
+        Crea un cubo configurándolo con una llamada por propiedad.
+        Es el método de respaldo cuando no se puede usar la creación en lote.
+        """
         try:
             print(f"Creando muro personalizado en posición: {position}, tamaño: {size}")
             
-            # Intentar método alternativo con createPureShape
             try:
-                # Primero intenta con createPrimitiveShape (formato mejorado)
-                wall_handle = self.sim.createPrimitiveShape(0, 18, size, 1.0)
+                wall_handle = self.create_shape('cuboid', size)
             except Exception as e:
-                print(f"Error con createPrimitiveShape: {e}, intentando método alternativo...")
-                try:
-                    # Intenta con createPureShape que podría tener parámetros diferentes
-                    wall_handle = self.sim.createPureShape(0, 18, size, 1.0)
-                except Exception as e2:
-                    print(f"Error con createPureShape: {e2}, intentando método básico...")
-                    try:
-                        # Último intento con formato simplificado
-                        options = 18  # 16 (static) + 2 (respondable)
-                        wall_handle = self.sim.createPrimitiveShape(0, options, size)
-                    except Exception as e3:
-                        print(f"Todos los métodos de creación fallaron: {e3}")
-                        return None
+                print(f"Error al crear la forma: {e}")
+                return None
             
             if wall_handle == -1:
                 print("❌ Error: Handle no válido (-1)")
@@ -432,51 +1273,31 @@ class CoppeliaSimController:
             
             print(f"✅ Objeto creado con handle: {wall_handle}")
             
-            # Posicionar el objeto
+            # Posición, propiedades especiales, respondable y color son independientes:
+            # se envían juntos en una sola petición
             position[2] = size[2]/2  # Centrar en Z según altura
-            self.sim.setObjectPosition(wall_handle, -1, position)
+            detectable_value = self.sim.objectspecialproperty_detectable_all + self.sim.objectspecialproperty_collidable
+            with self.pipeline() as batch:
+                placed = batch.setObjectPosition(wall_handle, -1, position)
+                special = batch.setObjectSpecialProperty(wall_handle, detectable_value)
+                respondable = batch.setObjectInt32Param(wall_handle, 3004, 1)  # sim.shapeintparam_respondable
+                colored = batch.setShapeColor(wall_handle, None, 0, color) if color else None
+            
+            if not placed.ok:
+                raise RuntimeError(f"No se pudo posicionar el objeto: {placed.error}")
             print(f"✅ Objeto posicionado en: {position}")
-            
-            # Establecer propiedades especiales para detectabilidad
-            try:
-                # Intentar con valor combinado
-                detectable_value = self.sim.objectspecialproperty_detectable_all + self.sim.objectspecialproperty_collidable
-                self.sim.setObjectSpecialProperty(wall_handle, detectable_value)
-            except Exception as e:
-                print(f"Error al establecer propiedades combinadas: {e}, intentando valores individuales...")
-                try:
-                    # Intentar agregar propiedades por separado
-                    self.sim.setObjectSpecialProperty(wall_handle, self.sim.objectspecialproperty_detectable_all)
-                    self.sim.setObjectSpecialProperty(wall_handle, self.sim.objectspecialproperty_collidable)
-                except Exception as e2:
-                    print(f"Error con propiedades individuales: {e2}, probando con valores numéricos fijos...")
-                    try:
-                        # Último intento con valores numéricos fijos
-                        self.sim.setObjectSpecialProperty(wall_handle, 19)  # 16 + 2 + 1 (detectable + collidable + measurable)
-                    except:
-                        print("No se pudieron establecer propiedades especiales")
-            
-            print("✅ Intentado establecer propiedades especiales")
-            
-            # Intentar establecer parámetros adicionales
-            try:
-                self.sim.setObjectInt32Param(wall_handle, 3004, 1)  # sim.shapeintparam_respondable
-            except:
+            if not special.ok:
+                print(f"No se pudieron establecer propiedades especiales: {special.error}")
+            if not respondable.ok:
                 print("No se pudo establecer parámetro respondable")
-            
-            # Establecer color si se especifica
-            if color:
-                try:
-                    self.sim.setShapeColor(wall_handle, None, 0, color)
+            if colored is not None:
+                if colored.ok:
                     print(f"✅ Color establecido: {color}")
-                except Exception as e:
-                    print(f"Error al establecer color: {e}")
+                else:
+                    print(f"Error al establecer color: {colored.error}")
             
             # Registrar el handle
-            if hasattr(self, 'created_cubes'):
-                self.created_cubes.append(wall_handle)
-            else:
-                self.created_cubes = [wall_handle]
+            self._track_created(wall_handle, {'size': size, 'position': position, 'color': color})
             
             print(f"✅ Muro personalizado creado con handle: {wall_handle}")
             return wall_handle
@@ -487,6 +1308,217 @@ class CoppeliaSimController:
             traceback.print_exc()
             return None
     
+    # Posición fuera del mapa (bajo el suelo) donde se guardan los cubos plantilla
+    TEMPLATE_POSITION = [50.0, 50.0, -5.0]
+    # Alias de los cubos plantilla, para volver a encontrarlos en la escena
+    TEMPLATE_ALIAS = 'IA_template'
+    # Tamaño de lote a partir del cual el modo 'auto' usa plantillas
+    TEMPLATE_MIN_BATCH = 8
+
+    @profiled_operation('create_cuboid')
+    def create_obstacles(self, specs, mode='auto'):
+        """
+        Crea un lote de cubos/muros con una sola petición al simulador.
+
+        Args:
+            specs: Lista de diccionarios con 'size' [x, y, z], 'position' [x, y, z]
+                   y opcionalmente 'color' [r, g, b] y 'alias'
+            mode: 'batch' crea y configura cada cubo en el simulador; 'template' copia
+                  cubos plantilla ya configurados con copyPasteObjects; 'auto' usa
+                  plantillas para lotes grandes si la API lo permite
+
+        Returns:
+            list: Handle de cada cubo en el mismo orden que specs (None si falló)
+        """
+        if not self.connected:
+            print("❌ No se pueden crear obstáculos: no hay conexión activa")
+            return [None] * len(specs)
+        
+        if not specs:
+            return []
+        
+        # Preparar las especificaciones centrando cada cubo en Z según su altura
+        lua_specs = []
+        for spec in specs:
+            size = list(spec['size'])
+            position = list(spec['position'])
+            position[2] = size[2] / 2
+            lua_spec = {'size': size, 'position': position}
+            if spec.get('color'):
+                lua_spec['color'] = list(spec['color'])
+            if spec.get('alias'):
+                lua_spec['alias'] = spec['alias']
+            lua_specs.append(lua_spec)
+        
+        if mode == 'auto':
+            mode = ('template' if len(specs) >= self.TEMPLATE_MIN_BATCH
+                    and self.capabilities.get('copyPasteObjects') else 'batch')
+        if mode == 'template':
+            try:
+                return self._create_from_templates(lua_specs)
+            except Exception as e:
+                print(f"⚠️ No se pudieron usar plantillas ({e}), creando en lote...")
+        
+        try:
+            created = self.call_helper('iaCreateCuboids', lua_specs)
+        except Exception as e:
+            # Sin funciones auxiliares disponibles: crear uno a uno (registra cada handle)
+            print(f"⚠️ No se pudo crear en lote ({e}), creando obstáculos individualmente...")
+            return [self._cargar_muro_individual(spec['size'], spec['position'], spec.get('color'))
+                    for spec in lua_specs]
+        
+        handles = [handle if handle != -1 else None for handle in created]
+        for handle, spec in zip(handles, lua_specs):
+            if handle is not None:
+                self._track_created(handle, spec)
+        
+        failed = handles.count(None)
+        print(f"✅ {len(handles) - failed} obstáculos creados en lote" +
+              (f" ({failed} fallidos)" if failed else ""))
+        return handles
+    
+    def _track_created(self, handle, spec):
+        """Registra un cubo creado y guarda su descriptor para poder recrearlo"""
+        self.created_cubes.add(handle)
+        position = list(spec['position'])
+        self.object_descriptors[handle] = {
+            'size': list(spec['size']),
+            'position': position,
+            'color': list(spec['color']) if spec.get('color') else None,
+            'alias': spec.get('alias'),
+            'cell': self.transform.world_to_cell(position[0], position[1]),
+        }
+
+    def update_descriptor(self, handle, position):
+        """Actualiza la posición guardada de un cubo creado tras moverlo"""
+        descriptor = self.object_descriptors.get(handle)
+        if descriptor is not None:
+            descriptor['position'] = list(position)
+            descriptor['cell'] = self.transform.world_to_cell(position[0], position[1])
+
+    def recreate_objects(self, handles):
+        """
+        Recrea en un solo lote los cubos desaparecidos a partir de sus descriptores.
+
+        Args:
+            handles: Handles antiguos de los cubos que ya no existen
+
+        Returns:
+            dict: Handle antiguo -> handle nuevo de los cubos recreados (también en
+                  self.handle_remap, para que la interfaz actualice sus referencias)
+        """
+        old_handles = [handle for handle in handles if handle in self.object_descriptors]
+        if not old_handles:
+            return {}
+
+        descriptors = [self.object_descriptors.pop(handle) for handle in old_handles]
+        self.created_cubes.difference_update(old_handles)
+        specs = []
+        for descriptor in descriptors:
+            spec = {'size': descriptor['size'], 'position': descriptor['position']}
+            if descriptor['color']:
+                spec['color'] = descriptor['color']
+            if descriptor['alias']:
+                spec['alias'] = descriptor['alias']
+            specs.append(spec)
+
+        remap = {}
+        for old, new, descriptor in zip(old_handles, self.create_obstacles(specs), descriptors):
+            if new is None:
+                self.object_descriptors[old] = descriptor  # Se reintentará en el próximo inicio
+            else:
+                remap[old] = new
+        self.handle_remap.update(remap)
+        print(f"♻️ {len(remap)} de {len(old_handles)} objetos recreados")
+        return remap
+
+    def _remove_templates(self):
+        """
+        Elimina de la escena los cubos plantilla, tanto los conocidos como los que se
+        encuentran por su alias (TEMPLATE_ALIAS), p. ej. los de una conexión anterior o
+        los de una escena cargada, y vacía la tabla de plantillas.
+        """
+        templates = set(self.cube_templates.values())
+        self.cube_templates = {}
+        try:
+            index = self.scene_index
+            if not index.loaded:
+                index.load()
+            templates.update(handle for handle, alias in zip(index.handles.tolist(), index.aliases)
+                             if alias.rsplit('/', 1)[-1].split('[')[0] == self.TEMPLATE_ALIAS)
+            alive, _ = self.check_handles(templates)
+            if alive:
+                self.sim.removeObjects(sorted(alive))
+                index.discard(alive)
+                print(f"🧹 Se eliminaron {len(alive)} cubo(s) plantilla")
+        except Exception as e:
+            print(f"⚠️ No se pudieron eliminar los cubos plantilla: {e}")
+
+    def _template_key(self, spec):
+        color = tuple(round(c, 4) for c in spec['color']) if spec.get('color') else None
+        return tuple(round(s, 4) for s in spec['size']), color
+
+    def _create_from_templates(self, lua_specs):
+        """
+        Crea los cubos copiando una plantilla configurada por cada tamaño y color:
+        una petición para las plantillas que falten y otra para copiar y colocar todo.
+        """
+        groups = {}  # clave de plantilla -> índices de specs
+        for index, spec in enumerate(lua_specs):
+            groups.setdefault(self._template_key(spec), []).append(index)
+
+        # Crear de una vez las plantillas que aún no existen
+        missing = [key for key in groups if key not in self.cube_templates]
+        if missing:
+            template_specs = []
+            for key in missing:
+                size, color = key
+                template_spec = {'size': list(size), 'position': list(self.TEMPLATE_POSITION),
+                                 'alias': self.TEMPLATE_ALIAS}
+                if color:
+                    template_spec['color'] = list(color)
+                template_specs.append(template_spec)
+            for key, handle in zip(missing, self.call_helper('iaCreateCuboids', template_specs)):
+                if handle != -1:
+                    self.cube_templates[key] = handle
+
+        # Copiar y colocar todos los cubos con una sola petición
+        keys = [key for key in groups if key in self.cube_templates]
+        request = []
+        for key in keys:
+            positions = []
+            for index in groups[key]:
+                positions.extend(lua_specs[index]['position'])
+            request.append({'template': self.cube_templates[key], 'positions': positions,
+                            'aliases': [lua_specs[index].get('alias', '') for index in groups[key]]})
+        created = self.call_helper('iaInstantiateCuboids', request) if request else []
+
+        handles = [None] * len(lua_specs)
+        retry = []
+        for key, copies in zip(keys, created):
+            indices = groups[key]
+            if len(copies) != len(indices):
+                # La plantilla ya no existe (p. ej. se eliminó desde el simulador)
+                self.cube_templates.pop(key, None)
+                retry.extend(indices)
+                continue
+            for index, handle in zip(indices, copies):
+                handles[index] = handle
+        retry.extend(index for key in groups if key not in self.cube_templates and key not in keys
+                     for index in groups[key])
+
+        for handle, spec in zip(handles, lua_specs):
+            if handle is not None:
+                self._track_created(handle, spec)
+        print(f"✅ {len(lua_specs) - len(retry)} obstáculos instanciados desde "
+              f"{len(self.cube_templates)} plantilla(s)")
+
+        if retry:
+            retried = self.create_obstacles([lua_specs[index] for index in retry], mode='batch')
+            for index, handle in zip(retry, retried):
+                handles[index] = handle
+        return handles
+
     def test_connection(self):
         """Prueba la conexión enviando una solicitud simple"""
         if not self.connected:
@@ -539,17 +1571,12 @@ class CoppeliaSimController:
             return False
         
         try:
-            # Intentar establecer el alias/nombre
-            # Nota: Algunas versiones de CoppeliaSim usan setObjectName en lugar de setObjectAlias
-            try:
-                self.sim.setObjectAlias(handle, alias)
-            except:
-                # Intentar con setObjectName si setObjectAlias no está disponible
-                try:
-                    self.sim.setObjectName(handle, alias)
-                except:
-                    print("⚠️ No se pudo establecer el nombre del objeto")
-                    return False
+            # Algunas versiones de CoppeliaSim usan setObjectName en lugar de setObjectAlias;
+            # la función adecuada se eligió al conectar
+            if self.capabilities and not self.capabilities.get('set_alias'):
+                print("⚠️ No se pudo establecer el nombre del objeto")
+                return False
+            self.set_alias(handle, alias)
             return True
         except Exception as e:
             print(f"⚠️ Error al establecer alias: {e}")
@@ -566,39 +1593,26 @@ class CoppeliaSimController:
         try:
             print("Limpiando escena...")
             
-            # Lista de objetos que queremos preservar (no eliminar)
-            preserved_objects = ["Floor", "DefaultCamera", "DefaultLight", "ResizableFloor"]
-            preserved_handles = []
+            # Objetos que queremos preservar (no eliminar), junto con sus hijos
+            preserved_objects = {"Floor", "DefaultCamera", "DefaultLight", "ResizableFloor"}
             
-            # Obtener handles de objetos a preservar
-            for obj_name in preserved_objects:
-                try:
-                    handle = self.sim.getObject(obj_name)
-                    preserved_handles.append(handle)
-                    print(f"Preservando objeto: {obj_name}")
-                except:
-                    pass
+            # Una sola consulta con todos los handles y sus rutas
+            all_objects, preserved_handles = self._scene_handles_to_preserve(preserved_objects)
+            print(f"Encontrados {len(all_objects)} objetos en total, {len(preserved_handles)} preservados")
             
-            # Obtener todos los objetos
-            all_objects = self.sim.getObjects()
-            print(f"Encontrados {len(all_objects)} objetos en total")
+            # Eliminar de una vez todos los objetos excepto los preservados
+            to_remove = set(all_objects) - preserved_handles
+            if to_remove:
+                self.sim.removeObjects(list(to_remove))
+            removed_count = len(to_remove)
+            self.created_cubes.clear()
             
-            # Eliminar objetos excepto los preservados
-            removed_count = 0
-            for obj in all_objects:
-                if obj not in preserved_handles:
-                    try:
-                        obj_name = "<sin nombre>"
-                        try:
-                            obj_name = self.sim.getObjectName(obj)
-                        except:
-                            pass
-                        
-                        self.sim.removeObject(obj)
-                        removed_count += 1
-                        print(f"Eliminado objeto: {obj_name}")
-                    except Exception as e:
-                        print(f"Error al eliminar objeto {obj}: {e}")
+            # Los handles del robot pudieron quedar invalidados
+            self.invalidate_robot_handles()
+            self.nav_target_handle = None
+            self.scene_index.clear()
+            self.cube_templates = {}  # Las plantillas se eliminaron con el resto de objetos
+            self.object_descriptors = {}
             
             print(f"✅ Escena limpiada: {removed_count} objetos eliminados")
             return True
@@ -609,6 +1623,36 @@ class CoppeliaSimController:
             traceback.print_exc()
             return False
         
+    def _scene_handles_to_preserve(self, names):
+        """
+        Devuelve todos los handles de la escena y los que pertenecen (ellos o alguno de
+        sus padres) a los objetos con los nombres indicados.
+        
+        Returns:
+            tuple: (lista de handles de la escena, conjunto de handles a preservar)
+        """
+        def base_name(part):
+            return part.split('[')[0]  # Sin el índice, p. ej. 'Floor[0]'
+        
+        if self.capabilities.get('executeScriptString') and self.capabilities.get('callScriptFunction'):
+            try:
+                handles, aliases = self.call_helper('iaSceneInfo')[:2]
+                preserved = {handle for handle, alias in zip(handles, aliases)
+                             if any(base_name(part) in names for part in alias.split('/') if part)}
+                return list(handles), preserved
+            except Exception as e:
+                print(f"⚠️ No se pudo consultar la escena en una sola petición: {e}")
+        
+        # Sin script sandbox: todos los handles y cada objeto preservado con su árbol
+        handles = self.sim.getObjectsInTree(self.sim.handle_scene)
+        preserved = set()
+        for name in names:
+            try:
+                preserved.update(self.sim.getObjectsInTree(self.sim.getObject('/' + name)))
+            except Exception:
+                pass
+        return list(handles), preserved
+    
     def send_command_to_coppelia(self, command):
         """
         Envía un comando al script principal en CoppeliaSim.
@@ -621,6 +1665,7 @@ class CoppeliaSimController:
         """
         if not self.connected:
             print("❌ No se puede enviar comando: no hay conexión activa")
+            self._queue_command(command)
             return False
         
         try:
@@ -632,7 +1677,15 @@ class CoppeliaSimController:
             return True
         except Exception as e:
             print(f"❌ Error al enviar comando: {e}")
+            self._queue_command(command)
             return False
+    
+    def _queue_command(self, command):
+        """Guarda el comando para reenviarlo tras reconectar, si es seguro hacerlo"""
+        if self.heartbeat_stop is None or command.get('action') not in self.REPLAYABLE_ACTIONS:
+            return
+        self.pending_commands[command['action']] = command
+        print(f"⏳ Comando '{command['action']}' pendiente de reenvío tras reconectar")
 
     def update_object_handles(self):
         """
@@ -731,7 +1784,7 @@ class CoppeliaSimController:
         Args:
             start_pos: Tupla (row, col) con la posición inicial (no utilizada ya que el robot ya está en la escena)
             end_pos: Tupla (row, col) con la posición final deseada
-            obstacles: Lista de obstáculos (opcional, no utilizada en esta implementación)
+            obstacles: Celdas (fila, columna) ocupadas que evita el control directo (opcional)
         """
         if not self.connected:
             print("❌ No se puede ejecutar recorrido: no hay conexión activa")
@@ -741,11 +1794,8 @@ class CoppeliaSimController:
         
         try:
             # 1. Convertir coordenadas de cuadrícula a coordenadas CoppeliaSim
-            reference_scale = 0.5
-            
             # Calcular la posición objetivo
-            end_x = (end_pos[1] - 5 + 0.5) * reference_scale
-            end_y = (5 - end_pos[0] - 0.5) * reference_scale
+            end_x, end_y = self.transform.cell_to_world(*end_pos)
             end_z = 0.075  # Altura del cilindro blanco
             target_position = [end_x, end_y, end_z]
             
@@ -829,10 +1879,10 @@ class CoppeliaSimController:
             if not target_handle:
                 try:
                     print("Creando un nuevo objetivo visual...")
-                    target_handle = self.sim.createPrimitiveShape(2, [0.1, 0.1, 0.05])  # 2 = cilindro
+                    target_handle = self.create_shape('cylinder', [0.1, 0.1, 0.05])
                     self.sim.setObjectPosition(target_handle, -1, target_position)
                     self.sim.setShapeColor(target_handle, 0, 0, [1, 1, 1])  # Color blanco
-                    self.sim.setObjectAlias(target_handle, "Target")
+                    self.set_alias(target_handle, "Target")
                     print(f"Objetivo creado con handle: {target_handle}")
                 except Exception as e:
                     print(f"❌ Error al crear objetivo: {e}")
@@ -929,138 +1979,16 @@ class CoppeliaSimController:
             if not success:
                 print("Implementando control directo como último recurso...")
                 
-                # Buscar motores del robot
-                motors = []
+                # Obtener motores del robot (resueltos una vez y guardados en caché)
+                robot = self.get_robot_handles(robot_handle)
                 
-                try:
-                    # Obtener objetos hijos del robot
-                    children = self.sim.getObjectsInTree(robot_handle)
-                    
-                    # Buscar motores entre los hijos
-                    for child in children:
-                        try:
-                            # Verificar si es un joint (articulación/motor)
-                            obj_type = self.sim.getObjectType(child)
-                            if obj_type == 1:  # 1 = joint
-                                motors.append(child)
-                                name = self.sim.getObjectName(child)
-                                print(f"Motor encontrado: {name}")
-                        except:
-                            pass
-                except Exception as e:
-                    print(f"Error al buscar motores: {e}")
-                
-                # Si encontramos al menos 2 motores, implementar navegación directa
-                if len(motors) >= 2:
-                    left_motor = motors[0]
-                    right_motor = motors[1]
-                    
-                    # Iniciar navegación en un hilo separado
-                    import threading
-                    import time
-                    import math
-                    
-                    # Variable de control para el hilo
-                    self.navigation_active = True
-                    
-                    def navigation_controller():
-                        """Controlador simple de navegación directa"""
-                        print("🚀 Iniciando navegación directa")
-                        
-                        try:
-                            # Variables para control
-                            max_velocity = 2.0  # Velocidad máxima de los motores
-                            distance_threshold = 0.3  # Distancia para considerar llegada (metros)
-                            
-                            # Bucle de navegación
-                            while self.navigation_active:
-                                try:
-                                    # Obtener posiciones actuales
-                                    robot_pos = self.sim.getObjectPosition(robot_handle, -1)
-                                    target_pos = self.sim.getObjectPosition(target_handle, -1)
-                                    robot_orient = self.sim.getObjectOrientation(robot_handle, -1)
-                                    robot_angle = robot_orient[2]  # Yaw (rotación en Z)
-                                    
-                                    # Calcular vector y distancia al objetivo
-                                    dx = target_pos[0] - robot_pos[0]
-                                    dy = target_pos[1] - robot_pos[1]
-                                    distance = math.sqrt(dx*dx + dy*dy)
-                                    
-                                    print(f"Distancia al objetivo: {distance:.2f}m")
-                                    
-                                    # Verificar llegada al objetivo
-                                    if distance < distance_threshold:
-                                        print("🏁 Objetivo alcanzado")
-                                        # Detener motores
-                                        self.sim.setJointTargetVelocity(left_motor, 0)
-                                        self.sim.setJointTargetVelocity(right_motor, 0)
-                                        self.navigation_active = False
-                                        break
-                                    
-                                    # Calcular ángulo hacia el objetivo
-                                    target_angle = math.atan2(dy, dx)
-                                    
-                                    # Calcular error de orientación
-                                    orientation_error = target_angle - robot_angle
-                                    
-                                    # Normalizar a [-pi, pi]
-                                    while orientation_error > math.pi:
-                                        orientation_error -= 2 * math.pi
-                                    while orientation_error < -math.pi:
-                                        orientation_error += 2 * math.pi
-                                    
-                                    print(f"Ángulo al objetivo: {target_angle:.2f}, Error: {orientation_error:.2f}")
-                                    
-                                    # Determinar velocidades de los motores
-                                    if abs(orientation_error) > 0.3:  # Si hay error grande de orientación
-                                        # Girar en su lugar
-                                        if orientation_error > 0:  # Girar a la izquierda
-                                            left_velocity = -max_velocity * 0.5
-                                            right_velocity = max_velocity * 0.5
-                                        else:  # Girar a la derecha
-                                            left_velocity = max_velocity * 0.5
-                                            right_velocity = -max_velocity * 0.5
-                                        print("Girando para orientarse al objetivo")
-                                    else:
-                                        # Avanzar con corrección de dirección
-                                        forward_speed = max_velocity * min(1.0, distance)
-                                        steering = orientation_error * 1.5
-                                        
-                                        left_velocity = forward_speed - steering
-                                        right_velocity = forward_speed + steering
-                                        print(f"Avanzando hacia objetivo: L={left_velocity:.2f}, R={right_velocity:.2f}")
-                                    
-                                    # Aplicar velocidades a los motores
-                                    self.sim.setJointTargetVelocity(left_motor, left_velocity)
-                                    self.sim.setJointTargetVelocity(right_motor, right_velocity)
-                                    
-                                except Exception as loop_error:
-                                    print(f"Error en bucle de navegación: {loop_error}")
-                                
-                                # Pausa breve
-                                time.sleep(0.1)
-                            
-                            print("✅ Navegación finalizada")
-                            
-                        except Exception as e:
-                            print(f"❌ Error en controlador de navegación: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            
-                        finally:
-                            # Asegurar que los motores se detengan
-                            try:
-                                if left_motor and right_motor:
-                                    self.sim.setJointTargetVelocity(left_motor, 0)
-                                    self.sim.setJointTargetVelocity(right_motor, 0)
-                                    print("Motores detenidos")
-                            except:
-                                pass
-                    
-                    # Iniciar el hilo de navegación
-                    nav_thread = threading.Thread(target=navigation_controller)
-                    nav_thread.daemon = True
-                    nav_thread.start()
+                # Si encontramos los motores, implementar navegación directa
+                if robot is not None:
+                    # Seguir el camino planificado; el final sigue al objetivo si se mueve
+                    robot_pos = self.sim.getObjectPosition(robot.body, -1)
+                    target_pos = self.sim.getObjectPosition(target_handle, -1)
+                    self.follow_waypoints(robot, self.path_waypoints(robot_pos, target_pos, obstacles),
+                                          goal_handle=target_handle, goal_tolerance=0.3)
                     
                     success = True
                     print("✅ Control directo iniciado")
@@ -1094,7 +2022,7 @@ class CoppeliaSimController:
             
             # Crear un cilindro blanco
             size = [0.1, 0.1, 0.05]  # Diámetro x, diámetro y, altura
-            target_handle = self.sim.createPrimitiveShape(2, 18, size)  # 2 = cilindro
+            target_handle = self.create_shape('cylinder', size)
             
             # Establecer la posición
             self.sim.setObjectPosition(target_handle, -1, position)
@@ -1103,7 +2031,7 @@ class CoppeliaSimController:
             self.sim.setShapeColor(target_handle, 0, 0, [1, 1, 1])
             
             # Establecer alias para fácil referencia
-            self.sim.setObjectAlias(target_handle, "Target")
+            self.set_alias(target_handle, "Target")
             
             print(f"✅ Punto objetivo creado con handle: {target_handle}")
             return {'success': True, 'handle': target_handle}
@@ -1175,152 +2103,15 @@ class CoppeliaSimController:
             
             print(f"Iniciando navegación desde {robot_pos} hacia {target_pos}")
             
-            # Buscar motores del robot
-            motors = []
-            
-            try:
-                # Obtener objetos hijos del robot
-                children = self.sim.getObjectsInTree(robot_handle)
-                
-                # Buscar motores entre los hijos
-                for child in children:
-                    try:
-                        name = self.sim.getObjectName(child)
-                        if "motor" in name.lower() or "wheel" in name.lower() or "joint" in name.lower():
-                            motors.append(child)
-                            print(f"Motor encontrado: {name}")
-                    except:
-                        pass
-            except Exception as e:
-                print(f"Error al buscar motores: {e}")
-            
-            # Si no encontramos los motores por nombre, buscarlos por tipo
-            if len(motors) < 2:
-                try:
-                    children = self.sim.getObjectsInTree(robot_handle)
-                    for child in children:
-                        try:
-                            obj_type = self.sim.getObjectType(child)
-                            if obj_type == 1:  # 1 = joint
-                                motors.append(child)
-                        except:
-                            pass
-                    print(f"Encontrados {len(motors)} motores por tipo de objeto")
-                except:
-                    pass
-            
-            # Si aún no tenemos suficientes motores, fallar
-            if len(motors) < 2:
+            # Obtener motores del robot (resueltos una vez y guardados en caché)
+            robot = self.get_robot_handles(robot_handle)
+            if robot is None:
                 print("❌ No se encontraron suficientes motores para el robot")
                 return False
             
-            # Seleccionar los dos primeros motores como izquierdo y derecho
-            left_motor = motors[0]
-            right_motor = motors[1]
-            
-            # Iniciar navegación en un hilo separado
-            import threading
-            import time
-            import math
-            
-            # Variable de control para el hilo
-            self.navigation_active = True
-            
-            def navigation_controller():
-                """Controlador simple de navegación directa"""
-                print("🚀 Iniciando navegación")
-                
-                try:
-                    # Variables para control
-                    max_velocity = 2.0  # Velocidad máxima
-                    distance_threshold = 0.3  # Distancia para considerar llegada
-                    
-                    # Bucle de navegación
-                    while self.navigation_active:
-                        try:
-                            # Obtener posiciones actuales
-                            robot_pos = self.sim.getObjectPosition(robot_handle, -1)
-                            target_pos = self.sim.getObjectPosition(target_handle, -1)
-                            robot_orient = self.sim.getObjectOrientation(robot_handle, -1)
-                            robot_angle = robot_orient[2]  # Yaw (rotación en Z)
-                            
-                            # Calcular vector al objetivo
-                            dx = target_pos[0] - robot_pos[0]
-                            dy = target_pos[1] - robot_pos[1]
-                            distance = math.sqrt(dx*dx + dy*dy)
-                            
-                            print(f"Distancia al objetivo: {distance:.2f}m")
-                            
-                            # Verificar llegada
-                            if distance < distance_threshold:
-                                print("🏁 Objetivo alcanzado")
-                                self.sim.setJointTargetVelocity(left_motor, 0)
-                                self.sim.setJointTargetVelocity(right_motor, 0)
-                                self.navigation_active = False
-                                break
-                            
-                            # Calcular ángulo al objetivo
-                            target_angle = math.atan2(dy, dx)
-                            
-                            # Calcular error de orientación
-                            orientation_error = target_angle - robot_angle
-                            
-                            # Normalizar a [-pi, pi]
-                            while orientation_error > math.pi:
-                                orientation_error -= 2 * math.pi
-                            while orientation_error < -math.pi:
-                                orientation_error += 2 * math.pi
-                            
-                            print(f"Ángulo al objetivo: {target_angle:.2f}, Error: {orientation_error:.2f}")
-                            
-                            # Determinar velocidades
-                            if abs(orientation_error) > 0.3:
-                                # Girar en su lugar
-                                if orientation_error > 0:
-                                    left_velocity = -max_velocity * 0.5
-                                    right_velocity = max_velocity * 0.5
-                                else:
-                                    left_velocity = max_velocity * 0.5
-                                    right_velocity = -max_velocity * 0.5
-                                print("Girando para orientarse al objetivo")
-                            else:
-                                # Avanzar con corrección
-                                forward_speed = max_velocity * min(1.0, distance)
-                                steering = orientation_error * 1.5
-                                
-                                left_velocity = forward_speed - steering
-                                right_velocity = forward_speed + steering
-                                print(f"Avanzando hacia objetivo: L={left_velocity:.2f}, R={right_velocity:.2f}")
-                            
-                            # Aplicar velocidades
-                            self.sim.setJointTargetVelocity(left_motor, left_velocity)
-                            self.sim.setJointTargetVelocity(right_motor, right_velocity)
-                            
-                        except Exception as e:
-                            print(f"Error en bucle de navegación: {e}")
-                        
-                        time.sleep(0.1)
-                    
-                    print("✅ Navegación finalizada")
-                    
-                except Exception as e:
-                    print(f"❌ Error en controlador de navegación: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    
-                finally:
-                    # Detener motores
-                    try:
-                        self.sim.setJointTargetVelocity(left_motor, 0)
-                        self.sim.setJointTargetVelocity(right_motor, 0)
-                        print("Motores detenidos")
-                    except:
-                        pass
-            
-            # Iniciar el hilo de navegación
-            nav_thread = threading.Thread(target=navigation_controller)
-            nav_thread.daemon = True
-            nav_thread.start()
+            # Navegación pure-pursuit desde la posición actual, siguiendo al objetivo si se mueve
+            self.follow_waypoints(robot, [robot_pos[:2], target_pos[:2]], goal_handle=target_handle,
+                                  goal_tolerance=0.3)
             
             print("✅ Navegación iniciada")
             return True
@@ -1557,17 +2348,21 @@ class CoppeliaSimController:
                 "navigationStatus", "targetPose"
             ]
             
+            # Último valor visto de cada señal, para informar solo de los cambios
+            last_values = {}
+            
             while time.time() - start_time < duration:
                 for signal_name in signal_names:
                     try:
                         signal_value = self.sim.getStringSignal(signal_name)
-                        if signal_value:
+                        if signal_value and signal_value != last_values.get(signal_name):
+                            last_values[signal_name] = signal_value
                             # Intentar desempaquetar la tabla
                             try:
                                 unpacked = self.sim.unpackTable(signal_value)
-                                print(f"Señal '{signal_name}': {unpacked}")
+                                self.log.log(f"signal:{signal_name}", f"Señal '{signal_name}': {unpacked}")
                             except:
-                                print(f"Señal '{signal_name}' recibida (formato no tabla)")
+                                self.log.log(f"signal:{signal_name}", f"Señal '{signal_name}' recibida (formato no tabla)")
                     except:
                         pass
                 
@@ -1608,9 +2403,7 @@ class CoppeliaSimController:
             print("✅ Punto B marcado en la cuadrícula")
             
             # 2. Convertir a coordenadas de CoppeliaSim
-            reference_scale = float(self.scale_combo.currentText())
-            end_x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-            end_y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+            end_x, end_y = self.transform.cell_to_world(row, col)
             end_z = 0.075  # Altura del objetivo
             
             target_position = [end_x, end_y, end_z]
@@ -65,11 +65,7 @@ class CoppeliaSimWorker(QThread):
             self.progress_update.emit(50)
             
             # Crear el robot
-            if hasattr(self.controller, 'create_robot'):
-                result = self.controller.create_robot(robot_type, position, orientation)
-            else:
-                # Implementación alternativa si el método no existe
-                result = self._create_robot(robot_type, position, orientation)
+            result = self._create_robot(robot_type, position, orientation)
             
             self.progress_update.emit(75)
             
@@ -103,34 +99,40 @@ class CoppeliaSimWorker(QThread):
             self.progress_update.emit(100)
 
     def _create_robot(self, robot_type, position, orientation):
-        """Método alternativo para crear un robot en CoppeliaSim"""
+        """Carga el modelo de un robot en CoppeliaSim (o un cubo rojo si no se encuentra)"""
         try:
             # Intentar cargar el modelo del robot
             if robot_type.startswith('/'):
                 robot_type = robot_type[1:]  # Eliminar barra inicial si existe
                 
-            # Construir ruta al modelo
-            model_path = f"models/robots/mobile/{robot_type}.ttm"
+            # Rutas candidatas al modelo; si ya se conoce la que funciona en este
+            # CoppeliaSim (guardada en la tabla de capacidades) se prueba primero
+            capabilities = self.controller.capabilities
+            templates = [
+                "models/robots/mobile/{name}.ttm",
+                "models/mobile/{name}.ttm",
+                "models/robots/{name}.ttm",
+                "{name}.ttm",
+            ]
+            known_template = capabilities.get('model_path')
+            if known_template:
+                templates = [known_template] + [t for t in templates if t != known_template]
             
             # Cargar el modelo
-            try:
-                robot_handle = self.controller.sim.loadModel(model_path)
-                print(f"Modelo cargado con handle: {robot_handle}")
-            except:
-                # Intentar rutas alternativas
+            robot_handle = None
+            for template in templates:
                 try:
-                    robot_handle = self.controller.sim.loadModel(f"models/mobile/{robot_type}.ttm")
-                except:
-                    try:
-                        robot_handle = self.controller.sim.loadModel(f"models/robots/{robot_type}.ttm")
-                    except:
-                        try:
-                            robot_handle = self.controller.sim.loadModel(f"{robot_type}.ttm")
-                        except Exception as e:
-                            print(f"Error al cargar modelo: {e}")
-                            # Crear un cubo rojo como representación visual
-                            robot_handle = self.controller.sim.createPrimitiveShape(0, 18, [0.3, 0.4, 0.2])
-                            self.controller.sim.setShapeColor(robot_handle, None, 0, [1, 0, 0])  # Color rojo
+                    robot_handle = self.controller.sim.loadModel(template.format(name=robot_type))
+                    capabilities['model_path'] = template
+                    print(f"Modelo cargado con handle: {robot_handle}")
+                    break
+                except Exception as e:
+                    print(f"Error al cargar modelo desde {template.format(name=robot_type)}: {e}")
+            
+            if robot_handle is None:
+                # Crear un cubo rojo como representación visual
+                robot_handle = self.controller.create_shape('cuboid', [0.3, 0.4, 0.2])
+                self.controller.sim.setShapeColor(robot_handle, None, 0, [1, 0, 0])  # Color rojo
             
             # Establecer la posición del robot
             if robot_handle:
@@ -213,7 +215,7 @@ class CoppeliaSimWorker(QThread):
         
         try:
             # Probar la conexión
-            success = self.controller.test_connection() if hasattr(self.controller, 'test_connection') else False
+            success = self.controller.test_connection()
             
             self.progress_update.emit(75)
             
@@ -262,7 +264,7 @@ class CoppeliaSimWorker(QThread):
         self.progress_update.emit(25)
         
         try:
-            success = self.controller.suspend_simulation() if hasattr(self.controller, 'suspend_simulation') else False
+            success = self.controller.suspend_simulation()
             
             self.progress_update.emit(75)
             
@@ -317,19 +319,17 @@ class CoppeliaSimWorker(QThread):
             self.progress_update.emit(50)
             
             # Eliminar el robot
-            result = self.controller.remove_robot(handle) if hasattr(self.controller, 'remove_robot') else None
-            
-            if result is None:
-                # Implementar eliminación básica si el método no existe
-                try:
-                    self.controller.sim.removeObject(handle)
-                    result = {'success': True}
-                except Exception as e:
-                    result = {'success': False, 'error': str(e)}
+            try:
+                self.controller.sim.removeObject(handle)
+                result = {'success': True}
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
             
             self.progress_update.emit(75)
             
             if result.get('success', False):
+                # El descriptor en caché del robot eliminado ya no es válido
+                self.controller.invalidate_robot_handles(handle)
                 self.operation_result.emit(True, "Robot eliminado correctamente")
                 self.operation_complete.emit('remove_robot', {'success': True, 'handle': handle})
             else:
@@ -393,14 +393,7 @@ class CoppeliaSimWorker(QThread):
             self.progress_update.emit(50)
             
             # Eliminar el cubo
-            if hasattr(self.controller, 'eliminar_cubo_por_handle'):
-                result = self.controller.eliminar_cubo_por_handle(handle)
-            else:
-                try:
-                    self.controller.sim.removeObject(handle)
-                    result = True
-                except:
-                    result = False
+            result = self.controller.eliminar_cubo_por_handle(handle)
             
             self.progress_update.emit(75)
             
@@ -0,0 +1,615 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+
+# Opciones de socket de ZeroMQ que usa CoppeliaSimController.call() (valores de libzmq)
+ZMQ_LINGER = 17
+ZMQ_RCVTIMEO = 27
+
+# Ángulos (grados) de los 16 sonares del Pioneer P3DX respecto al frente del robot
+PIONEER_SONAR_ANGLES = [90, 50, 30, 10, -10, -30, -50, -90,
+                        -90, -130, -150, -170, 170, 150, 130, 90]
+
+
+class FakeSim:
+    """
+    Simulador en memoria que implementa el subconjunto de la API 'sim' que usa este
+    proyecto: objetos y poses, formas, señales, packTable, velocidades de
+    articulación con integración de tracción diferencial y las funciones Lua de
+    SimHelpers (emuladas en Python a través de callScriptFunction).
+
+    Permite probar y medir el controlador sin CoppeliaSim: se conecta con
+    FakeRemoteAPIClient.factory(fake_sim) como client_factory del controlador y
+    cada llamada puede sufrir una latencia y una variación configurables.
+    """
+
+    # Constantes de la API (mismos valores que CoppeliaSim)
+    handle_world = -1
+    handle_scene = -12
+    handle_all = -2
+    object_shape_type = 0
+    object_joint_type = 1
+    object_dummy_type = 4
+    object_type_dummy = 4
+    object_proximitysensor_type = 5
+    primitiveshape_cuboid = 3
+    primitiveshape_cylinder = 5
+    shapeintparam_static = 3003
+    shapeintparam_respondable = 3004
+    objectspecialproperty_collidable = 1
+    objectspecialproperty_measurable = 2
+    objectspecialproperty_detectable_all = 496
+    colorcomponent_ambient_diffuse = 0
+    boolparam_display_enabled = 16
+    scripttype_mainscript = 0
+    scripttype_childscript = 1
+    scripttype_sandboxscript = 8
+    simulation_stopped = 0
+    simulation_paused = 8
+    simulation_advancing_running = 17
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=None, step=0.05, sonar_range=1.0,
+                 latencies=None, serial=False):
+        """
+        Args:
+            latency: Retardo fijo (s) añadido a cada llamada
+            jitter: Retardo aleatorio máximo (s) sumado a la latencia
+            seed: Semilla del generador aleatorio, para resultados reproducibles
+            step: Paso máximo (s) de la integración de los robots
+            sonar_range: Alcance (m) de los sensores de proximidad
+            latencies: Diccionario función -> retardo (s) que sustituye a 'latency'
+                       para esa función (p. ej. {'loadScene': 2.0})
+            serial: Atender las llamadas de una en una, como el servidor ZeroMQ de
+                    CoppeliaSim: una llamada lenta retrasa las de los demás clientes
+        """
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.serial = serial
+        self.server_lock = threading.Lock()
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.step = step
+        self.sonar_range = sonar_range
+        self.lock = threading.RLock()
+        self.objects = {}  # handle -> diccionario con el estado del objeto
+        self.robots = {}  # handle del cuerpo -> parámetros de tracción diferencial
+        self.signals = {}
+        self.bool_params = {self.boolparam_display_enabled: True}
+        self.installed_functions = set()
+        self.call_counts = {}
+        self.state = self.simulation_stopped
+        self.sim_time = 0.0
+        self._next_handle = 10
+        self._last_advance = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Infraestructura
+    # ------------------------------------------------------------------
+
+    def delay(self, name=None):
+        """Retardo simulado de una llamada a la función 'name'"""
+        latency = self.latencies.get(name, self.latency)
+        if self.jitter:
+            return latency + self.random.uniform(0, self.jitter)
+        return latency
+
+    def count(self, name):
+        with self.lock:
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+
+    def _new_object(self, obj_type, alias, parent=-1, position=None, size=None):
+        with self.lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self.objects[handle] = {
+                'type': obj_type,
+                'alias': alias,
+                'parent': parent,
+                'position': list(position or [0.0, 0.0, 0.0]),
+                'orientation': [0.0, 0.0, 0.0],
+                'size': list(size or [0.0, 0.0, 0.0]),
+                'color': [0.5, 0.5, 0.5],
+                'int_params': {},
+                'special': 0,
+                'velocity': 0.0,
+            }
+            return handle
+
+    def _get(self, handle):
+        obj = self.objects.get(handle)
+        if obj is None:
+            raise Exception(f"Object does not exist ({handle})")
+        return obj
+
+    def _children(self, handle):
+        return [h for h, obj in self.objects.items() if obj['parent'] == handle]
+
+    def _tree(self, handle):
+        result = [handle]
+        for child in self._children(handle):
+            result.extend(self._tree(child))
+        return result
+
+    def _path(self, handle):
+        parts = []
+        while handle != -1:
+            obj = self._get(handle)
+            parts.append(obj['alias'])
+            handle = obj['parent']
+        return '/' + '/'.join(reversed(parts))
+
+    def _advance(self):
+        """Avanza la simulación según el tiempo real transcurrido desde la última llamada"""
+        now = time.monotonic()
+        with self.lock:
+            elapsed = now - self._last_advance
+            self._last_advance = now
+            if self.state != self.simulation_advancing_running:
+                return
+            while elapsed > 1e-9:
+                dt = min(elapsed, self.step)
+                self._integrate(dt)
+                self.sim_time += dt
+                elapsed -= dt
+
+    def _integrate(self, dt):
+        for body, robot in self.robots.items():
+            obj = self.objects.get(body)
+            left = self.objects.get(robot['left'])
+            right = self.objects.get(robot['right'])
+            if obj is None or left is None or right is None:
+                continue
+            v_left = left['velocity'] * robot['wheel_radius']
+            v_right = right['velocity'] * robot['wheel_radius']
+            v = (v_left + v_right) / 2.0
+            w = (v_right - v_left) / robot['wheel_base']
+            yaw = obj['orientation'][2]
+            obj['position'][0] += v * math.cos(yaw) * dt
+            obj['position'][1] += v * math.sin(yaw) * dt
+            obj['orientation'][2] = math.atan2(math.sin(yaw + w * dt), math.cos(yaw + w * dt))
+
+    # ------------------------------------------------------------------
+    # Construcción de escenas
+    # ------------------------------------------------------------------
+
+    def add_robot(self, alias="PioneerP3DX", position=(0.0, 0.0, 0.1388), yaw=0.0,
+                  wheel_radius=0.0975, wheel_base=0.331):
+        """
+        Añade un robot de tracción diferencial con dos motores y 16 sonares.
+
+        Returns:
+            int: Handle del cuerpo del robot
+        """
+        body = self._new_object(self.object_shape_type, alias, position=list(position),
+                                size=[0.45, 0.38, 0.24])
+        self.objects[body]['orientation'][2] = yaw
+        left = self._new_object(self.object_joint_type, "leftMotor", parent=body)
+        right = self._new_object(self.object_joint_type, "rightMotor", parent=body)
+        for i, angle in enumerate(PIONEER_SONAR_ANGLES):
+            sensor = self._new_object(self.object_proximitysensor_type, f"ultrasonicSensor[{i}]", parent=body)
+            self.objects[sensor]['angle'] = math.radians(angle)
+        self.robots[body] = {'left': left, 'right': right,
+                             'wheel_radius': wheel_radius, 'wheel_base': wheel_base}
+        return body
+
+    # ------------------------------------------------------------------
+    # Simulación y objetos
+    # ------------------------------------------------------------------
+
+    def getSimulationState(self):
+        self._advance()
+        return self.state
+
+    def getSimulationTime(self):
+        self._advance()
+        return self.sim_time
+
+    def startSimulation(self):
+        self._advance()
+        self.state = self.simulation_advancing_running
+        return 1
+
+    def pauseSimulation(self):
+        self._advance()
+        self.state = self.simulation_paused
+        return 1
+
+    def stopSimulation(self):
+        self._advance()
+        self.state = self.simulation_stopped
+        for obj in self.objects.values():
+            obj['velocity'] = 0.0
+        return 1
+
+    def getBoolParam(self, param):
+        return self.bool_params.get(param, False)
+
+    def setBoolParam(self, param, value):
+        self.bool_params[param] = bool(value)
+
+    def isHandle(self, handle):
+        return handle in self.objects
+
+    def getObject(self, path, options=None):
+        parts = [p for p in path.split('/') if p]
+        with self.lock:
+            candidates = [h for h, obj in self.objects.items() if parts and obj['alias'] == parts[0]]
+            for part in parts[1:]:
+                candidates = [c for h in candidates for c in self._tree(h)[1:]
+                              if self.objects[c]['alias'] == part]
+        if not candidates:
+            raise Exception(f"object does not exist: {path}")
+        return candidates[0]
+
+    def getObjects(self, index=None, obj_type=None):
+        handles = sorted(self.objects)
+        if index is None:
+            return handles
+        if obj_type is not None and obj_type != self.handle_all:
+            handles = [h for h in handles if self.objects[h]['type'] == obj_type]
+        return handles[index] if 0 <= index < len(handles) else -1
+
+    def getObjectsInTree(self, base, obj_type=None, options=0):
+        with self.lock:
+            if base == self.handle_scene:
+                handles = sorted(self.objects)
+            else:
+                handles = self._tree(base)
+                if options & 1:
+                    handles = handles[1:]
+                if options & 2:
+                    handles = [h for h in handles if self.objects[h]['parent'] == base]
+        if obj_type is not None and obj_type != self.handle_all:
+            handles = [h for h in handles if self.objects[h]['type'] == obj_type]
+        return handles
+
+    def getObjectType(self, handle):
+        return self._get(handle)['type']
+
+    def getObjectAlias(self, handle, options=-1):
+        if options in (1, 2):
+            return self._path(handle)
+        return self._get(handle)['alias']
+
+    def getObjectName(self, handle):
+        return self._get(handle)['alias']
+
+    def setObjectAlias(self, handle, alias):
+        self._get(handle)['alias'] = alias
+
+    def getObjectPosition(self, handle, relative_to=-1):
+        self._advance()
+        return list(self._get(handle)['position'])
+
+    def setObjectPosition(self, handle, relative_to, position):
+        self._get(handle)['position'] = list(position)
+
+    def getObjectOrientation(self, handle, relative_to=-1):
+        self._advance()
+        return list(self._get(handle)['orientation'])
+
+    def setObjectOrientation(self, handle, relative_to, orientation):
+        self._get(handle)['orientation'] = list(orientation)
+
+    def createPrimitiveShape(self, shape_type, size, options=0):
+        alias = "Cylinder" if shape_type == self.primitiveshape_cylinder else "Cuboid"
+        return self._new_object(self.object_shape_type, alias, size=size)
+
+    def createDummy(self, size=0.01):
+        return self._new_object(self.object_dummy_type, "Dummy", size=[size, size, size])
+
+    def getShapeBB(self, handle):
+        return list(self._get(handle)['size'])
+
+    def setShapeColor(self, handle, color_name, component, color):
+        self._get(handle)['color'] = list(color)
+
+    def getShapeColor(self, handle, color_name, component):
+        return 1, list(self._get(handle)['color'])
+
+    def setObjectSpecialProperty(self, handle, value):
+        self._get(handle)['special'] = value
+
+    def setObjectInt32Param(self, handle, param, value):
+        self._get(handle)['int_params'][param] = value
+
+    def getObjectInt32Param(self, handle, param):
+        return self._get(handle)['int_params'].get(param, 0)
+
+    def copyPasteObjects(self, handles, options=0):
+        copies = []
+        with self.lock:
+            for handle in handles:
+                original = self._get(handle)
+                copy = self._new_object(original['type'], original['alias'], parent=original['parent'],
+                                        position=original['position'], size=original['size'])
+                for key in ('orientation', 'color', 'int_params'):
+                    self.objects[copy][key] = type(original[key])(original[key])
+                self.objects[copy]['special'] = original['special']
+                copies.append(copy)
+        return copies
+
+    def removeObject(self, handle):
+        self.removeObjects([handle])
+
+    def removeObjects(self, handles):
+        with self.lock:
+            for handle in handles:
+                self._get(handle)
+            for handle in handles:
+                if handle not in self.objects:
+                    continue
+                for h in self._tree(handle):
+                    self.objects.pop(h, None)
+                    self.robots.pop(h, None)
+
+    def setJointTargetVelocity(self, handle, velocity):
+        self._advance()
+        self._get(handle)['velocity'] = velocity
+
+    def readProximitySensor(self, handle):
+        """Distancia al cuboide más cercano en la dirección del sonar (rayo simple)"""
+        sensor = self._get(handle)
+        body = self.objects.get(sensor['parent'])
+        if body is None:
+            return 0, 0.0
+        x, y = body['position'][0], body['position'][1]
+        heading = body['orientation'][2] + sensor.get('angle', 0.0)
+        dx, dy = math.cos(heading), math.sin(heading)
+
+        nearest = None
+        for h, obj in self.objects.items():
+            if obj['type'] != self.object_shape_type or h == sensor['parent'] or h in self.robots:
+                continue
+            half_x, half_y = obj['size'][0] / 2, obj['size'][1] / 2
+            cx, cy = obj['position'][0], obj['position'][1]
+            t_min, t_max = 0.0, self.sonar_range
+            for origin, direction, low, high in ((x, dx, cx - half_x, cx + half_x),
+                                                 (y, dy, cy - half_y, cy + half_y)):
+                if abs(direction) < 1e-12:
+                    if origin < low or origin > high:
+                        t_min, t_max = 1.0, 0.0
+                    continue
+                t1, t2 = (low - origin) / direction, (high - origin) / direction
+                t_min, t_max = max(t_min, min(t1, t2)), min(t_max, max(t1, t2))
+            if t_min <= t_max and (nearest is None or t_min < nearest):
+                nearest = t_min
+
+        if nearest is None:
+            return 0, 0.0
+        return 1, nearest
+
+    def saveScene(self, path):
+        with self.lock:
+            data = {'objects': {str(h): obj for h, obj in self.objects.items()},
+                    'robots': {str(h): robot for h, robot in self.robots.items()}}
+            with open(path, 'w') as f:
+                json.dump(data, f, default=str)
+
+    def loadScene(self, path):
+        """Carga una escena guardada con saveScene; como en CoppeliaSim, los handles cambian"""
+        with open(path) as f:
+            data = json.load(f)
+        with self.lock:
+            self.objects = {}
+            self.robots = {}
+            remap = {}
+            for old in sorted(data['objects'], key=int):
+                remap[int(old)] = self._next_handle
+                self._next_handle += 1
+            for old, obj in data['objects'].items():
+                obj['parent'] = remap.get(obj['parent'], -1)
+                obj['int_params'] = {int(k): v for k, v in obj['int_params'].items()}
+                self.objects[remap[int(old)]] = obj
+            for old, robot in data['robots'].items():
+                robot['left'], robot['right'] = remap[robot['left']], remap[robot['right']]
+                self.robots[remap[int(old)]] = robot
+            self.state = self.simulation_stopped
+            self.sim_time = 0.0
+        return 1
+
+    # ------------------------------------------------------------------
+    # Señales y tablas
+    # ------------------------------------------------------------------
+
+    def packTable(self, table):
+        return json.dumps(table).encode()
+
+    def unpackTable(self, data):
+        return json.loads(data)
+
+    def setStringSignal(self, name, value):
+        self.signals[name] = value
+
+    def getStringSignal(self, name):
+        return self.signals.get(name)
+
+    def clearStringSignal(self, name):
+        self.signals.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # Scripts: emulación de las funciones de SimHelpers
+    # ------------------------------------------------------------------
+
+    def executeScriptString(self, source, script_type):
+        self.installed_functions.update(re.findall(r'function\s+(\w+)\s*\(', source))
+        return 0, None
+
+    def callScriptFunction(self, name, script_type, *args):
+        if name not in self.installed_functions:
+            raise Exception(f"script function does not exist: {name}")
+        emulated = getattr(self, f"_lua_{name}", None)
+        if emulated is None:
+            raise Exception(f"FakeSim no emula la función {name}")
+        return emulated(*args)
+
+    def _lua_iaReadProximity(self, handles):
+        distances = []
+        for handle in handles:
+            result, distance = self.readProximitySensor(handle)
+            distances.append(distance if result > 0 else -1)
+        return distances
+
+    def _lua_iaSceneInfo(self, handles=None):
+        self._advance()
+        with self.lock:
+            if handles is None:
+                handles = sorted(self.objects)
+            aliases, types, poses, sizes = [], [], [], []
+            for handle in handles:
+                obj = self._get(handle)
+                aliases.append(self._path(handle))
+                types.append(obj['type'])
+                poses.extend(obj['position'][:3] + [obj['orientation'][2]])
+                sizes.extend(obj['size'] if obj['type'] == self.object_shape_type else [0, 0, 0])
+            return list(handles), aliases, types, poses, sizes
+
+    def _lua_iaAliveHandles(self, handles):
+        self._advance()
+        with self.lock:
+            return [handle in self.objects for handle in handles]
+
+    def _lua_iaScenePoses(self):
+        self._advance()
+        with self.lock:
+            handles = sorted(self.objects)
+            poses = []
+            for handle in handles:
+                obj = self.objects[handle]
+                poses.extend(obj['position'][:3] + [obj['orientation'][2]])
+            return handles, poses
+
+    def _lua_iaCreateCuboids(self, specs):
+        handles = []
+        for spec in specs:
+            handle = self.createPrimitiveShape(self.primitiveshape_cuboid, spec['size'])
+            self.setObjectPosition(handle, -1, spec['position'])
+            self.setObjectSpecialProperty(handle, self.objectspecialproperty_detectable_all
+                                          + self.objectspecialproperty_collidable)
+            self.setObjectInt32Param(handle, self.shapeintparam_static, 1)
+            self.setObjectInt32Param(handle, self.shapeintparam_respondable, 1)
+            if spec.get('color'):
+                self.setShapeColor(handle, None, self.colorcomponent_ambient_diffuse, spec['color'])
+            if spec.get('alias'):
+                self.setObjectAlias(handle, spec['alias'])
+            handles.append(handle)
+        return handles
+
+    def _lua_iaInstantiateCuboids(self, groups):
+        result = []
+        for group in groups:
+            positions = group['positions']
+            n = len(positions) // 3
+            copies = []
+            if self.isHandle(group['template']):
+                pool = [group['template']]
+                while len(copies) < n:
+                    new = self.copyPasteObjects(pool[:n - len(copies)], 0)
+                    copies.extend(new)
+                    pool.extend(new)
+                aliases = group.get('aliases') or []
+                for i, handle in enumerate(copies):
+                    self.setObjectPosition(handle, -1, positions[3 * i:3 * i + 3])
+                    self.setObjectAlias(handle, (aliases[i] if i < len(aliases) else '') or 'Cuboid')
+            result.append(copies)
+        return result
+
+    def _lua_iaBatch(self, calls):
+        results = []
+        for name, args, n in calls:
+            method = getattr(self, name, None)
+            if name.startswith('_') or not callable(method):
+                results.append({'ok': False, 'error': f"unknown function: {name}"})
+                continue
+            try:
+                results.append({'ok': True, 'value': method(*args[:n])})
+            except Exception as e:
+                results.append({'ok': False, 'error': str(e)})
+        return results
+
+
+class FakeSocket:
+    """Sustituto del socket REQ: guarda las opciones para aplicar el tiempo límite"""
+
+    def __init__(self):
+        self.options = {ZMQ_RCVTIMEO: -1}
+        self.closed = False
+
+    def setsockopt(self, option, value):
+        self.options[option] = value
+
+    def close(self, linger=None):
+        self.closed = True
+
+
+class FakeSimProxy:
+    """
+    Objeto 'sim' de un FakeRemoteAPIClient: reenvía las llamadas al FakeSim
+    compartido aplicando la latencia simulada y el tiempo límite del socket.
+    """
+
+    def __init__(self, world, socket):
+        self._world = world
+        self._socket = socket
+
+    def __getattr__(self, name):
+        attr = getattr(self._world, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def remote_call(*args):
+            if self._socket.closed:
+                raise Exception("Socket cerrado")
+            self._world.count(name)
+            delay = self._world.delay(name)
+            timeout = self._socket.options.get(ZMQ_RCVTIMEO, -1)
+            timeout = timeout / 1000.0 if timeout >= 0 else None
+
+            if not self._world.serial:
+                if timeout is not None and delay > timeout:
+                    time.sleep(timeout)
+                    raise TimeoutError(f"FakeSim: sin respuesta a '{name}'")
+                if delay > 0:
+                    time.sleep(delay)
+                return attr(*args)
+
+            # Servidor de una petición a la vez: la espera en cola cuenta para el tiempo límite
+            start = time.monotonic()
+            if not self._world.server_lock.acquire(timeout=-1 if timeout is None else timeout):
+                raise TimeoutError(f"FakeSim: sin respuesta a '{name}' (servidor ocupado)")
+            try:
+                remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                if remaining is not None and delay > remaining:
+                    time.sleep(max(0.0, remaining))
+                    raise TimeoutError(f"FakeSim: sin respuesta a '{name}'")
+                if delay > 0:
+                    time.sleep(delay)
+                return attr(*args)
+            finally:
+                self._world.server_lock.release()
+
+        return remote_call
+
+
+class FakeRemoteAPIClient:
+    """Sustituto de RemoteAPIClient conectado a un FakeSim en memoria"""
+
+    def __init__(self, world):
+        self.world = world
+        self.socket = FakeSocket()
+
+    def getObject(self, name):
+        if name != 'sim':
+            raise Exception(f"FakeSim solo expone el objeto 'sim' (pedido: {name})")
+        return FakeSimProxy(self.world, self.socket)
+
+    @staticmethod
+    def factory(world):
+        """
+        Devuelve una client_factory para CoppeliaSimController que crea clientes
+        conectados al FakeSim indicado.
+        """
+        return lambda: FakeRemoteAPIClient(world)
@@ -53,3 +53,13 @@ class GridManager:
             for row in self.grid:
                 writer.writerow(row)
 
+    def import_from_csv(self, filename):
+        """Importar una cuadrícula desde un archivo CSV exportado con export_to_csv"""
+        with open(filename, mode='r', newline='') as file:
+            rows = [[int(value) for value in row] for row in csv.reader(file) if row]
+        if len(rows) != GRID_SIZE or any(len(row) != GRID_SIZE for row in rows):
+            raise ValueError(f"El archivo no contiene una cuadrícula de {GRID_SIZE}x{GRID_SIZE}")
+        self.history.append(('import', [row[:] for row in self.grid]))  # Guardar la acción para deshacer
+        self.grid = rows
+        self.start_set = any(START in row for row in rows)
+        self.end_set = any(END in row for row in rows)
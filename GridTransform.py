@@ -0,0 +1,210 @@
+import math
+
+import numpy as np
+
+from constants import GRID_SIZE
+
+
+class GridTransform:
+    """
+    Conversión entre celdas de la cuadrícula (fila, columna) y coordenadas del
+    mundo de CoppeliaSim (x, y).
+
+    La cuadrícula está centrada en 'origin', cada celda mide 'scale' metros y
+    puede estar girada 'rotation' radianes alrededor del eje Z. Las filas crecen
+    hacia -y y las columnas hacia +x (antes de aplicar la rotación).
+
+    Los métodos cell_to_world/world_to_cell convierten un solo punto; los métodos
+    cells_to_world/world_to_cells convierten arrays de NumPy de una sola vez, lo
+    que permite procesar miles de objetos detectados o puntos de una ruta sin
+    bucles en Python. Los centros de todas las celdas se guardan en una tabla por
+    escala para no recalcularlos.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, scale=0.5, origin=(0.0, 0.0), rotation=0.0):
+        """
+        Args:
+            grid_size: Número de celdas por lado
+            scale: Metros por celda
+            origin: Posición (x, y) del centro de la cuadrícula en el mundo
+            rotation: Giro de la cuadrícula alrededor del eje Z (radianes)
+        """
+        self.grid_size = grid_size
+        self.scale = float(scale)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.rotation = float(rotation)
+        self._tables = {}  # (escala, origen, rotación) -> centros de las celdas
+
+    def set_scale(self, scale):
+        """Cambia los metros por celda"""
+        self.scale = float(scale)
+
+    def set_origin(self, x, y):
+        """Cambia la posición del centro de la cuadrícula"""
+        self.origin = (float(x), float(y))
+
+    def set_rotation(self, rotation):
+        """Cambia el giro de la cuadrícula (radianes)"""
+        self.rotation = float(rotation)
+
+    @property
+    def cell_size(self):
+        return self.scale
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.grid_size and 0 <= col < self.grid_size
+
+    def _rotate(self, x, y, angle):
+        cos, sin = math.cos(angle), math.sin(angle)
+        return x * cos - y * sin, x * sin + y * cos
+
+    def cell_to_world(self, row, col):
+        """
+        Centro de una celda en coordenadas del mundo.
+
+        Admite filas y columnas fraccionarias (p. ej. el centro de un rectángulo
+        de varias celdas).
+
+        Returns:
+            tuple: (x, y)
+        """
+        half = self.grid_size / 2
+        x = (col - half + 0.5) * self.scale
+        y = (half - row - 0.5) * self.scale
+        if self.rotation:
+            x, y = self._rotate(x, y, self.rotation)
+        return x + self.origin[0], y + self.origin[1]
+
+    def world_to_cell(self, x, y):
+        """
+        Celda que contiene un punto del mundo.
+
+        Returns:
+            tuple: (fila, columna); puede quedar fuera de la cuadrícula (ver in_bounds)
+        """
+        x, y = x - self.origin[0], y - self.origin[1]
+        if self.rotation:
+            x, y = self._rotate(x, y, -self.rotation)
+        half = self.grid_size / 2
+        return int(math.floor(half - y / self.scale)), int(math.floor(x / self.scale + half))
+
+    def world_table(self):
+        """
+        Centros de todas las celdas para la configuración actual.
+
+        Returns:
+            numpy.ndarray: Array (grid_size, grid_size, 2) con (x, y) de cada celda
+        """
+        key = (self.scale, self.origin, self.rotation)
+        table = self._tables.get(key)
+        if table is None:
+            rows, cols = np.indices((self.grid_size, self.grid_size))
+            table = self._cells_to_world(rows, cols)
+            table.setflags(write=False)
+            self._tables[key] = table
+        return table
+
+    def _cells_to_world(self, rows, cols):
+        half = self.grid_size / 2
+        x = (np.asarray(cols, dtype=float) - half + 0.5) * self.scale
+        y = (half - np.asarray(rows, dtype=float) - 0.5) * self.scale
+        if self.rotation:
+            cos, sin = math.cos(self.rotation), math.sin(self.rotation)
+            x, y = x * cos - y * sin, x * sin + y * cos
+        return np.stack([x + self.origin[0], y + self.origin[1]], axis=-1)
+
+    def cells_to_world(self, cells):
+        """
+        Versión vectorizada de cell_to_world.
+
+        Args:
+            cells: Array (N, 2) o lista de (fila, columna)
+
+        Returns:
+            numpy.ndarray: Array (N, 2) con (x, y)
+        """
+        cells = np.asarray(cells)
+        if cells.size == 0:
+            return np.zeros((0, 2))
+        rows, cols = cells[..., 0], cells[..., 1]
+        if (np.issubdtype(cells.dtype, np.integer) and rows.min() >= 0 and cols.min() >= 0
+                and rows.max() < self.grid_size and cols.max() < self.grid_size):
+            return self.world_table()[rows, cols]
+        return self._cells_to_world(rows, cols)
+
+    def world_to_cells(self, points):
+        """
+        Versión vectorizada de world_to_cell.
+
+        Args:
+            points: Array (N, 2) o (N, 3) o lista de posiciones; se usan x e y
+
+        Returns:
+            numpy.ndarray: Array de enteros (N, 2) con (fila, columna)
+        """
+        points = np.asarray(points, dtype=float)
+        if points.size == 0:
+            return np.zeros((0, 2), dtype=int)
+        x = points[..., 0] - self.origin[0]
+        y = points[..., 1] - self.origin[1]
+        if self.rotation:
+            cos, sin = math.cos(-self.rotation), math.sin(-self.rotation)
+            x, y = x * cos - y * sin, x * sin + y * cos
+        half = self.grid_size / 2
+        rows = np.floor(half - y / self.scale)
+        cols = np.floor(x / self.scale + half)
+        return np.stack([rows, cols], axis=-1).astype(int)
+
+    def footprint_mask(self, positions, sizes, yaws):
+        """
+        Celdas cubiertas por la huella de cada objeto (su caja envolvente girada
+        'yaw' alrededor del eje Z), calculadas para todos los objetos a la vez.
+
+        Una celda está cubierta si su cuadrado se solapa con el rectángulo de la
+        huella (prueba de ejes separadores), de modo que los muros más finos que
+        una celda también la ocupan. Los objetos de tamaño nulo no cubren ninguna.
+
+        Args:
+            positions: Array (N, 2) o (N, 3) con la posición de cada objeto
+            sizes: Array (N, 2) o (N, 3) con el tamaño de la caja envolvente
+            yaws: Array (N,) con el giro de cada objeto alrededor del eje Z
+
+        Returns:
+            numpy.ndarray: Máscara booleana (N, grid_size, grid_size)
+        """
+        if not len(yaws):
+            return np.zeros((0, self.grid_size, self.grid_size), dtype=bool)
+        positions = np.asarray(positions, dtype=float).reshape(len(yaws), -1)
+        sizes = np.asarray(sizes, dtype=float).reshape(len(yaws), -1)
+
+        # Todo en el marco de la cuadrícula: centros de las celdas (1, G, G) frente a objetos (N, 1, 1)
+        theta = np.asarray(yaws, dtype=float) - self.rotation
+        centers = self.world_table()
+        dx = centers[..., 0][None] - positions[:, 0, None, None]
+        dy = centers[..., 1][None] - positions[:, 1, None, None]
+        if self.rotation:
+            cos, sin = math.cos(-self.rotation), math.sin(-self.rotation)
+            dx, dy = dx * cos - dy * sin, dx * sin + dy * cos
+
+        cos = np.abs(np.cos(theta))[:, None, None]
+        sin = np.abs(np.sin(theta))[:, None, None]
+        a = sizes[:, 0, None, None] / 2
+        b = sizes[:, 1, None, None] / 2
+        h = self.scale / 2 - 1e-9  # Tocar el borde de una celda no la ocupa
+        along = dx * np.cos(theta)[:, None, None] + dy * np.sin(theta)[:, None, None]
+        across = -dx * np.sin(theta)[:, None, None] + dy * np.cos(theta)[:, None, None]
+
+        mask = ((np.abs(dx) < h + a * cos + b * sin)
+                & (np.abs(dy) < h + a * sin + b * cos)
+                & (np.abs(along) < a + h * (cos + sin))
+                & (np.abs(across) < b + h * (cos + sin)))
+        mask &= ((a > 0) & (b > 0))
+        return mask
+
+    def in_bounds_mask(self, cells):
+        """Máscara booleana de las celdas (N, 2) que caen dentro de la cuadrícula"""
+        cells = np.asarray(cells)
+        if cells.size == 0:
+            return np.zeros(0, dtype=bool)
+        return ((cells[..., 0] >= 0) & (cells[..., 0] < self.grid_size)
+                & (cells[..., 1] >= 0) & (cells[..., 1] < self.grid_size))
@@ -2,8 +2,23 @@ import sys
 from PyQt5.QtWidgets import QApplication
 from MainWindow import MainWindow
 
+try:
+    # Integración opcional de asyncio con el bucle de Qt (AsyncCoppeliaSimController)
+    import asyncio
+    import qasync
+except ImportError:
+    qasync = None
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    if qasync is not None:
+        # Las corrutinas del controlador asíncrono se ejecutan en el mismo bucle que la interfaz
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        with loop:
+            loop.run_forever()
+        window.async_controller.close()
+        sys.exit(0)
     sys.exit(app.exec_())
\ No newline at end of file
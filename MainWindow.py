@@ -1,16 +1,23 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                             QLabel, QFileDialog, QMessageBox, QComboBox, 
-                            QProgressBar, QApplication)
+                            QProgressBar, QApplication, QCheckBox)
 from PyQt5.QtCore import Qt, QPoint, QTimer, pyqtSignal
 from PyQt5.QtGui import QPainter, QColor, QBrush, QPen
 from GridManager import GridManager
 from GridWidget import GridWidget
-from CoppeliaSimController import CoppeliaSimController
+from CoppeliaSimController import CoppeliaSimController, SimTimeoutError
+from AsyncCoppeliaSimController import AsyncCoppeliaSimController, event_loop_running, run_in_qt
 from CoppeliaSimWorker import CoppeliaSimWorker
-from constants import CELL_SIZE, GRID_SIZE, EMPTY, START, END, PATH, OBSTACLE, ROBOT
+from RectangleDecomposition import ObstacleRectangles, decompose_rectangles
+from SceneReconciler import SceneReconciler
+from constants import CELL_SIZE, GRID_SIZE, EMPTY, START, END, PATH, OBSTACLE, ROBOT, SCENERY_PREFIXES
 import time
+import numpy as np
 
 class MainWindow(QWidget):
+    # Estado de la conexión emitido desde el hilo de latido: (estado, mensaje)
+    heartbeat_status = pyqtSignal(str, str)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Diseñador de Recorridos - Robot con CoppeliaSim (ZeroMQ)")
@@ -25,15 +32,26 @@ class MainWindow(QWidget):
         self.goal_handle = None
         self.goal_position = None
         self.objects = {}  # Diccionario para mapear posiciones (row, col) a handles de objetos
+        self.obstacle_rects = ObstacleRectangles()  # Obstáculos fusionados en un cuboide por rectángulo
         
         # Inicializar el controlador con ZeroMQ
         self.sim_controller = CoppeliaSimController(host="localhost", port=23000)
+        # Operaciones concurrentes sobre el mismo pool de conexiones (con el bucle de qasync)
+        self.async_controller = AsyncCoppeliaSimController(self.sim_controller)
+        self.transform = self.sim_controller.transform  # Conversión celda <-> mundo compartida
         self.sim_worker = CoppeliaSimWorker(self.sim_controller)
         self.sim_worker.connection_status.connect(self.update_connection_status)
+        self.heartbeat_status.connect(self.on_heartbeat_status)
+        self.sim_controller.connection_listeners.append(self.heartbeat_status.emit)
         
         # Configurar la interfaz de usuario
         self.setup_ui()
         self.connect_signals()
+        
+        # Leer periódicamente la telemetría de navegación (en lugar de imprimirla en cada ciclo)
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.update_telemetry_label)
+        self.telemetry_timer.start(250)
 
     def setup_ui(self):
         main_layout = QVBoxLayout()
@@ -55,12 +73,17 @@ class MainWindow(QWidget):
         self.select_button = QPushButton("Seleccionar Objeto")
         self.delete_button = QPushButton("Eliminar Selección")  # Este es el botón que faltaba
         self.save_button = QPushButton("Guardar Recorrido")
+        self.load_button = QPushButton("Cargar Recorrido")
         self.reset_button = QPushButton("Restablecer")
         self.detect_button = QPushButton("Detectar Objetos")
+        self.merge_button = QPushButton("Fusionar Obstáculos")
+        self.snapshot_button = QPushButton("Guardar Escenario")
+        self.restore_button = QPushButton("Restaurar Escenario")
         
         for btn in [self.add_obstacle_button, self.delete_button, 
-                    self.select_button, self.save_button, 
-                    self.reset_button, self.detect_button]:
+                    self.select_button, self.save_button, self.load_button,
+                    self.reset_button, self.detect_button, self.merge_button,
+                    self.snapshot_button, self.restore_button]:
             controls_layout.addWidget(btn)
         
         main_layout.addLayout(controls_layout)
@@ -70,6 +93,7 @@ class MainWindow(QWidget):
         self.scale_combo = QComboBox()
         self.scale_combo.addItems(["0.25", "0.5", "1.0"])
         self.scale_combo.setCurrentText("0.5")
+        self.scale_combo.currentTextChanged.connect(self.on_scale_changed)
         
         config_layout.addWidget(QLabel("Escala (m):"))
         config_layout.addWidget(self.scale_combo)
@@ -81,6 +105,10 @@ class MainWindow(QWidget):
         self.port_combo.setEditable(True)
         config_layout.addWidget(self.port_combo)
         
+        # Grabación de trayectorias a disco
+        self.record_checkbox = QCheckBox("Grabar trayectoria")
+        config_layout.addWidget(self.record_checkbox)
+        
         main_layout.addLayout(config_layout)
         
         # Conexión y Simulación
@@ -141,7 +169,11 @@ class MainWindow(QWidget):
         self.delete_button.clicked.connect(self.remove_selected_object)
         self.reset_button.clicked.connect(self.reset_grid)
         self.save_button.clicked.connect(self.save_grid)
+        self.load_button.clicked.connect(self.load_grid)
         self.detect_button.clicked.connect(self.detect_scene_objects)
+        self.merge_button.clicked.connect(self.merge_obstacles)
+        self.snapshot_button.clicked.connect(self.save_scenario)
+        self.restore_button.clicked.connect(self.restore_scenario)
         
         # Botones de simulación
         self.start_sim_button.clicked.connect(self.start_simulation)
@@ -162,6 +194,36 @@ class MainWindow(QWidget):
             # Si acabamos de conectar, detectar objetos en la escena
             QTimer.singleShot(500, self.detect_scene_objects)
     
+    def on_heartbeat_status(self, state, message):
+        """Refleja en la interfaz las pérdidas y recuperaciones de conexión detectadas por el latido"""
+        self.status_label.setText(message)
+        if state == 'lost':
+            self.update_connection_status(False)
+            self.connection_status.setText("Estado: Reconectando...")
+        elif state == 'reconnected':
+            self.update_connection_status(True)
+    
+    def on_scale_changed(self, text):
+        """Actualiza la escala de la conversión celda <-> mundo"""
+        try:
+            self.transform.set_scale(float(text))
+        except ValueError:
+            print(f"⚠️ Escala no válida: {text}")
+    
+    def update_telemetry_label(self):
+        """Muestra en la barra de estado la última muestra de telemetría de navegación"""
+        if not getattr(self.sim_controller, 'navigation_active', False):
+            return
+        
+        sample = self.sim_controller.telemetry.last()
+        if sample is None:
+            return
+        
+        self.status_label.setText(
+            f"Robot: ({sample['x']:.2f}, {sample['y']:.2f}) | "
+            f"Distancia: {sample['distance']:.2f}m | Error: {sample['heading_error']:.2f} rad | "
+            f"L={sample['left']:.2f} R={sample['right']:.2f}")
+    
     def toggle_connection(self):
         """Alterna entre conectar y desconectar de CoppeliaSim"""
         if not hasattr(self, 'is_connected') or not self.is_connected:
@@ -187,6 +249,7 @@ class MainWindow(QWidget):
                 self.is_connected = True
                 self.update_connection_status(True)
                 self.execute_button.setEnabled(True)
+                self.sim_controller.start_heartbeat()
                 
                 # Detectar objetos automáticamente
                 self.detect_scene_objects()
@@ -254,6 +317,7 @@ class MainWindow(QWidget):
         # Limpiar obstáculos en grid_widget
         if hasattr(self.grid_widget, 'obstacles'):
             self.grid_widget.obstacles = []
+        self.obstacle_rects.clear()
         
         # Actualizar visualización
         self.grid_widget.update()
@@ -266,61 +330,12 @@ class MainWindow(QWidget):
             return []
         
         try:
-            scene_objects = []
-            
-            # Método 1: Usar funciones específicas para obtener diferentes tipos de objetos
-            try:
-                # Obtener handles de distintos tipos de objetos
-                shape_objects = self.sim_controller.sim.getShapes()
-                joint_objects = self.sim_controller.sim.getJoints()
-                dummy_objects = self.sim_controller.sim.getDummies()
-                
-                # Combinar todos los handles
-                scene_objects = shape_objects + joint_objects + dummy_objects
-                print(f"Método 1: Encontrados {len(scene_objects)} objetos")
-            except Exception as e:
-                print(f"Error en método 1: {e}")
-                scene_objects = []
-            
-            # Si no funcionó, probar con otro método
-            if not scene_objects:
-                try:
-                    # Método 2: Usar getObjects con diferentes filtros
-                    for i in range(100):  # Límite razonable
-                        try:
-                            obj = self.sim_controller.sim.getObject(".", i)
-                            if obj != -1:
-                                scene_objects.append(obj)
-                        except:
-                            pass
-                    
-                    print(f"Método 2: Encontrados {len(scene_objects)} objetos")
-                except Exception as e:
-                    print(f"Error en método 2: {e}")
-            
-            # Si aún no tenemos nada, intentar con nombres específicos
-            if not scene_objects:
-                print("Buscando por nombres específicos")
-                
-                # Lista de nombres comunes en la escena mobileRobotPathPlanning
-                specific_objects = [
-                    "/mobileRobot", "mobileRobot",
-                    "/goalDummy", "goalDummy",
-                    "/Obstacle", "Obstacle",
-                    "/Cuboid", "Cuboid",
-                    "/Floor", "Floor"
-                ]
-                
-                for name in specific_objects:
-                    try:
-                        obj = self.sim_controller.sim.getObject(name)
-                        if obj != -1 and obj not in scene_objects:
-                            scene_objects.append(obj)
-                            print(f"Objeto encontrado por nombre: {name}")
-                    except:
-                        pass
-            
-            return scene_objects
+            scene_index = self.sim_controller.scene_index
+            if scene_index.loaded:
+                scene_index.refresh()
+            else:
+                scene_index.load()
+            return scene_index.handles.tolist()
             
         except Exception as e:
             print(f"Error al obtener objetos de la escena: {e}")
@@ -334,6 +349,46 @@ class MainWindow(QWidget):
         
         print("Detectando TODOS los objetos en la escena...")
         
+        # Con el bucle de qasync la consulta se hace fuera del hilo de la interfaz
+        # y los objetos se procesan cuando llega la respuesta
+        if event_loop_running():
+            run_in_qt(self.async_controller.run(self.query_scene_index), self.apply_scene_objects)
+            return
+        
+        self.apply_scene_objects(self.query_scene_index())
+    
+    def query_scene_index(self):
+        """
+        Carga o actualiza el índice de la escena del controlador: una consulta masiva
+        la primera vez y después solo los cambios.
+        
+        Returns:
+            bool: True si el índice se pudo consultar
+        """
+        scene_index = self.sim_controller.scene_index
+        try:
+            with self.sim_controller.operation('detect'):
+                if scene_index.loaded:
+                    added, changed, removed = scene_index.refresh()
+                    print(f"Índice actualizado: {len(added)} nuevos, {len(changed)} movidos, {len(removed)} eliminados")
+                else:
+                    scene_index.load()
+            return True
+        except Exception as e:
+            print(f"Error al consultar el índice de la escena: {e}")
+            return False
+    
+    def apply_scene_objects(self, indexed=True):
+        """
+        Clasifica los objetos del índice de la escena (robot, meta y obstáculos) y
+        los refleja en la cuadrícula.
+        
+        Args:
+            indexed: False si la consulta del índice falló (no se cambia nada)
+        """
+        if not indexed:
+            return
+        
         try:
             # Limpiar la interfaz primero
             self.clean_interface()
@@ -343,93 +398,33 @@ class MainWindow(QWidget):
             goal_detected = False
             obstacles_found = 0
             
-            # Obtener TODOS los objetos visibles en la escena
-            all_objects = []
+            scene_index = self.sim_controller.scene_index
+            print(f"Se encontraron {len(scene_index)} objetos en total")
             
-            # Método 1: Obtener todos los objetos con handleSerialization
-            try:
-                # Primero intentar con getObjects para obtener todos los objetos
-                all_objects = []
-                i = 0
-                while True:
-                    try:
-                        handle = self.sim_controller.sim.getObjects(i)
-                        if handle != -1:
-                            all_objects.append(handle)
-                            i += 1
-                        else:
-                            break
-                    except:
-                        break
-                        
-                if not all_objects:
-                    # Si no funcionó, intentar otro método
-                    try:
-                        # Obtener handles por tipo
-                        shapes = self.sim_controller.sim.getShapes()
-                        joints = self.sim_controller.sim.getJoints()
-                        dummies = self.sim_controller.sim.getDummies()
-                        
-                        # Combinar todos los handles
-                        all_objects = shapes + joints + dummies
-                    except:
-                        pass
-            except Exception as e:
-                print(f"Error al obtener objetos con método 1: {e}")
-            
-            # Si aún no hay objetos, probar con nombres específicos conocidos
-            if not all_objects:
-                print("Probando búsqueda directa por nombres conocidos...")
-                
-                # Lista de patrones de nombres a buscar
-                name_patterns = [
-                    "/mobileRobot", "mobileRobot",
-                    "/goalDummy", "goalDummy",
-                    "/Obstacle", "Obstacle", 
-                    "/Cylinder", "Cylinder",
-                    "/Cuboid", "Cuboid",
-                    "/Box", "Box",
-                    "/Wall", "Wall"
-                ]
-                
-                # Para obstáculos numerados
-                for base_name in ["Cuboid", "Obstacle", "Box", "Wall"]:
-                    for i in range(10):  # Buscar hasta 10 instancias numeradas
-                        name_patterns.append(f"/{base_name}{i}")
-                        name_patterns.append(f"{base_name}{i}")
-                
-                # Buscar objetos con estos nombres
-                for name in name_patterns:
-                    try:
-                        handle = self.sim_controller.sim.getObject(name)
-                        if handle != -1 and handle not in all_objects:
-                            all_objects.append(handle)
-                            print(f"Objeto encontrado por nombre: {name}")
-                    except:
-                        pass
-            
-            print(f"Se encontraron {len(all_objects)} objetos en total")
-            
-            # Si aún no hay objetos, algo está mal
-            if not all_objects:
+            # Si no hay objetos, algo está mal
+            if not len(scene_index):
                 print("⚠️ No se pudieron detectar objetos en la escena.")
                 return
             
+            # Convertir todas las posiciones a celdas de la cuadrícula de una vez y
+            # rasterizar la huella (caja envolvente girada) de cada objeto
+            cells = self.transform.world_to_cells(scene_index.poses[:, :2])
+            footprints = self.transform.footprint_mask(scene_index.poses[:, :2], scene_index.sizes,
+                                                       scene_index.poses[:, 3])
+            
             # Procesar todos los objetos encontrados
-            for obj in all_objects:
+            for index, (info, (row, col)) in enumerate(zip(scene_index.objects(), cells.tolist())):
+                obj = info['handle']
                 try:
-                    # Obtener nombre, tipo y posición
-                    obj_name = self.sim_controller.sim.getObjectAlias(obj, 1)
-                    obj_type = self.sim_controller.sim.getObjectType(obj)
-                    obj_pos = self.sim_controller.sim.getObjectPosition(obj, -1)
-                    
-                    # Convertir posición a coordenadas de cuadrícula
-                    reference_scale = float(self.scale_combo.currentText())
-                    col = int((obj_pos[0] / reference_scale) + GRID_SIZE/2 - 0.5)
-                    row = int(GRID_SIZE/2 - (obj_pos[1] / reference_scale) - 0.5)
+                    # Nombre, tipo y posición ya indexados
+                    obj_name = info['alias']
+                    obj_type = info['type']
+                    obj_pos = info['position']
+                    covered = [tuple(cell) for cell in np.argwhere(footprints[index]).tolist()]
+                    inside = 0 <= row < GRID_SIZE and 0 <= col < GRID_SIZE
                     
                     # Asegurar que está dentro de los límites
-                    if not (0 <= row < GRID_SIZE and 0 <= col < GRID_SIZE):
+                    if not inside and not covered:
                         # Está fuera de los límites de la cuadrícula
                         continue
                     
@@ -439,7 +434,7 @@ class MainWindow(QWidget):
                     obj_name_lower = obj_name.lower()
                     
                     # 1. Detectar ROBOT
-                    if not robot_detected and ('robot' in obj_name_lower or 'mobile' in obj_name_lower):
+                    if inside and not robot_detected and ('robot' in obj_name_lower or 'mobile' in obj_name_lower):
                         self.robot_handle = obj
                         self.robot_position = (row, col)
                         self.objects[(row, col)] = obj
@@ -450,7 +445,7 @@ class MainWindow(QWidget):
                         continue
                     
                     # 2. Detectar META
-                    if not goal_detected and ('goal' in obj_name_lower or 'dummy' in obj_name_lower or 'target' in obj_name_lower):
+                    if inside and not goal_detected and ('goal' in obj_name_lower or 'dummy' in obj_name_lower or 'target' in obj_name_lower):
                         self.goal_handle = obj
                         self.goal_position = (row, col)
                         self.grid_manager.clear_type(END)
@@ -464,8 +459,16 @@ class MainWindow(QWidget):
                         continue
                     
                     # 3. Detectar OBSTÁCULOS
-                    # Primero, verificar si la celda ya está ocupada
-                    if self.grid_manager.grid[row][col] != EMPTY:
+                    # Los objetos marcados como escenario (suelos, decoración) no lo son,
+                    # aunque sean formas: la huella de un suelo cubriría todo el mapa
+                    if any(part.startswith(SCENERY_PREFIXES) for part in obj_name.split('/') if part):
+                        continue
+                    
+                    # Celdas que ocupa: todas las de su huella, o la de su origen si no tiene tamaño
+                    if not covered:
+                        covered = [(row, col)]
+                    free = [cell for cell in covered if self.grid_manager.grid[cell[0]][cell[1]] == EMPTY]
+                    if not free:
                         continue
                     
                     # Considerar como obstáculo si:
@@ -479,41 +482,49 @@ class MainWindow(QWidget):
                         is_obstacle = True
                     
                     if is_obstacle:
-                        # Marcar como obstáculo en el grid_manager
-                        self.grid_manager.grid[row][col] = OBSTACLE
-                        self.objects[(row, col)] = obj
-                        
                         # Añadir a la lista de obstáculos del grid_widget
                         if not hasattr(self.grid_widget, 'obstacles'):
                             self.grid_widget.obstacles = []
-                        if (row, col) not in self.grid_widget.obstacles:
-                            self.grid_widget.obstacles.append((row, col))
+                        
+                        # Marcar como obstáculo en el grid_manager cada celda cubierta
+                        for cell in free:
+                            self.grid_manager.grid[cell[0]][cell[1]] = OBSTACLE
+                            self.objects[cell] = obj
+                            if cell not in self.grid_widget.obstacles:
+                                self.grid_widget.obstacles.append(cell)
                         
                         obstacles_found += 1
-                        print(f"Obstáculo detectado: {obj_name} en ({row}, {col})")
+                        print(f"Obstáculo detectado: {obj_name} en {len(free)} celdas desde ({row}, {col})")
                 
                 except Exception as e:
                     print(f"Error al procesar objeto {obj}: {e}")
             
-            # Si no se ha detectado el robot o la meta, pero teníamos referencias anteriores, mantenerlas
-            if not robot_detected and hasattr(self, 'robot_handle') and self.robot_handle is not None:
+            # Si no se ha detectado el robot o la meta, pero teníamos referencias anteriores,
+            # mantenerlas si siguen existiendo (comprobando ambas en una sola consulta)
+            previous = [handle for handle, detected in ((self.robot_handle, robot_detected),
+                                                        (self.goal_handle, goal_detected))
+                        if not detected and handle is not None]
+            alive = set()
+            if previous:
                 try:
-                    # Verificar si sigue existiendo
-                    self.sim_controller.sim.getObjectPosition(self.robot_handle, -1)
+                    alive, _ = self.sim_controller.check_handles(previous)
+                except Exception as e:
+                    print(f"Error al comprobar las referencias anteriores: {e}")
+            
+            if not robot_detected and hasattr(self, 'robot_handle') and self.robot_handle is not None:
+                if self.robot_handle in alive:
                     print("Se mantiene la referencia al robot anterior")
                     robot_detected = True
-                except:
+                else:
                     self.robot_handle = None
                     self.robot_position = None
                     print("La referencia anterior al robot ya no es válida")
             
             if not goal_detected and hasattr(self, 'goal_handle') and self.goal_handle is not None:
-                try:
-                    # Verificar si sigue existiendo
-                    self.sim_controller.sim.getObjectPosition(self.goal_handle, -1)
+                if self.goal_handle in alive:
                     print("Se mantiene la referencia a la meta anterior")
                     goal_detected = True
-                except:
+                else:
                     self.goal_handle = None
                     self.goal_position = None
                     self.grid_manager.clear_type(END)
@@ -712,22 +723,22 @@ class MainWindow(QWidget):
         if hasattr(self, 'is_connected') and self.is_connected and hasattr(self, 'goal_handle') and self.goal_handle is not None:
             try:
                 # Convertir coordenadas de cuadrícula a CoppeliaSim
-                reference_scale = float(self.scale_combo.currentText())
-                x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-                y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+                x, y = self.transform.cell_to_world(row, col)
                 
                 # Mantener la altura Z original
-                current_pos = self.sim_controller.sim.getObjectPosition(self.goal_handle, -1)
+                current_pos = self.sim_controller.call('getObjectPosition', self.goal_handle, -1)
                 z = current_pos[2]
                 
                 # Mover el objeto
-                self.sim_controller.sim.setObjectPosition(self.goal_handle, -1, [x, y, z])
+                self.sim_controller.call('setObjectPosition', self.goal_handle, -1, [x, y, z])
                 
                 # Actualizar la referencia
                 self.goal_position = (row, col)
                 self.objects[(row, col)] = self.goal_handle
                 
                 print(f"Meta movida a: {row}, {col} -> {[x, y, z]}")
+            except SimTimeoutError as e:
+                self.status_label.setText(f"⚠️ {e}")
             except Exception as e:
                 print(f"Error al mover meta: {e}")
     
@@ -752,13 +763,11 @@ class MainWindow(QWidget):
         
         try:
             # Convertir coordenadas de cuadrícula a CoppeliaSim
-            reference_scale = float(self.scale_combo.currentText())
-            x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-            y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+            x, y = self.transform.cell_to_world(row, col)
             z = 0.05  # Altura del obstáculo
             
             # Crear el obstáculo (cubo)
-            size = [reference_scale * 0.8, reference_scale * 0.8, 0.1]  # Tamaño del obstáculo
+            size = [self.transform.scale * 0.8, self.transform.scale * 0.8, 0.1]  # Tamaño del obstáculo
             position = [x, y, z]
             color = [0.2, 0.2, 0.2]  # Gris
             
@@ -790,23 +799,124 @@ class MainWindow(QWidget):
         if not hasattr(self, 'is_connected') or not self.is_connected:
             return
         
+        if self.obstacle_rects.rect_at(row, col) is not None:
+            return self.remove_merged_obstacle_cell(row, col)
+        
         if (row, col) in self.objects:
             handle = self.objects[(row, col)]
-            try:
-                # Eliminar el objeto en CoppeliaSim
-                self.sim_controller.sim.removeObject(handle)
-                # Actualizar la cuadrícula
-                self.grid_manager.grid[row][col] = EMPTY
-                # Eliminar la referencia
-                del self.objects[(row, col)]
-                
-                print(f"Obstáculo eliminado: {row}, {col}")
-                return True
-            except Exception as e:
-                print(f"Error al eliminar obstáculo: {e}")
+            # Un objeto detectado puede ocupar varias celdas (p. ej. un muro largo)
+            cells = [cell for cell, other in self.objects.items() if other == handle]
+            # Eliminar el objeto en CoppeliaSim (el controlador olvida su descriptor,
+            # así que no se recreará al iniciar la simulación)
+            if not self.sim_controller.eliminar_cubo_por_handle(handle):
+                print(f"Error al eliminar obstáculo: {row}, {col}")
                 return False
+            
+            # Actualizar la cuadrícula y eliminar las referencias
+            for cell in cells:
+                self.grid_manager.grid[cell[0]][cell[1]] = EMPTY
+                del self.objects[cell]
+            
+            print(f"Obstáculo eliminado: {row}, {col}")
+            return True
         return False
     
+    def obstacle_specs(self, rectangles):
+        """Especificaciones de los cuboides que representan rectángulos de celdas"""
+        specs = []
+        for rectangle in rectangles:
+            position, size = ObstacleRectangles.to_world(rectangle, self.transform)
+            specs.append({'size': size, 'position': position, 'color': [0.2, 0.2, 0.2]})
+        return specs
+    
+    def merge_obstacles(self):
+        """
+        Sustituye los cubos de obstáculo por un cuboide por cada rectángulo de celdas
+        ocupadas, para reducir el número de objetos del simulador en mapas densos.
+        
+        Solo se fusionan los cubos creados por la aplicación (y las celdas de obstáculo
+        aún sin objeto); los objetos propios de la escena no se tocan.
+        """
+        if not hasattr(self, 'is_connected') or not self.is_connected:
+            QMessageBox.warning(self, "No conectado", "Conecta a CoppeliaSim antes de fusionar obstáculos.")
+            return False
+        
+        # Celdas a fusionar: obstáculos sin objeto o con un cubo creado por la aplicación
+        created = self.sim_controller.created_cubes
+        mask = [[value == OBSTACLE and ((row, col) not in self.objects or self.objects[(row, col)] in created)
+                 for col, value in enumerate(values)]
+                for row, values in enumerate(self.grid_manager.grid)]
+        rectangles = decompose_rectangles(mask)
+        if not rectangles:
+            print("No hay obstáculos que fusionar")
+            return False
+        
+        old_handles = {handle for (row, col), handle in self.objects.items() if mask[row][col]}
+        
+        try:
+            with self.sim_controller.bulk_edit() as edit:
+                results = [edit.create(spec) for spec in self.obstacle_specs(rectangles)]
+            if not all(result.ok for result in results):
+                # No dejar la escena a medias: conservar los cubos originales
+                with self.sim_controller.bulk_edit() as edit:
+                    for result in results:
+                        if result.ok:
+                            edit.remove(result.value)
+                print("❌ No se pudieron crear todos los cuboides fusionados")
+                return False
+            handles = [result.value for result in results]
+            
+            with self.sim_controller.bulk_edit() as edit:
+                for handle in old_handles:
+                    edit.remove(handle)
+            
+            self.obstacle_rects.clear()
+            for rectangle, handle in zip(rectangles, handles):
+                self.obstacle_rects.add(rectangle, handle)
+                for cell in ObstacleRectangles.cells(rectangle):
+                    self.objects[cell] = handle
+            
+            message = f"Obstáculos fusionados: {len(old_handles)} cubos → {len(rectangles)} cuboides"
+            print(f"✅ {message}")
+            self.status_label.setText(message)
+            self.grid_widget.update()
+            return True
+        
+        except Exception as e:
+            print(f"Error al fusionar obstáculos: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    def remove_merged_obstacle_cell(self, row, col):
+        """Elimina una celda de un obstáculo fusionado partiendo su rectángulo en los restantes"""
+        rect_id, pieces = self.obstacle_rects.split(row, col)
+        
+        try:
+            handles = self.sim_controller.create_obstacles(self.obstacle_specs(pieces)) if pieces else []
+            if any(handle is None for handle in handles):
+                self.sim_controller.eliminar_cubos_por_handles([h for h in handles if h is not None])
+                print("❌ No se pudo partir el obstáculo fusionado")
+                return False
+            
+            _, old_handle = self.obstacle_rects.remove(rect_id)
+            if old_handle is not None:
+                self.sim_controller.eliminar_cubos_por_handles([old_handle])
+            
+            for piece, handle in zip(pieces, handles):
+                self.obstacle_rects.add(piece, handle)
+                for cell in ObstacleRectangles.cells(piece):
+                    self.objects[cell] = handle
+            
+            self.grid_manager.grid[row][col] = EMPTY
+            self.objects.pop((row, col), None)
+            
+            print(f"Obstáculo eliminado: {row}, {col} (rectángulo partido en {len(pieces)})")
+            return True
+        except Exception as e:
+            print(f"Error al eliminar obstáculo: {e}")
+            return False
+    
     def place_robot(self, row, col):
         """Coloca o mueve el robot a la posición especificada"""
         if not hasattr(self, 'is_connected') or not self.is_connected:
@@ -821,16 +931,14 @@ class MainWindow(QWidget):
         
         try:
             # Convertir coordenadas de cuadrícula a CoppeliaSim
-            reference_scale = float(self.scale_combo.currentText())
-            x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-            y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+            x, y = self.transform.cell_to_world(row, col)
             
             # Mantener la altura Z original
-            current_pos = self.sim_controller.sim.getObjectPosition(self.robot_handle, -1)
+            current_pos = self.sim_controller.call('getObjectPosition', self.robot_handle, -1)
             z = current_pos[2]
             
             # Mover el robot
-            self.sim_controller.sim.setObjectPosition(self.robot_handle, -1, [x, y, z])
+            self.sim_controller.call('setObjectPosition', self.robot_handle, -1, [x, y, z])
             
             # Actualizar la posición en la interfaz
             if hasattr(self, 'robot_position') and self.robot_position is not None:
@@ -848,6 +956,9 @@ class MainWindow(QWidget):
             
             return True
             
+        except SimTimeoutError as e:
+            self.status_label.setText(f"⚠️ {e}")
+            return False
         except Exception as e:
             print(f"Error al colocar robot: {e}")
             import traceback
@@ -888,9 +999,7 @@ class MainWindow(QWidget):
                 print(f"Error al seleccionar objeto: {e}")
         else:
             # Comprobar si hay un objeto cercano a esta posición
-            reference_scale = float(self.scale_combo.currentText())
-            x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-            y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+            x, y = self.transform.cell_to_world(row, col)
             
             nearest_handle = None
             min_distance = float('inf')
@@ -909,7 +1018,7 @@ class MainWindow(QWidget):
                     pass
             
             # Si encontramos un objeto cercano, seleccionarlo
-            if nearest_handle is not None and min_distance < 0.5 * reference_scale:
+            if nearest_handle is not None and min_distance < 0.5 * self.transform.scale:
                 self.selected_object = nearest_handle
                 self.selected_position = nearest_pos
                 
@@ -964,16 +1073,15 @@ class MainWindow(QWidget):
         
         try:
             # Convertir coordenadas de cuadrícula a CoppeliaSim
-            reference_scale = float(self.scale_combo.currentText())
-            x = (col - GRID_SIZE/2 + 0.5) * reference_scale
-            y = (GRID_SIZE/2 - row - 0.5) * reference_scale
+            x, y = self.transform.cell_to_world(row, col)
             
             # Mantener la altura Z original
-            current_pos = self.sim_controller.sim.getObjectPosition(self.selected_object, -1)
+            current_pos = self.sim_controller.call('getObjectPosition', self.selected_object, -1)
             z = current_pos[2]
             
             # Mover el objeto en CoppeliaSim
-            self.sim_controller.sim.setObjectPosition(self.selected_object, -1, [x, y, z])
+            self.sim_controller.call('setObjectPosition', self.selected_object, -1, [x, y, z])
+            self.sim_controller.update_descriptor(self.selected_object, [x, y, z])
             
             # Actualizar la cuadrícula según el tipo de objeto
             old_row, old_col = self.selected_position
@@ -1038,6 +1146,9 @@ class MainWindow(QWidget):
             
             return True
         
+        except SimTimeoutError as e:
+            self.status_label.setText(f"⚠️ {e}")
+            return False
         except Exception as e:
             print(f"Error al mover objeto: {e}")
             import traceback
@@ -1064,15 +1175,19 @@ class MainWindow(QWidget):
             # Obtener la posición del objeto seleccionado
             row, col = self.selected_position
             
-            # Intentar eliminar el objeto en CoppeliaSim
-            try:
-                # Verificar si el objeto existe
-                self.sim_controller.sim.getObjectPosition(self.selected_object, -1)
-                # Eliminarlo
-                self.sim_controller.sim.removeObject(self.selected_object)
+            # Una celda de un obstáculo fusionado: partir el rectángulo
+            if self.obstacle_rects.rect_at(row, col) is not None:
+                removed = self.remove_merged_obstacle_cell(row, col)
+                self.selected_object = None
+                self.selected_position = None
+                self.grid_widget.update()
+                return removed
+            
+            # Intentar eliminar el objeto en CoppeliaSim (el controlador olvida su
+            # descriptor, así que no se recreará al iniciar la simulación)
+            if self.sim_controller.eliminar_cubo_por_handle(self.selected_object):
                 print(f"Objeto eliminado de CoppeliaSim")
-            except Exception as e:
-                print(f"Error al eliminar objeto en CoppeliaSim: {e}")
+            else:
                 print("El objeto no existe en CoppeliaSim. Se eliminará solo de la interfaz.")
             
             # Actualizar la cuadrícula y las referencias
@@ -1114,29 +1229,15 @@ class MainWindow(QWidget):
             return
         
         try:
-            # 1. Eliminar obstáculos en CoppeliaSim
+            # 1. Quitar los obstáculos de la cuadrícula y eliminar en CoppeliaSim solo
+            #    los que existen, con una sola petición
+            for row in range(GRID_SIZE):
+                for col in range(GRID_SIZE):
+                    if self.grid_manager.grid[row][col] == OBSTACLE:
+                        self.grid_manager.grid[row][col] = EMPTY
+            
             if self.is_connected:
-                obstacles_to_remove = []
-                
-                # Identificar obstáculos
-                for position, handle in self.objects.items():
-                    # Si no es robot ni meta, es un obstáculo
-                    if (hasattr(self, 'robot_handle') and handle == self.robot_handle) or \
-                    (hasattr(self, 'goal_handle') and handle == self.goal_handle):
-                        continue
-                    
-                    obstacles_to_remove.append((position, handle))
-                
-                # Eliminar obstáculos de CoppeliaSim
-                for position, handle in obstacles_to_remove:
-                    try:
-                        # Verificar si el objeto existe
-                        self.sim_controller.sim.getObjectPosition(handle, -1)
-                        # Eliminarlo
-                        self.sim_controller.sim.removeObject(handle)
-                        print(f"Obstáculo eliminado de CoppeliaSim: {handle}")
-                    except Exception as e:
-                        print(f"Error al eliminar obstáculo {handle}: {e}")
+                self.sync_obstacles()
             
             # 2. Limpiar la representación en la interfaz
             self.clean_interface()
@@ -1151,6 +1252,130 @@ class MainWindow(QWidget):
             import traceback
             traceback.print_exc()
     
+    def sync_obstacles(self):
+        """
+        Sincroniza los obstáculos de CoppeliaSim con la cuadrícula aplicando solo las
+        diferencias (crear, mover y eliminar cubos en lote).
+        
+        Returns:
+            bool: True si la sincronización se completó
+        """
+        if not hasattr(self, 'is_connected') or not self.is_connected:
+            return False
+        
+        special = {self.robot_handle, self.goal_handle}
+        desired = {(row, col) for row in range(GRID_SIZE) for col in range(GRID_SIZE)
+                   if self.grid_manager.grid[row][col] == OBSTACLE}
+        current = {cell: handle for cell, handle in self.objects.items() if handle not in special}
+        
+        def update_objects():
+            for cell in current:
+                self.objects.pop(cell, None)
+            self.objects.update(mapping)
+            self.grid_widget.update()
+        
+        try:
+            # Si la llamada está dentro de otra sesión (p. ej. load_grid), los cubos
+            # creados y movidos solo se conocen al salir de la sesión externa
+            with self.sim_controller.bulk_edit() as edit:
+                reconciler = SceneReconciler(self.sim_controller, self.transform)
+                mapping = reconciler.sync(desired, current, self.obstacle_rects)
+                edit.on_commit(update_objects)
+        except Exception as e:
+            print(f"Error al sincronizar obstáculos: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        return True
+    
+    def load_grid(self):
+        """Carga una cuadrícula desde un archivo CSV y sincroniza la escena con ella"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Cargar recorrido", "", "CSV Files (*.csv)")
+        if not filename:
+            return
+        
+        try:
+            self.grid_manager.import_from_csv(filename)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"No se pudo cargar el recorrido: {e}")
+            return
+        
+        if hasattr(self, 'is_connected') and self.is_connected:
+            with self.sim_controller.bulk_edit():
+                self.sync_obstacles()
+                
+                # Mover la meta y el robot a las celdas indicadas en el archivo
+                for row in range(GRID_SIZE):
+                    for col in range(GRID_SIZE):
+                        cell = self.grid_manager.grid[row][col]
+                        if cell == END and self.goal_handle is not None:
+                            self.set_meta_point(row, col)
+                        elif cell == ROBOT and self.robot_handle is not None:
+                            self.place_robot(row, col)
+        
+        self.grid_widget.update()
+        print(f"✅ Recorrido cargado desde {filename}")
+    
+    def save_scenario(self):
+        """Guarda la escena completa y la cuadrícula para poder restaurarlas de una vez"""
+        if not hasattr(self, 'is_connected') or not self.is_connected:
+            QMessageBox.warning(self, "No conectado", "Conecta a CoppeliaSim antes de guardar el escenario.")
+            return
+        
+        filename, _ = QFileDialog.getSaveFileName(self, "Guardar escenario", "", "Escenas CoppeliaSim (*.ttt)")
+        if not filename:
+            return
+        if not filename.endswith('.ttt'):
+            filename += '.ttt'
+        
+        if self.sim_controller.save_snapshot(filename, self.grid_manager.grid, self.objects,
+                                             self.robot_handle, self.goal_handle):
+            self.status_label.setText(f"Escenario guardado en {filename}")
+        else:
+            QMessageBox.warning(self, "Error", "No se pudo guardar el escenario. Verifica la consola.")
+    
+    def restore_scenario(self):
+        """Restaura un escenario guardado con una sola carga de escena"""
+        if not hasattr(self, 'is_connected') or not self.is_connected:
+            QMessageBox.warning(self, "No conectado", "Conecta a CoppeliaSim antes de restaurar el escenario.")
+            return
+        
+        filename, _ = QFileDialog.getOpenFileName(self, "Restaurar escenario", "", "Escenas CoppeliaSim (*.ttt)")
+        if not filename:
+            return
+        
+        snapshot = self.sim_controller.restore_snapshot(filename)
+        if snapshot is None:
+            QMessageBox.warning(self, "Error", "No se pudo restaurar el escenario. Verifica la consola.")
+            return
+        
+        # Sustituir el estado de la interfaz por el de la instantánea
+        self.grid_manager.grid = [row[:] for row in snapshot['grid']]
+        self.grid_manager.end_set = any(END in row for row in self.grid_manager.grid)
+        self.objects = dict(snapshot['objects'])
+        self.robot_handle = snapshot['robot']
+        self.goal_handle = snapshot['goal']
+        self.robot_position = next((cell for cell, handle in self.objects.items()
+                                    if handle == self.robot_handle), None)
+        self.goal_position = next((cell for cell, handle in self.objects.items()
+                                   if handle == self.goal_handle), None)
+        self.selected_object = None
+        self.selected_position = None
+        self.grid_widget.robot_pos = self.robot_position
+        self.grid_widget.meta_pos = self.goal_position
+        self.grid_widget.obstacles = [cell for cell, handle in self.objects.items()
+                                      if handle not in (self.robot_handle, self.goal_handle)]
+        
+        self.obstacle_rects.clear()
+        for cells, handle in snapshot['merged']:
+            rows = [row for row, _ in cells]
+            cols = [col for _, col in cells]
+            rectangle = (min(rows), min(cols), max(rows) - min(rows) + 1, max(cols) - min(cols) + 1)
+            self.obstacle_rects.add(rectangle, handle)
+        
+        self.grid_widget.update()
+        self.status_label.setText(f"Escenario restaurado desde {filename}")
+    
     def save_grid(self):
         """Guarda la cuadrícula en un archivo CSV"""
         filename, _ = QFileDialog.getSaveFileName(self, "Guardar recorrido", "", "CSV Files (*.csv)")
@@ -1174,6 +1399,10 @@ class MainWindow(QWidget):
             self.progress_bar.setValue(100)
             self.progress_bar.setVisible(False)
             
+            # Los objetos recreados tienen handles nuevos
+            if self.sim_controller.handle_remap:
+                self.apply_handle_remap(self.sim_controller.handle_remap)
+            
             if success:
                 print("Simulación iniciada correctamente")
             else:
@@ -1184,6 +1413,15 @@ class MainWindow(QWidget):
             print(f"Error al iniciar simulación: {e}")
             QMessageBox.warning(self, "Error", f"Error al iniciar simulación: {str(e)}")
     
+    def apply_handle_remap(self, remap):
+        """Sustituye los handles antiguos por los de los objetos recreados"""
+        self.objects = {cell: remap.get(handle, handle) for cell, handle in self.objects.items()}
+        for rect_id, handle in list(self.obstacle_rects.handles.items()):
+            self.obstacle_rects.handles[rect_id] = remap.get(handle, handle)
+        if self.selected_object in remap:
+            self.selected_object = remap[self.selected_object]
+        print(f"Referencias actualizadas para {len(remap)} objetos recreados")
+    
     def pause_simulation(self):
         """Pausa la simulación en CoppeliaSim"""
         if not hasattr(self, 'is_connected') or not self.is_connected:
@@ -1222,6 +1460,7 @@ class MainWindow(QWidget):
             QApplication.processEvents()
             
             success = self.sim_controller.stop_simulation()
+            self.sim_controller.stop_recording()
             
             self.progress_bar.setValue(100)
             self.progress_bar.setVisible(False)
@@ -1267,13 +1506,11 @@ class MainWindow(QWidget):
             QApplication.processEvents()
             
             # Convertir coordenadas de cuadrícula a CoppeliaSim
-            reference_scale = float(self.scale_combo.currentText())
-            end_x = (end_pos[1] - GRID_SIZE/2 + 0.5) * reference_scale
-            end_y = (GRID_SIZE/2 - end_pos[0] - 0.5) * reference_scale
+            end_x, end_y = self.transform.cell_to_world(*end_pos)
             
             # Obtener altura original del objetivo
             if hasattr(self, 'goal_handle') and self.goal_handle is not None:
-                goal_pos = self.sim_controller.sim.getObjectPosition(self.goal_handle, -1)
+                goal_pos = self.sim_controller.call('getObjectPosition', self.goal_handle, -1)
                 end_z = goal_pos[2]
             else:
                 end_z = 0.075  # Altura predeterminada para el objetivo
@@ -1281,6 +1518,10 @@ class MainWindow(QWidget):
             target_position = [end_x, end_y, end_z]
             print(f"Enviando robot a posición: {target_position}")
             
+            # Grabar la ejecución si se ha pedido
+            if self.record_checkbox.isChecked():
+                self.sim_controller.start_recording(f"trayectoria_{time.strftime('%Y%m%d_%H%M%S')}")
+            
             self.progress_bar.setValue(50)
             QApplication.processEvents()
             
@@ -1302,7 +1543,9 @@ class MainWindow(QWidget):
                 try:
                     if hasattr(self.sim_controller, 'execute_path_for_mobile_robot'):
                         print("Usando execute_path_for_mobile_robot")
-                        success = self.sim_controller.execute_path_for_mobile_robot(None, end_pos)
+                        obstacles = [(row, col) for row in range(GRID_SIZE) for col in range(GRID_SIZE)
+                                     if self.grid_manager.grid[row][col] == OBSTACLE]
+                        success = self.sim_controller.execute_path_for_mobile_robot(None, end_pos, obstacles)
                         if success:
                             print("✅ Recorrido iniciado con execute_path_for_mobile_robot")
                 except Exception as e:
@@ -1312,14 +1555,14 @@ class MainWindow(QWidget):
             if not success and hasattr(self, 'goal_handle') and self.goal_handle is not None:
                 try:
                     print("Moviendo goal_handle directamente")
-                    self.sim_controller.sim.setObjectPosition(self.goal_handle, -1, target_position)
+                    self.sim_controller.call('setObjectPosition', self.goal_handle, -1, target_position)
                     print("✅ goalDummy movido correctamente")
                     
                     # Verificar si necesitamos iniciar la simulación
                     try:
-                        sim_state = self.sim_controller.sim.getSimulationState()
+                        sim_state = self.sim_controller.call('getSimulationState')
                         if sim_state != 1:  # 1 = simulación en ejecución
-                            self.sim_controller.sim.startSimulation()
+                            self.sim_controller.call('startSimulation')
                             print("✅ Simulación iniciada")
                     except Exception as e:
                         print(f"Error al verificar estado de simulación: {e}")
@@ -1338,6 +1581,9 @@ class MainWindow(QWidget):
                 QMessageBox.warning(self, "Error", 
                                   "No se pudo iniciar el recorrido. Verifica la consola para más detalles.")
         
+        except SimTimeoutError as e:
+            self.progress_bar.setVisible(False)
+            self.status_label.setText(f"⚠️ {e}")
         except Exception as e:
             self.progress_bar.setVisible(False)
             print(f"Error al ejecutar recorrido: {e}")
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Pesos de Braitenberg del ejemplo del Pioneer P3DX (sensores 1-8 frontales, de izquierda a derecha)
+PIONEER_BRAITENBERG_LEFT = [-0.2, -0.4, -0.6, -0.8, -1.0, -1.2, -1.4, -1.6,
+                            0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+PIONEER_BRAITENBERG_RIGHT = [-1.6, -1.4, -1.2, -1.0, -0.8, -0.6, -0.4, -0.2,
+                             0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+
+
+class BraitenbergAvoidance:
+    """
+    Capa reactiva de evasión de obstáculos a partir de los 16 sensores ultrasónicos
+    del Pioneer P3DX, calculada de forma vectorizada con NumPy.
+
+    Devuelve correcciones que se suman a las velocidades de rueda del seguidor de
+    trayectoria, así el robot esquiva objetos que la cuadrícula no conoce sin abortar
+    el recorrido.
+    """
+
+    def __init__(self, no_detection_dist=0.5, max_detection_dist=0.2, gain=2.0,
+                 weights_left=None, weights_right=None):
+        """
+        Args:
+            no_detection_dist: Distancia (m) a partir de la cual un eco se ignora
+            max_detection_dist: Distancia (m) a la que la influencia es máxima
+            gain: Factor de escala de las correcciones (rad/s)
+            weights_left: Pesos de cada sensor sobre la rueda izquierda
+            weights_right: Pesos de cada sensor sobre la rueda derecha
+        """
+        self.no_detection_dist = no_detection_dist
+        self.max_detection_dist = max_detection_dist
+        self.gain = gain
+        self.weights = np.array([
+            weights_left if weights_left is not None else PIONEER_BRAITENBERG_LEFT,
+            weights_right if weights_right is not None else PIONEER_BRAITENBERG_RIGHT,
+        ], dtype=float)
+
+    def activation(self, distances):
+        """
+        Convierte las distancias medidas en una activación entre 0 y 1 por sensor.
+
+        Args:
+            distances: Distancias de los sensores; valores negativos = sin detección
+
+        Returns:
+            numpy.ndarray: Activación de cada sensor
+        """
+        distances = np.asarray(distances, dtype=float)
+        detected = (distances >= 0) & (distances < self.no_detection_dist)
+        clipped = np.maximum(distances, self.max_detection_dist)
+        span = self.no_detection_dist - self.max_detection_dist
+        return np.where(detected, 1.0 - (clipped - self.max_detection_dist) / span, 0.0)
+
+    def correction(self, distances):
+        """
+        Calcula la corrección de velocidad de cada rueda.
+
+        Returns:
+            tuple: (corrección izquierda, corrección derecha) en rad/s
+        """
+        activation = self.activation(distances)
+        n = min(len(activation), self.weights.shape[1])
+        left, right = self.gain * (self.weights[:, :n] @ activation[:n])
+        return float(left), float(right)
+
+    def is_clear(self, distances):
+        """Indica si ningún sensor detecta obstáculos en el rango de evasión"""
+        return not np.any(self.activation(distances) > 0)
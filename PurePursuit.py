@@ -0,0 +1,194 @@
+import math
+import numpy as np
+
+
+class PurePursuitFollower:
+    """
+    Seguidor de trayectorias pure-pursuit para un robot diferencial.
+
+    El perfil de velocidad trapezoidal (limitado por curvatura y aceleración)
+    se calcula una sola vez al construir el seguidor; en cada ciclo de control
+    solo se busca el punto más cercano del camino y se consulta la tabla.
+    """
+
+    def __init__(self, waypoints, max_speed=0.35, max_accel=0.25, max_lateral_accel=0.3,
+                 lookahead=0.4, min_speed=0.05, goal_tolerance=0.15, spacing=0.05,
+                 wheel_radius=0.0975, wheel_base=0.331, max_wheel_speed=4.0,
+                 turn_in_place_error=math.pi / 2, turn_rate=1.0):
+        """
+        Args:
+            waypoints: Lista de puntos [x, y] (o [x, y, z]) en coordenadas de CoppeliaSim
+            max_speed: Velocidad lineal máxima (m/s)
+            max_accel: Aceleración lineal máxima (m/s²) usada en el perfil trapezoidal
+            max_lateral_accel: Aceleración lateral máxima (m/s²) para limitar en curvas
+            lookahead: Distancia de anticipación del pure-pursuit (m)
+            min_speed: Velocidad mínima de avance para no quedarse detenido al inicio
+            goal_tolerance: Distancia al último punto para considerar llegada (m)
+            spacing: Separación del muestreo del camino (m)
+            wheel_radius: Radio de las ruedas (m), por defecto el del Pioneer P3DX
+            wheel_base: Distancia entre ruedas (m), por defecto la del Pioneer P3DX
+            max_wheel_speed: Velocidad angular máxima por rueda (rad/s)
+            turn_in_place_error: Error de orientación (rad) a partir del cual el robot
+                                 gira en el sitio en lugar de avanzar
+            turn_rate: Velocidad angular (rad/s) del giro en el sitio
+        """
+        points = np.asarray([p[:2] for p in waypoints], dtype=float)
+        if len(points) == 0:
+            raise ValueError("Se necesita al menos un punto para seguir la trayectoria")
+
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        self.max_lateral_accel = max_lateral_accel
+        self.lookahead = lookahead
+        self.min_speed = min_speed
+        self.goal_tolerance = goal_tolerance
+        self.wheel_radius = wheel_radius
+        self.wheel_base = wheel_base
+        self.max_wheel_speed = max_wheel_speed
+        self.turn_in_place_error = turn_in_place_error
+        self.turn_rate = turn_rate
+        self.spacing = spacing
+
+        self._build(points)
+        self._index = 0  # Último índice más cercano (la búsqueda solo avanza)
+
+    def _build(self, points):
+        """Muestrea los puntos y precalcula la longitud de arco y el perfil de velocidad"""
+        self.waypoints = points
+        self.path = self._resample(points, self.spacing)
+        segment = np.linalg.norm(np.diff(self.path, axis=0), axis=1)
+        self.arc_length = np.concatenate(([0.0], np.cumsum(segment)))
+        self.speed_profile = self._build_speed_profile(self.path, segment)
+        self.goal = self.path[-1]
+
+    def set_goal(self, goal):
+        """
+        Sustituye el último punto del camino (p. ej. por la posición actual de un
+        objetivo que se mueve) y recalcula el muestreo y el perfil de velocidad,
+        conservando el avance del robot sobre el camino.
+
+        Args:
+            goal: Nuevo punto final [x, y] (o [x, y, z])
+        """
+        previous = self.path[self._index]
+        points = self.waypoints.copy()
+        points[-1] = goal[:2]
+        self._build(points)
+        self._index = int(np.argmin(np.hypot(self.path[:, 0] - previous[0], self.path[:, 1] - previous[1])))
+
+    @staticmethod
+    def _resample(points, spacing):
+        """Muestrea la polilínea de puntos a una separación aproximadamente constante"""
+        if len(points) == 1:
+            return points.copy()
+
+        resampled = [points[0]]
+        for start, end in zip(points[:-1], points[1:]):
+            length = float(np.linalg.norm(end - start))
+            if length == 0.0:
+                continue
+            steps = max(1, int(math.ceil(length / spacing)))
+            t = np.arange(1, steps + 1) / steps
+            resampled.extend(start + (end - start) * t[:, None])
+        return np.asarray(resampled)
+
+    def _build_speed_profile(self, path, segment):
+        """Calcula el perfil trapezoidal de velocidad a lo largo del camino"""
+        n = len(path)
+        speed = np.full(n, self.max_speed)
+        if n < 2:
+            return np.zeros(n)
+
+        # Límite por curvatura: v = sqrt(a_lat / |k|), curvatura por tres puntos
+        if n >= 3:
+            a, b, c = path[:-2], path[1:-1], path[2:]
+            ab = np.linalg.norm(b - a, axis=1)
+            bc = np.linalg.norm(c - b, axis=1)
+            ac = np.linalg.norm(c - a, axis=1)
+            cross = np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                           (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+            denom = ab * bc * ac
+            curvature = np.divide(2.0 * cross, denom, out=np.zeros_like(denom), where=denom > 1e-12)
+            limit = np.sqrt(self.max_lateral_accel / np.maximum(curvature, 1e-9))
+            speed[1:-1] = np.minimum(speed[1:-1], limit)
+
+        # Pasada hacia adelante (aceleración desde parado) y hacia atrás (frenado hasta la meta)
+        speed[0] = 0.0
+        speed[-1] = 0.0
+        for i in range(1, n):
+            speed[i] = min(speed[i], math.sqrt(speed[i - 1] ** 2 + 2.0 * self.max_accel * segment[i - 1]))
+        for i in range(n - 2, -1, -1):
+            speed[i] = min(speed[i], math.sqrt(speed[i + 1] ** 2 + 2.0 * self.max_accel * segment[i]))
+
+        return speed
+
+    def reset(self):
+        """Reinicia el seguimiento desde el principio del camino"""
+        self._index = 0
+
+    def distance_to_goal(self, x, y):
+        """Distancia euclídea desde (x, y) hasta el último punto del camino"""
+        return math.hypot(self.goal[0] - x, self.goal[1] - y)
+
+    def is_finished(self, x, y):
+        """Indica si el robot ya llegó al final del camino"""
+        return self.distance_to_goal(x, y) < self.goal_tolerance
+
+    def compute(self, x, y, yaw):
+        """
+        Calcula el comando para el ciclo de control actual.
+
+        Args:
+            x, y: Posición actual del robot
+            yaw: Orientación actual del robot (rad)
+
+        Returns:
+            tuple: (velocidad lineal, velocidad angular, error de orientación)
+        """
+        # Búsqueda local del punto más cercano, solo hacia adelante
+        window_end = min(len(self.path), self._index + 40)
+        window = self.path[self._index:window_end]
+        offsets = np.hypot(window[:, 0] - x, window[:, 1] - y)
+        self._index += int(np.argmin(offsets))
+
+        # Punto de anticipación a una distancia de arco 'lookahead'
+        target_s = self.arc_length[self._index] + self.lookahead
+        look_index = int(np.searchsorted(self.arc_length, target_s))
+        look_index = min(look_index, len(self.path) - 1)
+        look_x, look_y = self.path[look_index]
+
+        dx = look_x - x
+        dy = look_y - y
+        heading_error = math.atan2(dy, dx) - yaw
+        heading_error = (heading_error + math.pi) % (2 * math.pi) - math.pi
+
+        # Un objetivo detrás del robot: girar en el sitio hacia él. La curvatura
+        # 2·sin(error)/d tiende a cero cuando el objetivo está justo detrás, así que
+        # no serviría para dar la vuelta
+        if abs(heading_error) > self.turn_in_place_error:
+            return 0.0, math.copysign(self.turn_rate, heading_error), heading_error
+
+        distance = math.hypot(dx, dy)
+        curvature = 2.0 * math.sin(heading_error) / max(distance, 1e-6)
+
+        speed = max(self.speed_profile[self._index], self.min_speed)
+        return speed, speed * curvature, heading_error
+
+    def wheel_velocities(self, linear, angular):
+        """
+        Convierte (v, w) en velocidades angulares de rueda, respetando el límite
+        por rueda sin deformar la curvatura pedida.
+
+        Returns:
+            tuple: (velocidad rueda izquierda, velocidad rueda derecha) en rad/s
+        """
+        half_base = self.wheel_base / 2.0
+        left = (linear - angular * half_base) / self.wheel_radius
+        right = (linear + angular * half_base) / self.wheel_radius
+
+        peak = max(abs(left), abs(right))
+        if peak > self.max_wheel_speed:
+            scale = self.max_wheel_speed / peak
+            left *= scale
+            right *= scale
+        return left, right
@@ -0,0 +1,149 @@
+import numpy as np
+
+
+def _greedy_rectangles(mask):
+    """Recubre la máscara con rectángulos: primero el ancho máximo, después el alto máximo"""
+    covered = np.zeros_like(mask, dtype=bool)
+    rows, cols = mask.shape
+    rectangles = []
+    for row in range(rows):
+        for col in range(cols):
+            if not mask[row, col] or covered[row, col]:
+                continue
+            width = 1
+            while col + width < cols and mask[row, col + width] and not covered[row, col + width]:
+                width += 1
+            height = 1
+            while (row + height < rows and mask[row + height, col:col + width].all()
+                   and not covered[row + height, col:col + width].any()):
+                height += 1
+            covered[row:row + height, col:col + width] = True
+            rectangles.append((row, col, height, width))
+    return rectangles
+
+
+def decompose_rectangles(mask):
+    """
+    Descompone una máscara booleana en un conjunto casi mínimo de rectángulos
+    alineados con los ejes que no se solapan.
+
+    Prueba el recubrimiento voraz por filas y por columnas y se queda con el que
+    produce menos rectángulos.
+
+    Args:
+        mask: Matriz booleana (True = celda ocupada)
+
+    Returns:
+        list: Tuplas (fila, columna, alto, ancho)
+    """
+    mask = np.asarray(mask, dtype=bool)
+    by_rows = _greedy_rectangles(mask)
+    by_cols = [(col, row, width, height) for row, col, height, width in _greedy_rectangles(mask.T)]
+    return by_rows if len(by_rows) <= len(by_cols) else by_cols
+
+
+class ObstacleRectangles:
+    """
+    Obstáculos de la cuadrícula agrupados en rectángulos, cada uno representado por
+    un único cuboide en CoppeliaSim. Mantiene la relación celda -> rectángulo para
+    poder eliminar una sola celda partiendo su rectángulo.
+    """
+
+    def __init__(self):
+        self.rectangles = {}  # id -> (fila, columna, alto, ancho)
+        self.handles = {}  # id -> handle del cuboide en CoppeliaSim
+        self.cell_to_rect = {}  # (fila, columna) -> id
+        self._next_id = 0
+
+    def clear(self):
+        self.rectangles = {}
+        self.handles = {}
+        self.cell_to_rect = {}
+
+    def add(self, rectangle, handle=None):
+        """
+        Registra un rectángulo y el handle de su cuboide.
+
+        Returns:
+            int: Identificador del rectángulo
+        """
+        rect_id = self._next_id
+        self._next_id += 1
+        self.rectangles[rect_id] = rectangle
+        if handle is not None:
+            self.handles[rect_id] = handle
+        for cell in self.cells(rectangle):
+            self.cell_to_rect[cell] = rect_id
+        return rect_id
+
+    def remove(self, rect_id):
+        """
+        Olvida un rectángulo.
+
+        Returns:
+            tuple: (rectángulo, handle) eliminados
+        """
+        rectangle = self.rectangles.pop(rect_id)
+        for cell in self.cells(rectangle):
+            if self.cell_to_rect.get(cell) == rect_id:
+                del self.cell_to_rect[cell]
+        return rectangle, self.handles.pop(rect_id, None)
+
+    def build(self, mask):
+        """
+        Sustituye el contenido por la descomposición de la máscara (sin handles).
+
+        Returns:
+            list: Identificadores de los rectángulos creados
+        """
+        self.clear()
+        return [self.add(rectangle) for rectangle in decompose_rectangles(mask)]
+
+    def rect_at(self, row, col):
+        """Identificador del rectángulo que cubre la celda, o None"""
+        return self.cell_to_rect.get((row, col))
+
+    def split(self, row, col):
+        """
+        Calcula los rectángulos que quedan al quitar una celda de su rectángulo:
+        la franja superior, la inferior y los tramos izquierdo y derecho de la fila.
+
+        Returns:
+            tuple: (id del rectángulo partido, lista de rectángulos restantes) o (None, [])
+        """
+        rect_id = self.rect_at(row, col)
+        if rect_id is None:
+            return None, []
+        top, left, height, width = self.rectangles[rect_id]
+        pieces = [
+            (top, left, row - top, width),
+            (row + 1, left, top + height - row - 1, width),
+            (row, left, 1, col - left),
+            (row, col + 1, 1, left + width - col - 1),
+        ]
+        return rect_id, [piece for piece in pieces if piece[2] > 0 and piece[3] > 0]
+
+    @staticmethod
+    def cells(rectangle):
+        row, col, height, width = rectangle
+        return [(r, c) for r in range(row, row + height) for c in range(col, col + width)]
+
+    @staticmethod
+    def to_world(rectangle, transform, fill=0.8, height=0.1):
+        """
+        Centro y tamaño del cuboide que representa un rectángulo de celdas.
+
+        Args:
+            rectangle: (fila, columna, alto, ancho)
+            transform: GridTransform con la escala y el origen de la cuadrícula
+            fill: Fracción de la celda ocupada en los bordes del rectángulo
+            height: Altura del cuboide (m)
+
+        Returns:
+            tuple: (posición [x, y, z], tamaño [x, y, z])
+        """
+        row, col, rows, cols = rectangle
+        x, y = transform.cell_to_world(row + rows / 2 - 0.5, col + cols / 2 - 0.5)
+        scale = transform.scale
+        margin = (1 - fill) * scale
+        return [x, y, height / 2], [cols * scale - margin, rows * scale - margin, height]
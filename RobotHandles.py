@@ -0,0 +1,45 @@
+class RobotHandles:
+    """
+    Descriptor con los handles ya resueltos de un robot: cuerpo, motores y sensores.
+
+    Se resuelve una sola vez por robot y el controlador lo guarda en caché, de modo
+    que iniciar un recorrido no vuelva a buscar objetos por nombre en CoppeliaSim.
+    """
+
+    def __init__(self, body, left_motor, right_motor, sensors=None, name=None):
+        """
+        Args:
+            body: Handle del cuerpo del robot
+            left_motor: Handle del motor izquierdo
+            right_motor: Handle del motor derecho
+            sensors: Lista de handles de sensores (ordenada), puede estar vacía
+            name: Nombre con el que se encontró el robot (solo informativo)
+        """
+        self.body = body
+        self.left_motor = left_motor
+        self.right_motor = right_motor
+        self.sensors = list(sensors) if sensors else []
+        self.name = name
+
+    def all_handles(self):
+        """Devuelve todos los handles del descriptor"""
+        return [self.body, self.left_motor, self.right_motor] + self.sensors
+
+    def is_alive(self, sim):
+        """
+        Comprueba si el cuerpo y los motores siguen existiendo en la escena.
+
+        Args:
+            sim: Objeto 'sim' de la API remota
+
+        Returns:
+            bool: True si todos los handles principales son válidos
+        """
+        try:
+            return all(sim.isHandle(h) for h in (self.body, self.left_motor, self.right_motor))
+        except Exception:
+            return False
+
+    def __repr__(self):
+        return (f"RobotHandles(name={self.name!r}, body={self.body}, left_motor={self.left_motor}, "
+                f"right_motor={self.right_motor}, sensors={len(self.sensors)})")
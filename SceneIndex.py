@@ -0,0 +1,228 @@
+import numpy as np
+
+
+class SceneIndex:
+    """
+    Índice de los objetos de la escena de CoppeliaSim: alias, tipo, pose y caja
+    envolvente por handle.
+
+    Se carga con una sola consulta masiva y después se actualiza de forma
+    incremental: solo se vuelven a pedir los detalles de los objetos nuevos y
+    solo se marcan como cambiados los objetos cuya pose se movió.
+
+    Las consultas usan las funciones Lua iaSceneInfo e iaScenePoses; si el script
+    sandbox no está disponible, se enumera la escena con getObjectsInTree y se
+    consultan los objetos uno a uno (a través de un SimPipeline).
+    """
+
+    def __init__(self, controller, tolerance=1e-4):
+        """
+        Args:
+            controller: CoppeliaSimController usado para las consultas
+            tolerance: Diferencia mínima de pose para considerar que un objeto se movió
+        """
+        self.controller = controller
+        self.tolerance = tolerance
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        """Descarta todo el contenido del índice"""
+        self.handles = np.zeros(0, dtype=np.int64)
+        self.aliases = []
+        self.types = np.zeros(0, dtype=np.int64)
+        self.poses = np.zeros((0, 4))  # x, y, z, yaw
+        self.sizes = np.zeros((0, 3))  # Tamaño de la caja envolvente
+        self._rows = {}  # handle -> fila en los arrays
+        self.loaded = False
+
+    def load(self):
+        """
+        Carga el índice completo con una sola consulta al simulador.
+
+        Returns:
+            int: Número de objetos indexados
+        """
+        handles, aliases, types, poses, sizes = self._scene_info()
+        self._set_rows(handles, aliases, types, poses, sizes)
+        self.loaded = True
+        return len(self.handles)
+
+    def refresh(self):
+        """
+        Actualiza el índice pidiendo solo las poses; los detalles se consultan
+        únicamente para los objetos nuevos.
+
+        Returns:
+            tuple: (handles añadidos, handles cuya pose cambió, handles eliminados)
+        """
+        if not self.loaded:
+            self.load()
+            return set(self.handles.tolist()), set(), set()
+
+        handles, poses = self._scene_poses()
+        handles = np.asarray(handles, dtype=np.int64)
+        poses = np.asarray(poses, dtype=float).reshape(-1, 4)
+
+        current = set(handles.tolist())
+        known = set(self._rows)
+        added = current - known
+        removed = known - current
+
+        # Comparar de forma vectorizada las poses de los objetos ya conocidos
+        changed = set()
+        keep = np.array([h not in added for h in handles.tolist()], dtype=bool)
+        if keep.any():
+            kept_handles = handles[keep]
+            old_rows = np.array([self._rows[h] for h in kept_handles.tolist()], dtype=np.int64)
+            moved = np.any(np.abs(self.poses[old_rows] - poses[keep]) > self.tolerance, axis=1)
+            changed = set(kept_handles[moved].tolist())
+
+        if not added and not removed and not changed:
+            return added, changed, removed
+
+        # Reconstruir las filas conservando alias, tipo y tamaño de los objetos conocidos
+        new_aliases, new_types, new_sizes = {}, {}, {}
+        if added:
+            info = self._scene_info(sorted(added))
+            for handle, alias, obj_type, size in zip(info[0], info[1], info[2],
+                                                     np.asarray(info[4], dtype=float).reshape(-1, 3)):
+                new_aliases[handle] = alias
+                new_types[handle] = obj_type
+                new_sizes[handle] = size
+
+        aliases, types, sizes = [], [], []
+        for handle in handles.tolist():
+            row = self._rows.get(handle)
+            if row is None:
+                aliases.append(new_aliases.get(handle, ''))
+                types.append(new_types.get(handle, -1))
+                sizes.append(new_sizes.get(handle, np.zeros(3)))
+            else:
+                aliases.append(self.aliases[row])
+                types.append(self.types[row])
+                sizes.append(self.sizes[row])
+
+        self._set_rows(handles, aliases, types, poses, sizes)
+        return added, changed, removed
+
+    def _use_helpers(self):
+        capabilities = self.controller.capabilities
+        return capabilities.get('executeScriptString') and capabilities.get('callScriptFunction')
+
+    def _scene_info(self, handles=None):
+        """
+        Alias, tipo, pose y caja envolvente de los objetos indicados (por defecto, de
+        toda la escena).
+
+        Returns:
+            tuple: (handles, alias, tipos, poses [x, y, z, yaw] seguidas, tamaños seguidos)
+        """
+        if self._use_helpers():
+            try:
+                return self.controller.call_helper('iaSceneInfo', *([] if handles is None else [handles]))
+            except Exception as e:
+                print(f"⚠️ No se pudo usar iaSceneInfo, consultando los objetos uno a uno: {e}")
+
+        sim = self.controller.sim
+        if handles is None:
+            handles = sim.getObjectsInTree(sim.handle_scene)
+        with self.controller.pipeline() as batch:
+            queries = [(handle, batch.getObjectAlias(handle, 1), batch.getObjectType(handle),
+                        batch.getObjectPosition(handle, -1), batch.getObjectOrientation(handle, -1))
+                       for handle in handles]
+        # Los objetos eliminados mientras tanto se omiten
+        queries = [query for query in queries if all(result.ok for result in query[1:])]
+        with self.controller.pipeline() as batch:
+            boxes = {handle: batch.getShapeBB(handle) for handle, _, obj_type, _, _ in queries
+                     if obj_type.value == sim.object_shape_type}
+
+        result = ([], [], [], [], [])
+        for handle, alias, obj_type, position, orientation in queries:
+            box = boxes.get(handle)
+            result[0].append(handle)
+            result[1].append(alias.value)
+            result[2].append(obj_type.value)
+            result[3].extend(list(position.value)[:3] + [orientation.value[2]])
+            result[4].extend(list(box.value)[:3] if box is not None and box.ok else [0, 0, 0])
+        return result
+
+    def _scene_poses(self):
+        """
+        Handles y poses de todos los objetos de la escena.
+
+        Returns:
+            tuple: (handles, poses [x, y, z, yaw] seguidas)
+        """
+        if self._use_helpers():
+            try:
+                return self.controller.call_helper('iaScenePoses')
+            except Exception as e:
+                print(f"⚠️ No se pudo usar iaScenePoses, consultando los objetos uno a uno: {e}")
+
+        sim = self.controller.sim
+        handles = sim.getObjectsInTree(sim.handle_scene)
+        with self.controller.pipeline() as batch:
+            queries = [(handle, batch.getObjectPosition(handle, -1), batch.getObjectOrientation(handle, -1))
+                       for handle in handles]
+        found, poses = [], []
+        for handle, position, orientation in queries:
+            if position.ok and orientation.ok:
+                found.append(handle)
+                poses.extend(list(position.value)[:3] + [orientation.value[2]])
+        return found, poses
+
+    def _set_rows(self, handles, aliases, types, poses, sizes):
+        self.handles = np.asarray(handles, dtype=np.int64)
+        self.aliases = list(aliases)
+        self.types = np.asarray(types, dtype=np.int64)
+        self.poses = np.asarray(poses, dtype=float).reshape(-1, 4)
+        self.sizes = np.asarray(sizes, dtype=float).reshape(-1, 3)
+        self._rows = {handle: row for row, handle in enumerate(self.handles.tolist())}
+
+    def discard(self, handles):
+        """Quita del índice los objetos indicados (p. ej. tras eliminarlos de la escena)"""
+        rows = [self._rows[handle] for handle in handles if handle in self._rows]
+        if not rows:
+            return
+        keep = np.ones(len(self.handles), dtype=bool)
+        keep[rows] = False
+        self._set_rows(self.handles[keep], [alias for alias, kept in zip(self.aliases, keep) if kept],
+                       self.types[keep], self.poses[keep], self.sizes[keep])
+
+    def __contains__(self, handle):
+        return handle in self._rows
+
+    def __len__(self):
+        return len(self.handles)
+
+    def get(self, handle):
+        """
+        Devuelve la información de un objeto indexado.
+
+        Returns:
+            dict: {'handle', 'alias', 'type', 'position', 'yaw', 'size'} o None si no existe
+        """
+        row = self._rows.get(handle)
+        if row is None:
+            return None
+        return {
+            'handle': handle,
+            'alias': self.aliases[row],
+            'type': int(self.types[row]),
+            'position': self.poses[row, :3].tolist(),
+            'yaw': float(self.poses[row, 3]),
+            'size': self.sizes[row].tolist(),
+        }
+
+    def objects(self):
+        """Itera sobre la información de todos los objetos indexados"""
+        for handle in self.handles.tolist():
+            yield self.get(handle)
+
+    def find_by_alias(self, alias):
+        """Devuelve el primer handle cuyo alias coincide, o None"""
+        for row, name in enumerate(self.aliases):
+            if name == alias:
+                return int(self.handles[row])
+        return None
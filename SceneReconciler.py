@@ -0,0 +1,184 @@
+from RectangleDecomposition import ObstacleRectangles
+
+
+class SceneReconciler:
+    """
+    Sincroniza los obstáculos de CoppeliaSim con la cuadrícula deseada aplicando
+    solo las diferencias: crea los cubos que faltan, elimina los que sobran y, en
+    lugar de eliminar uno y crear otro, mueve los cubos sobrantes a las celdas
+    nuevas. Cada tipo de operación se envía en una sola petición.
+
+    Así, cambiar entre distribuciones parecidas cuesta un trabajo proporcional a la
+    diferencia y no al tamaño del mapa.
+    """
+
+    def __init__(self, controller, transform=None, color=(0.2, 0.2, 0.2)):
+        """
+        Args:
+            controller: CoppeliaSimController con el que se aplican los cambios
+            transform: GridTransform de la cuadrícula (por defecto, el del controlador)
+            color: Color de los cubos creados
+        """
+        self.controller = controller
+        self.transform = transform if transform is not None else controller.transform
+        self.color = list(color)
+
+    def cell_position(self, row, col):
+        """Posición del cubo de una celda"""
+        position, _ = ObstacleRectangles.to_world((row, col, 1, 1), self.transform)
+        return position
+
+    def cell_size(self):
+        _, size = ObstacleRectangles.to_world((0, 0, 1, 1), self.transform)
+        return size
+
+    def is_cell_cube(self, handle):
+        """Indica si el handle es un cubo de una celda creado por la aplicación"""
+        if handle not in self.controller.created_cubes:
+            return False
+        descriptor = self.controller.object_descriptors.get(handle)
+        if descriptor is None:
+            return True
+        size = self.cell_size()
+        return all(abs(a - b) < 1e-6 for a, b in zip(descriptor['size'][:2], size[:2]))
+
+    def plan(self, desired, current, rects=None):
+        """
+        Calcula las operaciones mínimas para pasar del estado actual al deseado.
+
+        Args:
+            desired: Conjunto de celdas (fila, columna) que deben tener obstáculo
+            current: Diccionario celda -> handle de los obstáculos actuales
+            rects: ObstacleRectangles con los obstáculos fusionados (opcional)
+
+        Returns:
+            dict: {'create': [celdas], 'remove': [handles], 'move': [(handle, celda)],
+                   'keep': {celda: handle}, 'drop_rects': [ids de rectángulo]}
+        """
+        desired = set(desired)
+        index = self.controller.scene_index
+        if index.loaded:
+            try:
+                index.refresh()
+            except Exception as e:
+                print(f"⚠️ No se pudo actualizar el índice de la escena: {e}")
+
+        # Sin índice cargado, comprobar de una vez qué handles siguen existiendo
+        if index.loaded:
+            is_alive = index.__contains__
+        else:
+            tracked = list(current.values()) + (list(rects.handles.values()) if rects is not None else [])
+            alive, _ = self.controller.check_handles(tracked)
+            is_alive = alive.__contains__
+
+        keep = {}
+        remove = []
+        drop_rects = []
+
+        # Obstáculos fusionados: se conservan solo si todas sus celdas siguen ocupadas
+        merged = set()
+        if rects is not None:
+            for rect_id, rectangle in list(rects.rectangles.items()):
+                cells = ObstacleRectangles.cells(rectangle)
+                merged.update(cells)
+                handle = rects.handles.get(rect_id)
+                alive = handle is not None and is_alive(handle)
+                if alive and all(cell in desired for cell in cells):
+                    for cell in cells:
+                        keep[cell] = handle
+                else:
+                    drop_rects.append(rect_id)
+                    if alive:
+                        remove.append(handle)
+
+        # Una entrada por handle: un objeto detectado puede ocupar varias celdas.
+        # Los que ya no existen se descartan: sus celdas se tratarán como vacías
+        cells_by_handle = {}
+        for cell, handle in current.items():
+            if cell not in merged and is_alive(handle):
+                cells_by_handle.setdefault(handle, []).append(cell)
+
+        # Objetos que no son cubos de una celda creados por la aplicación (p. ej. muros
+        # de la escena): nunca se mueven ni se reutilizan; se conservan si todas sus
+        # celdas siguen ocupadas
+        cubes = []
+        for handle, cells in cells_by_handle.items():
+            if self.is_cell_cube(handle):
+                cubes.append((handle, cells[0]))
+            elif all(cell in desired and cell not in keep for cell in cells):
+                for cell in cells:
+                    keep[cell] = handle
+            else:
+                remove.append(handle)
+
+        # Cubos de una celda: ubicarlos donde están realmente en la escena
+        if index.loaded:
+            cells = self.transform.world_to_cells([index.get(handle)['position'] for handle, _ in cubes])
+            located = [(tuple(int(v) for v in cell), handle) for cell, (handle, _) in zip(cells, cubes)]
+        else:
+            located = [(cell, handle) for handle, cell in cubes]
+
+        spare = []
+        for cell, handle in located:
+            if cell in desired and cell not in keep:
+                keep[cell] = handle
+            else:
+                spare.append(handle)
+
+        create = sorted(cell for cell in desired if cell not in keep)
+
+        # Reutilizar los cubos sobrantes moviéndolos a las celdas nuevas
+        move = list(zip(spare, create))
+        create = create[len(move):]
+        remove.extend(spare[len(move):])
+
+        return {'create': create, 'remove': remove, 'move': move, 'keep': keep, 'drop_rects': drop_rects}
+
+    def apply(self, plan, rects=None):
+        """
+        Aplica un plan calculado con plan().
+
+        Args:
+            plan: Resultado de plan()
+            rects: ObstacleRectangles del que se eliminan los rectángulos descartados
+
+        Returns:
+            dict: Celda -> handle de todos los obstáculos tras la sincronización. Si se
+                  llama dentro de otra sesión bulk_edit, los cubos creados y movidos se
+                  añaden al salir de la sesión externa (ver BulkEditSession.on_commit)
+        """
+        mapping = dict(plan['keep'])
+        size = self.cell_size()
+
+        def resolve():
+            for result, handle, cell in moves:
+                if result.ok:
+                    mapping[cell] = handle
+                else:
+                    print(f"⚠️ No se pudo mover el cubo {handle}: {result.error}")
+            for result, cell in creates:
+                if result.ok:
+                    mapping[cell] = result.value
+
+        # Todas las operaciones en una sesión de edición masiva (sin renderizar entre ellas)
+        with self.controller.bulk_edit() as edit:
+            moves = [(edit.set_position(handle, self.cell_position(*cell)), handle, cell)
+                     for handle, cell in plan['move']]
+            creates = [(edit.create({'size': list(size), 'position': self.cell_position(*cell),
+                                     'color': self.color}), cell)
+                       for cell in plan['create']]
+            for handle in plan['remove']:
+                edit.remove(handle)
+            edit.on_commit(resolve)
+
+        if rects is not None:
+            for rect_id in plan['drop_rects']:
+                rects.remove(rect_id)
+
+        print(f"🔄 Escena sincronizada: {len(plan['create'])} creados, {len(plan['move'])} movidos, "
+              f"{len(plan['remove'])} eliminados, {len(plan['keep'])} sin cambios")
+        return mapping
+
+    def sync(self, desired, current, rects=None):
+        """Calcula y aplica el plan; devuelve el nuevo mapa celda -> handle"""
+        return self.apply(self.plan(desired, current, rects), rects)
@@ -0,0 +1,196 @@
+# Funciones auxiliares en Lua que se instalan en el script sandbox de CoppeliaSim.
+# Cada una agrupa en el simulador una secuencia de llamadas que desde Python
+# costarían un viaje de ida y vuelta cada una (ver CoppeliaSimController.call_helper).
+
+LUA_HELPERS = {
+    # Lee varios sensores de proximidad; -1 si el sensor no detecta nada
+    'iaReadProximity': '''
+function iaReadProximity(handles)
+    local distances = {}
+    for i = 1, #handles do
+        local result, distance = sim.readProximitySensor(handles[i])
+        if result > 0 then
+            distances[i] = distance
+        else
+            distances[i] = -1
+        end
+    end
+    return distances
+end
+''',
+
+    # Alias, tipo, pose (x, y, z, yaw) y tamaño de la caja envolvente de varios objetos.
+    # Sin argumentos consulta todos los objetos de la escena.
+    'iaSceneInfo': '''
+function iaSceneInfo(handles)
+    if handles == nil then
+        handles = sim.getObjectsInTree(sim.handle_scene)
+    end
+    local aliases, types, poses, sizes = {}, {}, {}, {}
+    for i = 1, #handles do
+        local h = handles[i]
+        aliases[i] = sim.getObjectAlias(h, 1)
+        types[i] = sim.getObjectType(h)
+        local p = sim.getObjectPosition(h, -1)
+        local o = sim.getObjectOrientation(h, -1)
+        poses[#poses + 1] = p[1]
+        poses[#poses + 1] = p[2]
+        poses[#poses + 1] = p[3]
+        poses[#poses + 1] = o[3]
+        local size = {0, 0, 0}
+        if types[i] == sim.object_shape_type then
+            local ok, bb = pcall(sim.getShapeBB, h)
+            if ok and bb then size = bb end
+        end
+        sizes[#sizes + 1] = size[1]
+        sizes[#sizes + 1] = size[2]
+        sizes[#sizes + 1] = size[3]
+    end
+    return handles, aliases, types, poses, sizes
+end
+''',
+
+    # Handles y poses (x, y, z, yaw) de todos los objetos de la escena
+    'iaScenePoses': '''
+function iaScenePoses()
+    local handles = sim.getObjectsInTree(sim.handle_scene)
+    local poses = {}
+    for i = 1, #handles do
+        local p = sim.getObjectPosition(handles[i], -1)
+        local o = sim.getObjectOrientation(handles[i], -1)
+        poses[#poses + 1] = p[1]
+        poses[#poses + 1] = p[2]
+        poses[#poses + 1] = p[3]
+        poses[#poses + 1] = o[3]
+    end
+    return handles, poses
+end
+''',
+
+    # Indica para cada handle si sigue existiendo en la escena
+    'iaAliveHandles': '''
+function iaAliveHandles(handles)
+    local alive = {}
+    for i = 1, #handles do
+        local ok, valid = pcall(sim.isHandle, handles[i])
+        if not ok then
+            ok = pcall(sim.getObjectType, handles[i])
+            valid = ok
+        end
+        alive[i] = valid == true
+    end
+    return alive
+end
+''',
+
+    # Crea un lote de cubos estáticos, detectables, colisionables y respondables.
+    # Cada especificación es {size = {x, y, z}, position = {x, y, z}, color = {r, g, b}, alias = "..."}
+    'iaCreateCuboids': '''
+function iaCreateCuboids(specs)
+    local handles = {}
+    local special = sim.objectspecialproperty_detectable_all + sim.objectspecialproperty_collidable
+    for i = 1, #specs do
+        local spec = specs[i]
+        local ok, h = pcall(sim.createPrimitiveShape, sim.primitiveshape_cuboid, spec.size, 0)
+        if not ok then
+            ok, h = pcall(sim.createPureShape, 0, 18, spec.size, 1.0)
+        end
+        if ok and h ~= -1 then
+            sim.setObjectPosition(h, -1, spec.position)
+            pcall(sim.setObjectSpecialProperty, h, special)
+            pcall(sim.setObjectInt32Param, h, sim.shapeintparam_static, 1)
+            pcall(sim.setObjectInt32Param, h, sim.shapeintparam_respondable, 1)
+            if spec.color then
+                pcall(sim.setShapeColor, h, nil, sim.colorcomponent_ambient_diffuse, spec.color)
+            end
+            if spec.alias then
+                pcall(sim.setObjectAlias, h, spec.alias)
+            end
+            handles[i] = h
+        else
+            handles[i] = -1
+        end
+    end
+    return handles
+end
+''',
+
+    # Instancia copias de cubos plantilla ya configurados y las coloca en una pasada.
+    # Cada grupo es {template = handle, positions = {x1, y1, z1, x2, ...}, aliases = {"...", ...}};
+    # devuelve la lista de handles creados por grupo (vacía si la plantilla ya no existe)
+    'iaInstantiateCuboids': '''
+function iaInstantiateCuboids(groups)
+    local result = {}
+    for g = 1, #groups do
+        local group = groups[g]
+        local n = math.floor(#group.positions / 3)
+        local copies = {}
+        if sim.isHandle(group.template) then
+            -- Duplicar por potencias de dos: cada copyPasteObjects copia todo lo ya creado
+            local pool = {group.template}
+            while #copies < n do
+                local batch = {}
+                for i = 1, math.min(#pool, n - #copies) do
+                    batch[i] = pool[i]
+                end
+                local new = sim.copyPasteObjects(batch, 0)
+                for i = 1, #new do
+                    copies[#copies + 1] = new[i]
+                    pool[#pool + 1] = new[i]
+                end
+            end
+            for i = 1, n do
+                sim.setObjectPosition(copies[i], -1, {group.positions[3 * i - 2],
+                                                      group.positions[3 * i - 1],
+                                                      group.positions[3 * i]})
+                local alias = group.aliases and group.aliases[i] or ''
+                if alias == '' then alias = 'Cuboid' end
+                pcall(sim.setObjectAlias, copies[i], alias)
+            end
+        end
+        result[g] = copies
+    end
+    return result
+end
+''',
+
+    # Ejecuta una lista de llamadas independientes {nombre, argumentos, número de argumentos}
+    # y devuelve {ok, value} o {ok, error} por llamada (ver SimPipeline)
+    'iaBatch': '''
+function iaBatch(calls)
+    local results = {}
+    for i = 1, #calls do
+        local name, args, n = calls[i][1], calls[i][2], calls[i][3]
+        local f = sim[name]
+        if f == nil then
+            results[i] = {ok = false, error = 'unknown function: ' .. tostring(name)}
+        else
+            local out = table.pack(pcall(f, table.unpack(args, 1, n)))
+            if not out[1] then
+                results[i] = {ok = false, error = tostring(out[2])}
+            elseif out.n > 2 then
+                results[i] = {ok = true, value = {table.unpack(out, 2, out.n)}}
+            else
+                results[i] = {ok = true, value = out[2]}
+            end
+        end
+    end
+    return results
+end
+''',
+}
+
+
+def helper_source(names=None):
+    """
+    Devuelve el código Lua de las funciones pedidas, listo para ejecutar en el sandbox.
+
+    Args:
+        names: Nombres de las funciones (None = todas)
+
+    Returns:
+        str: Código Lua concatenado
+    """
+    if names is None:
+        names = LUA_HELPERS.keys()
+    return '\n'.join(LUA_HELPERS[name] for name in names)
@@ -0,0 +1,122 @@
+class PendingResult:
+    """Resultado de una llamada encolada en un SimPipeline, disponible tras ejecutarlo"""
+
+    def __init__(self, name):
+        self.name = name
+        self.done = False
+        self.error = None
+        self._value = None
+
+    def set(self, value=None, error=None):
+        self._value = value
+        self.error = error
+        self.done = True
+
+    @property
+    def ok(self):
+        return self.done and self.error is None
+
+    @property
+    def value(self):
+        """Valor devuelto por la llamada; lanza una excepción si falló o aún no se ejecutó"""
+        if not self.done:
+            raise RuntimeError(f"La llamada '{self.name}' aún no se ha ejecutado")
+        if self.error is not None:
+            raise RuntimeError(f"La llamada '{self.name}' falló: {self.error}")
+        return self._value
+
+    def __repr__(self):
+        if not self.done:
+            return f"PendingResult({self.name}, pendiente)"
+        return f"PendingResult({self.name}, {'error: ' + str(self.error) if self.error else self._value})"
+
+
+class SimPipeline:
+    """
+    Agrupa llamadas independientes a 'sim' y las envía juntas al salir del bloque:
+
+        with controller.pipeline() as p:
+            p.setObjectPosition(handle, -1, position)
+            color = p.setShapeColor(handle, None, 0, [1, 0, 0])
+
+    El socket REQ de ZeroMQ no admite varias peticiones en vuelo, así que las
+    llamadas se ejecutan en el simulador con la función Lua iaBatch: un solo viaje
+    de ida y vuelta en lugar de uno por llamada. Si no se puede usar el script
+    sandbox, se ejecutan una a una. Las llamadas deben ser independientes entre sí
+    (ninguna usa el resultado de otra) e idempotentes.
+    """
+
+    def __init__(self, controller):
+        """
+        Args:
+            controller: CoppeliaSimController con el que se ejecutan las llamadas
+        """
+        self.controller = controller
+        self.calls = []  # (nombre, argumentos, PendingResult)
+        self.results = []  # PendingResult de la última ejecución
+
+    def add(self, name, *args):
+        """
+        Encola una llamada.
+
+        Returns:
+            PendingResult: Se completa al ejecutar el pipeline
+        """
+        pending = PendingResult(name)
+        self.calls.append((name, list(args), pending))
+        return pending
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args: self.add(name, *args)
+
+    def execute(self):
+        """
+        Envía todas las llamadas encoladas y reparte las respuestas.
+
+        Returns:
+            list: Los PendingResult en el orden en que se encolaron
+        """
+        calls, self.calls = self.calls, []
+        if not calls:
+            return []
+
+        controller = self.controller
+        if controller.capabilities.get('executeScriptString') and controller.capabilities.get('callScriptFunction'):
+            try:
+                replies = controller.call_helper('iaBatch', [[name, args, len(args)] for name, args, _ in calls])
+                for (_, _, pending), reply in zip(calls, replies):
+                    if reply.get('ok'):
+                        pending.set(reply.get('value'))
+                    else:
+                        pending.set(error=reply.get('error', 'error desconocido'))
+                self.results = [pending for _, _, pending in calls]
+                return self.results
+            except Exception as e:
+                print(f"⚠️ No se pudo usar iaBatch, ejecutando las llamadas una a una: {e}")
+
+        sim = controller.sim
+        for name, args, pending in calls:
+            try:
+                pending.set(getattr(sim, name)(*args))
+            except Exception as e:
+                pending.set(error=str(e))
+        self.results = [pending for _, _, pending in calls]
+        return self.results
+
+    def check(self):
+        """Lanza RuntimeError si alguna llamada de la última ejecución falló"""
+        for pending in self.results:
+            if pending.error is not None:
+                raise RuntimeError(f"La llamada '{pending.name}' falló: {pending.error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            self.calls = []
+        return False
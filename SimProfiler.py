@@ -0,0 +1,218 @@
+import csv
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Límites superiores (ms) de los cubos del histograma de latencia: escala logarítmica de 20 µs a 20 s
+DEFAULT_BUCKETS_MS = np.logspace(np.log10(0.02), np.log10(20000.0), 61)
+
+
+def payload_size(value):
+    """
+    Estimación del tamaño en bytes de un valor serializado (CBOR aproximado).
+
+    Args:
+        value: Argumentos o resultado de una llamada remota
+
+    Returns:
+        int: Bytes aproximados
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 9
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(payload_size(k) + payload_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(payload_size(v) for v in value)
+    return 9
+
+
+class MethodStats:
+    """Contadores e histograma de latencia de un método remoto dentro de una operación"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.histogram = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def add(self, elapsed_ms, bytes_out, bytes_in, error):
+        self.histogram[np.searchsorted(self.bounds, elapsed_ms)] += 1
+        self.count += 1
+        self.errors += int(error)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+
+    def percentile(self, q):
+        """Percentil q (0-100) interpolado dentro del cubo del histograma, en ms"""
+        if self.count == 0:
+            return 0.0
+        target = q / 100.0 * self.count
+        cumulative = np.cumsum(self.histogram)
+        index = int(np.searchsorted(cumulative, target))
+        lower = self.bounds[index - 1] if index > 0 else 0.0
+        upper = self.bounds[index] if index < len(self.bounds) else self.max_ms
+        before = cumulative[index - 1] if index > 0 else 0
+        fraction = (target - before) / max(self.histogram[index], 1)
+        return float(min(lower + (upper - lower) * fraction, self.max_ms))
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+            'total_ms': self.total_ms,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+        }
+
+
+class SimProfiler:
+    """
+    Mide las llamadas remotas hechas a través de ProfiledSim: número de llamadas,
+    tamaño de los datos enviados y recibidos e histograma de latencias por método,
+    atribuidos a la operación de alto nivel en curso (detect, create_cuboid,
+    navigation_tick...).
+    """
+
+    def __init__(self, bounds_ms=None):
+        """
+        Args:
+            bounds_ms: Límites superiores (ms) de los cubos del histograma
+        """
+        self.bounds = np.asarray(bounds_ms if bounds_ms is not None else DEFAULT_BUCKETS_MS, dtype=float)
+        self.stats = {}  # (operación, método) -> MethodStats
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current_operation(self):
+        """Operación en curso en el hilo actual ('other' si no hay ninguna)"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else 'other'
+
+    @contextmanager
+    def operation(self, name):
+        """Atribuye a 'name' las llamadas hechas por este hilo dentro del bloque"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def record(self, method, elapsed_ms, bytes_out, bytes_in, error=False):
+        key = (self.current_operation(), method)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = MethodStats(self.bounds)
+            stats.add(elapsed_ms, bytes_out, bytes_in, error)
+
+    def reset(self):
+        """Descarta todas las mediciones"""
+        with self._lock:
+            self.stats = {}
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {operación: {método: resumen}} con count, errors, mean/p50/p95/p99/max en ms,
+                  total_ms, bytes_out y bytes_in
+        """
+        with self._lock:
+            items = [(key, stats.summary()) for key, stats in self.stats.items()]
+        result = {}
+        for (operation, method), summary in sorted(items):
+            result.setdefault(operation, {})[method] = summary
+        return result
+
+    def to_csv(self, path):
+        """
+        Guarda el resumen en un CSV (una fila por operación y método).
+
+        Returns:
+            bool: True si se guardó correctamente
+        """
+        fields = ['operation', 'method', 'count', 'errors', 'mean_ms', 'p50_ms', 'p95_ms',
+                  'p99_ms', 'max_ms', 'total_ms', 'bytes_out', 'bytes_in']
+        try:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(fields)
+                for operation, methods in self.snapshot().items():
+                    for method, summary in methods.items():
+                        writer.writerow([operation, method] + [summary[field] for field in fields[2:]])
+            print(f"📊 Perfil de llamadas guardado en {path}")
+            return True
+        except Exception as e:
+            print(f"❌ Error al guardar el perfil: {e}")
+            return False
+
+
+class ProfiledSim:
+    """Envoltorio del objeto 'sim' que mide cada llamada remota con un SimProfiler"""
+
+    def __init__(self, sim, profiler):
+        self._sim = sim
+        self._profiler = profiler
+        self._wrappers = {}
+
+    def __getattr__(self, name):
+        wrapper = self._wrappers.get(name)
+        if wrapper is not None:
+            return wrapper
+
+        attr = getattr(self._sim, name)
+        if not callable(attr):
+            return attr
+
+        profiler = self._profiler
+
+        def wrapper(*args):
+            start = time.perf_counter()
+            error = False
+            result = None
+            try:
+                result = attr(*args)
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000.0
+                profiler.record(name, elapsed_ms, payload_size(args), payload_size(result), error)
+
+        self._wrappers[name] = wrapper
+        return wrapper
+
+
+def profiled_operation(name):
+    """
+    Decorador para métodos del controlador: atribuye a la operación 'name' las
+    llamadas remotas hechas durante el método (si el perfilado está activo).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.operation(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,138 @@
+import threading
+import time
+import numpy as np
+
+# Niveles del registro legible por humanos
+LOG_SILENT = 0
+LOG_INFO = 1
+LOG_DEBUG = 2
+
+# Formato de cada muestra de telemetría de un ciclo de control
+TELEMETRY_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('robot', 'i8'),
+    ('x', 'f8'),
+    ('y', 'f8'),
+    ('yaw', 'f8'),
+    ('distance', 'f8'),
+    ('heading_error', 'f8'),
+    ('linear', 'f8'),
+    ('angular', 'f8'),
+    ('left', 'f8'),
+    ('right', 'f8'),
+])
+
+
+class TelemetryBuffer:
+    """
+    Buffer circular preasignado con la telemetría de cada ciclo de control.
+
+    Escribir una muestra no reserva memoria ni imprime nada; la interfaz u otros
+    suscriptores leen las últimas muestras cuando lo necesitan.
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        Args:
+            capacity: Número máximo de muestras guardadas (las más antiguas se sobrescriben)
+        """
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+        self.count = 0  # Total de muestras escritas desde el inicio
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+    def record(self, robot, x, y, yaw, distance, heading_error, left, right,
+               linear=0.0, angular=0.0, timestamp=None):
+        """Guarda una muestra de un ciclo de control"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            index = self.count % self.capacity
+            self.data[index] = (timestamp, robot, x, y, yaw, distance, heading_error,
+                                linear, angular, left, right)
+            self.count += 1
+            sample = self.data[index].copy() if self.subscribers else None
+
+        for callback in self.subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"Error en suscriptor de telemetría: {e}")
+
+    def subscribe(self, callback):
+        """Registra una función que recibe cada muestra nueva (debe ser rápida)"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Elimina un suscriptor registrado"""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def latest(self, n=None):
+        """
+        Devuelve una copia de las últimas muestras, de la más antigua a la más reciente.
+
+        Args:
+            n: Número de muestras a devolver (None = todas las disponibles)
+
+        Returns:
+            numpy.ndarray: Array estructurado con TELEMETRY_DTYPE
+        """
+        with self._lock:
+            available = min(self.count, self.capacity)
+            if n is None or n > available:
+                n = available
+            if n == 0:
+                return np.zeros(0, dtype=TELEMETRY_DTYPE)
+            end = self.count % self.capacity
+            indices = (np.arange(end - n, end)) % self.capacity
+            return self.data[indices].copy()
+
+    def last(self):
+        """Devuelve la última muestra o None si el buffer está vacío"""
+        samples = self.latest(1)
+        return samples[0] if len(samples) else None
+
+    def clear(self):
+        """Vacía el buffer sin liberar la memoria"""
+        with self._lock:
+            self.count = 0
+
+
+class ThrottledLog:
+    """
+    Registro por consola con nivel configurable y límite de frecuencia por clave,
+    para que los bucles de control no saturen la salida estándar.
+    """
+
+    def __init__(self, level=LOG_INFO, interval=1.0):
+        """
+        Args:
+            level: Nivel máximo que se imprime (LOG_SILENT, LOG_INFO o LOG_DEBUG)
+            interval: Segundos mínimos entre dos mensajes con la misma clave
+        """
+        self.level = level
+        self.interval = interval
+        self._last_time = {}
+
+    def log(self, key, message, level=LOG_INFO):
+        """
+        Imprime el mensaje si el nivel lo permite y no se imprimió otro con la
+        misma clave en el último intervalo.
+
+        Returns:
+            bool: True si el mensaje se imprimió
+        """
+        if level > self.level:
+            return False
+
+        now = time.monotonic()
+        last = self._last_time.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+
+        self._last_time[key] = now
+        print(message)
+        return True
@@ -0,0 +1,157 @@
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+# Campos de cada muestra grabada: pose, comandos de rueda y meta de un robot
+TRAJECTORY_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('robot', 'i8'),
+    ('x', 'f8'),
+    ('y', 'f8'),
+    ('yaw', 'f8'),
+    ('left', 'f8'),
+    ('right', 'f8'),
+    ('goal_x', 'f8'),
+    ('goal_y', 'f8'),
+])
+
+# Cabecera .npy de tamaño fijo para poder reescribirla tras cada bloque
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+_HEADER_SIZE = 256
+
+
+def _write_header(file, dtype, count):
+    """Escribe (o reescribe) la cabecera .npy de una columna con el número de muestras actual"""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+        np.lib.format.dtype_to_descr(dtype), count)
+    padding = _HEADER_SIZE - len(_NPY_MAGIC) - 2 - 1
+    header = header.ljust(padding) + '\n'
+    file.seek(0)
+    file.write(_NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1'))
+
+
+class TrajectoryRecorder:
+    """
+    Graba las trayectorias de los robots en columnas de solo anexado.
+
+    Cada campo de TRAJECTORY_DTYPE tiene su propio array preasignado de tamaño
+    fijo; cuando se llenan, cada columna se vuelca al final de su archivo .npy
+    dentro del directorio de salida ('x.npy', 'y.npy', ...), así la memoria usada
+    no crece con la duración de la ejecución. Los archivos son válidos después de
+    cada volcado y se pueden abrir con load_trajectory() aunque la grabación siga
+    en curso.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        """
+        Args:
+            path: Directorio de salida (se crea si no existe)
+            chunk_size: Número de muestras que se acumulan antes de escribir a disco
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.columns = {field: np.zeros(chunk_size, dtype=TRAJECTORY_DTYPE[field])
+                        for field in TRAJECTORY_DTYPE.names}
+        self.pending = 0  # Muestras en el bloque aún no escritas
+        self.written = 0  # Muestras ya escritas en los archivos
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._files = {}
+        for field, column in self.columns.items():
+            file = open(os.path.join(path, f"{field}.npy"), 'w+b')
+            _write_header(file, column.dtype, 0)
+            self._files[field] = file
+
+    def record(self, robot, x, y, yaw, left, right, goal_x, goal_y, timestamp=None):
+        """Añade una muestra; vuelca las columnas a disco si el bloque está lleno"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            if self._files is None:
+                return
+            sample = (timestamp, robot, x, y, yaw, left, right, goal_x, goal_y)
+            for column, value in zip(self.columns.values(), sample):
+                column[self.pending] = value
+            self.pending += 1
+            if self.pending == self.chunk_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Escribe en disco las muestras pendientes"""
+        with self._lock:
+            if self._files is not None:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self.pending == 0:
+            return
+        count = self.written + self.pending
+        for field, file in self._files.items():
+            file.seek(0, 2)
+            file.write(self.columns[field][:self.pending].tobytes())
+            _write_header(file, self.columns[field].dtype, count)
+            file.flush()
+        self.written = count
+        self.pending = 0
+
+    def close(self):
+        """Vuelca lo pendiente y cierra los archivos"""
+        with self._lock:
+            if self._files is None:
+                return
+            self._flush_locked()
+            for file in self._files.values():
+                file.close()
+            self._files = None
+        print(f"💾 Trayectoria guardada en {self.path} ({self.written} muestras)")
+
+    def __len__(self):
+        return self.written + self.pending
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_trajectory(path):
+    """
+    Abre una trayectoria grabada mapeando en memoria cada columna (sin cargarla entera).
+
+    Si la grabación sigue en curso, las columnas se recortan a la longitud común
+    por si alguna ya tiene el bloque siguiente y otra todavía no.
+
+    Args:
+        path: Directorio generado por TrajectoryRecorder
+
+    Returns:
+        dict: Campo de TRAJECTORY_DTYPE -> numpy.memmap con la columna
+    """
+    columns = {field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode='r')
+               for field in TRAJECTORY_DTYPE.names}
+    count = min(len(column) for column in columns.values())
+    return {field: column[:count] for field, column in columns.items()}
+
+
+def export_trajectory_npz(path, output_path):
+    """
+    Exporta una trayectoria grabada a un .npz comprimido, con una columna por campo
+    y una entrada por robot (p. ej. 'robot_15_x').
+
+    Args:
+        path: Directorio de la trayectoria grabada
+        output_path: Ruta del .npz a generar
+    """
+    data = load_trajectory(path)
+    columns = {}
+    for robot in np.unique(data['robot']):
+        rows = data['robot'] == robot
+        for field in TRAJECTORY_DTYPE.names:
+            if field != 'robot':
+                columns[f"robot_{robot}_{field}"] = np.asarray(data[field][rows])
+    np.savez_compressed(output_path, **columns)
@@ -0,0 +1,95 @@
+"""
+Configuración de pytest.
+
+Las pruebas usan FakeSim en lugar de CoppeliaSim, así que no necesitan el cliente
+de la API remota, pyzmq ni PyQt5. Si alguno de esos paquetes no está instalado (p.
+ej. en CI), se registra en sys.modules un sustituto mínimo con lo que importan los
+módulos del proyecto; si está instalado, se usa el real.
+"""
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class _QtStub:
+    """Clase de Qt sustituida: acepta cualquier argumento, atributo o llamada"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _QtStub()
+
+    def __call__(self, *args, **kwargs):
+        return _QtStub()
+
+
+class _SignalStub:
+    """pyqtSignal sustituido: emit() no hace nada"""
+
+    def __init__(self, *types):
+        pass
+
+    def connect(self, slot):
+        pass
+
+    def emit(self, *args):
+        pass
+
+
+def _missing(name):
+    try:
+        importlib.import_module(name)
+        return False
+    except ImportError:
+        return True
+
+
+def _install_stubs():
+    if _missing('zmq'):
+        zmq = types.ModuleType('zmq')
+        zmq.RCVTIMEO = 27  # Mismos valores que libzmq (ver FakeSim)
+        zmq.LINGER = 17
+        zmq.Again = type('Again', (Exception,), {})
+        sys.modules['zmq'] = zmq
+
+    if _missing('coppeliasim_zmqremoteapi_client'):
+        client = types.ModuleType('coppeliasim_zmqremoteapi_client')
+
+        def RemoteAPIClient(*args, **kwargs):
+            raise ConnectionError("coppeliasim_zmqremoteapi_client no está instalado; usa FakeSim")
+
+        client.RemoteAPIClient = RemoteAPIClient
+        sys.modules['coppeliasim_zmqremoteapi_client'] = client
+
+    if _missing('PyQt5.QtWidgets'):
+        package = types.ModuleType('PyQt5')
+        package.__path__ = []
+        sys.modules['PyQt5'] = package
+        for name in ('QtWidgets', 'QtCore', 'QtGui'):
+            module = types.ModuleType(f'PyQt5.{name}')
+            module.__getattr__ = lambda attr: _QtStub
+            setattr(package, name, module)
+            sys.modules[f'PyQt5.{name}'] = module
+        sys.modules['PyQt5.QtCore'].pyqtSignal = _SignalStub
+
+
+_install_stubs()
+
+from CoppeliaSimController import CoppeliaSimController
+from FakeSim import FakeSim, FakeRemoteAPIClient
+
+
+@pytest.fixture
+def world():
+    return FakeSim()
+
+
+@pytest.fixture
+def controller(world):
+    controller = CoppeliaSimController(client_factory=FakeRemoteAPIClient.factory(world))
+    assert controller.connect()
+    yield controller
+    controller.disconnect()
@@ -7,4 +7,10 @@ START = 1
 END = 2
 PATH = 3
 OBSTACLE = 4
-ROBOT = 5   
\ No newline at end of file
+ROBOT = 5
+
+# Prefijos de alias de los objetos de la escena que nunca son obstáculos (suelos,
+# decoración, cubos plantilla). Basta con que el alias del objeto o el de alguno de
+# sus padres empiece por uno de ellos; para excluir un objeto propio (p. ej. una
+# marca en el suelo) se le da un alias que empiece por 'IA_decal'
+SCENERY_PREFIXES = ("Floor", "ResizableFloor", "IA_decal", "IA_template")
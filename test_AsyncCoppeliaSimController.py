@@ -0,0 +1,73 @@
+"""Pruebas de AsyncCoppeliaSimController contra FakeSim"""
+import asyncio
+import time
+
+import pytest
+
+from AsyncCoppeliaSimController import AsyncCoppeliaSimController, event_loop_running, run_in_qt
+from CoppeliaSimController import SimTimeoutError
+
+
+@pytest.fixture
+def async_controller(controller):
+    async_controller = AsyncCoppeliaSimController(controller, concurrency=4)
+    yield async_controller
+    async_controller.close()
+
+
+def test_poll_robots_runs_concurrently(world, controller, async_controller):
+    robots = [world.add_robot(position=(0.5 * i, 0.0, 0.1388)) for i in range(4)]
+    world.latencies.update({'getObjectPosition': 0.2, 'getObjectOrientation': 0.2})
+
+    start = time.monotonic()
+    poses = asyncio.run(async_controller.poll_robots(robots))
+    elapsed = time.monotonic() - start
+
+    assert set(poses) == set(robots)
+    assert [poses[robot][0][0] for robot in robots] == [0.0, 0.5, 1.0, 1.5]
+    assert elapsed < 1.0  # En serie serían 8 x 0.2 s
+    # Cada hilo del ejecutor usa su propia conexión del pool compartido
+    assert len(controller.pool._entries) >= 3
+
+
+def test_calls_keep_timeouts(world, async_controller):
+    async def run():
+        world.latency = 5.0
+        with pytest.raises(SimTimeoutError):
+            await async_controller.call('getSimulationTime', timeout=0.3)
+        world.latency = 0.0
+        return await async_controller.gather([('getSimulationTime',), ('getObjectPosition', 12345, -1)])
+
+    ok, missing = asyncio.run(run())
+    assert ok == 0.0
+    assert isinstance(missing, Exception)
+
+
+def test_operations_share_controller_state(world, controller, async_controller):
+    specs = [{'size': [0.4, 0.4, 0.1], 'position': [0.5 * i, 1.0, 0.05]} for i in range(3)]
+
+    async def run():
+        handles = await async_controller.create_obstacles(specs)
+        objects = await async_controller.detect_objects()
+        removed = await async_controller.eliminar_cubos()  # Delegado al controlador síncrono
+        return handles, objects, removed
+
+    handles, objects, removed = asyncio.run(run())
+    assert None not in handles
+    assert world.call_counts.get('callScriptFunction', 0) >= 1  # Funciones Lua del sandbox
+    assert set(handles) <= {obj['handle'] for obj in objects}
+    assert removed and controller.created_cubes == set()
+    assert not any(world.isHandle(handle) for handle in handles)
+    assert async_controller.connected is True
+
+
+def test_run_in_qt_delivers_result(async_controller):
+    results = []
+
+    async def run():
+        assert event_loop_running()
+        await run_in_qt(async_controller.call('getSimulationState'), results.append)
+
+    assert not event_loop_running()
+    asyncio.run(run())
+    assert len(results) == 1
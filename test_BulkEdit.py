@@ -0,0 +1,83 @@
+"""Pruebas de BulkEditSession y SceneReconciler contra FakeSim"""
+import types
+
+from MainWindow import MainWindow
+from RectangleDecomposition import ObstacleRectangles
+from SceneReconciler import SceneReconciler
+from constants import EMPTY, GRID_SIZE, OBSTACLE
+
+
+def cube_spec(controller, row, col):
+    """Especificación de un cubo de una celda como los que crea SceneReconciler"""
+    position, size = ObstacleRectangles.to_world((row, col, 1, 1), controller.transform)
+    return {'size': size, 'position': position}
+
+
+def test_session_batches_and_restores_display(world, controller):
+    handle = controller.create_obstacles([cube_spec(controller, 0, 0)])[0]
+    world.call_counts.clear()
+
+    with controller.bulk_edit() as edit:
+        assert world.bool_params[world.boolparam_display_enabled] is False
+        created = [edit.create(cube_spec(controller, 1, col)) for col in range(5)]
+        moved = edit.set_position(handle, [1.0, 1.0, 0.25])
+        assert not any(pending.done for pending in created)
+
+    assert world.bool_params[world.boolparam_display_enabled] is True
+    assert all(pending.ok and world.isHandle(pending.value) for pending in created)
+    assert moved.ok and world.objects[handle]['position'] == [1.0, 1.0, 0.25]
+    assert world.call_counts.get('setObjectPosition', 0) == 0  # Poses en una sola petición iaBatch
+
+
+def test_nested_session_commits_on_outer_exit(world, controller):
+    results = []
+    with controller.bulk_edit():
+        with controller.bulk_edit() as inner:
+            pending = inner.create(cube_spec(controller, 2, 2))
+            inner.on_commit(lambda: results.append(pending.value))
+        assert not pending.done
+        assert results == []
+
+    assert results == [pending.value]
+    assert world.isHandle(pending.value)
+    assert controller.bulk_session is None
+
+
+def test_reconciler_inside_outer_session(world, controller):
+    kept = controller.create_obstacles([cube_spec(controller, 1, 1)])[0]
+    spare = controller.create_obstacles([cube_spec(controller, 5, 5)])[0]
+    desired = {(1, 1), (2, 2), (3, 3)}
+
+    with controller.bulk_edit():
+        mapping = SceneReconciler(controller).sync(desired, {(1, 1): kept, (5, 5): spare})
+
+    # El cubo sobrante se mueve a una celda nueva y el resto se crea
+    assert set(mapping) == desired
+    assert mapping[(1, 1)] == kept
+    assert spare in mapping.values()
+    assert set(mapping.values()) == controller.created_cubes
+
+
+def test_sync_obstacles_inside_load_session(world, controller):
+    grid = [[EMPTY] * GRID_SIZE for _ in range(GRID_SIZE)]
+    for cell in [(1, 1), (2, 2), (3, 3)]:
+        grid[cell[0]][cell[1]] = OBSTACLE
+    window = types.SimpleNamespace(
+        is_connected=True, sim_controller=controller, transform=controller.transform,
+        grid_manager=types.SimpleNamespace(grid=grid), objects={}, robot_handle=None,
+        goal_handle=None, obstacle_rects=ObstacleRectangles(),
+        grid_widget=types.SimpleNamespace(update=lambda: None))
+
+    with controller.bulk_edit():
+        assert MainWindow.sync_obstacles(window)
+        assert window.objects == {}
+
+    assert set(window.objects) == {(1, 1), (2, 2), (3, 3)}
+    assert set(window.objects.values()) == controller.created_cubes
+
+    # Una segunda sincronización no tiene nada que hacer
+    world.call_counts.clear()
+    with controller.bulk_edit():
+        assert MainWindow.sync_obstacles(window)
+    assert set(window.objects.values()) == controller.created_cubes
+    assert 'iaCreateCuboids' not in str(world.call_counts)
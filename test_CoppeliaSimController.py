@@ -0,0 +1,143 @@
+"""Pruebas de CoppeliaSimController contra FakeSim"""
+import math
+import time
+
+from constants import EMPTY, GRID_SIZE
+
+
+def cube_specs(controller, cells, size=(0.4, 0.4, 0.1)):
+    return [{'size': list(size), 'position': list(controller.transform.cell_to_world(row, col)) + [0.05]}
+            for row, col in cells]
+
+
+def templates_in_scene(world):
+    return [h for h, obj in world.objects.items() if obj['alias'] == 'IA_template']
+
+
+def test_template_mode_copies_one_template_per_size(world, controller):
+    handles = controller.create_obstacles(cube_specs(controller, [(0, col) for col in range(8)]),
+                                          mode='template')
+    handles += controller.create_obstacles(cube_specs(controller, [(1, 0)], size=(0.9, 0.4, 0.1)),
+                                           mode='template')
+
+    assert None not in handles
+    assert len(templates_in_scene(world)) == 2
+    assert set(handles) == controller.created_cubes
+    assert not set(controller.cube_templates.values()) & set(controller.object_descriptors)
+    assert all(world.objects[handle]['alias'] == 'Cuboid' for handle in handles)
+
+
+def test_reconnect_does_not_leak_templates(world, controller):
+    controller.create_obstacles(cube_specs(controller, [(0, col) for col in range(8)]), mode='template')
+    for _ in range(3):
+        assert controller.connect()
+        assert templates_in_scene(world) == []
+        controller.create_obstacles(cube_specs(controller, [(2, col) for col in range(8)]), mode='template')
+        assert len(templates_in_scene(world)) == 1
+
+
+def test_snapshot_excludes_templates(world, controller, tmp_path):
+    handles = controller.create_obstacles(cube_specs(controller, [(0, col) for col in range(8)]),
+                                          mode='template')
+    grid = [[EMPTY] * GRID_SIZE for _ in range(GRID_SIZE)]
+    objects = {(0, col): handle for col, handle in enumerate(handles)}
+    path = str(tmp_path / 'scene.ttt')
+
+    assert controller.save_snapshot(path, grid, objects)
+    assert templates_in_scene(world) == []
+
+    # Una plantilla que quedó en la escena (p. ej. de una instantánea antigua) se elimina al restaurar
+    controller.create_obstacles(cube_specs(controller, [(3, col) for col in range(8)]), mode='template')
+    world.saveScene(str(tmp_path / 'old.ttt'))
+    (tmp_path / 'old.ttt.json').write_text((tmp_path / 'scene.ttt.json').read_text())
+
+    for snapshot in (path, str(tmp_path / 'old.ttt')):
+        restored = controller.restore_snapshot(snapshot)
+        assert restored is not None
+        assert templates_in_scene(world) == []
+        assert controller.cube_templates == {}
+        assert set(restored['objects']) == set(objects)
+        assert set(controller.object_descriptors) == controller.created_cubes
+        assert controller.created_cubes == set(restored['objects'].values())
+
+
+def test_plan_grid_path_avoids_obstacles(controller):
+    wall = [(row, 4) for row in range(9)]  # Muro con un hueco en la última fila
+    path = controller.plan_grid_path((0, 0), (0, 9), wall)
+
+    assert path[0] == (0, 0) and path[-1] == (0, 9)
+    assert not set(path) & set(wall)
+    assert (9, 4) in path
+    assert all(max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 for a, b in zip(path, path[1:]))
+    assert controller.plan_grid_path((0, 0), (0, 9), wall + [(9, 4)]) is None
+
+
+def test_path_waypoints_follow_planned_cells(controller):
+    transform = controller.transform
+    start = list(transform.cell_to_world(0, 0)) + [0.1]
+    target = list(transform.cell_to_world(0, 9)) + [0.1]
+    wall = [(row, 4) for row in range(9)]
+
+    waypoints = controller.path_waypoints(start, target, wall)
+    assert waypoints[0] == start[:2] and waypoints[-1] == target[:2]
+    assert len(waypoints) > 10
+    assert list(transform.cell_to_world(9, 4)) in waypoints
+
+    # Fuera de la cuadrícula: línea recta
+    assert controller.path_waypoints([100.0, 100.0], target, wall) == [[100.0, 100.0], target[:2]]
+
+
+def test_navigation_tracks_moving_target(world, controller):
+    body = world.add_robot(position=(0.0, 0.0, 0.1388))
+    target = world.createDummy(0.1)
+    world.setObjectPosition(target, -1, [0.8, 0.0, 0.05])
+    world.startSimulation()
+
+    assert controller.navigate_robot_to_target(body, target)
+    time.sleep(0.5)
+    world.setObjectPosition(target, -1, [0.8, 0.6, 0.05])  # El objetivo se mueve durante el recorrido
+
+    deadline = time.monotonic() + 20.0
+    while controller.navigation_active and time.monotonic() < deadline:
+        time.sleep(0.05)
+    controller.navigation_active = False
+
+    x, y, _ = world.objects[body]['position']
+    assert math.hypot(x - 0.8, y - 0.6) < 0.35
+
+
+def test_snapshot_round_trip(world, controller, tmp_path):
+    transform = controller.transform
+    robot = world.add_robot(position=list(transform.cell_to_world(0, 0)) + [0.1388])
+    goal = world.createDummy(0.1)
+    world.setObjectAlias(goal, "Goal")
+    world.setObjectPosition(goal, -1, list(transform.cell_to_world(9, 9)) + [0.05])
+    chair = world.createPrimitiveShape(world.primitiveshape_cuboid, [0.3, 0.3, 0.5])
+    world.setObjectAlias(chair, "Chair")
+    single, merged = controller.create_obstacles(
+        cube_specs(controller, [(2, 2)]) + [{'size': [0.9, 0.4, 0.1], 'position': [0.0, 0.0, 0.05]}],
+        mode='batch')
+    objects = {(0, 0): robot, (9, 9): goal, (5, 5): chair, (2, 2): single, (4, 4): merged, (4, 5): merged}
+    grid = [[EMPTY] * GRID_SIZE for _ in range(GRID_SIZE)]
+    path = str(tmp_path / 'scene.ttt')
+
+    assert controller.save_snapshot(path, grid, objects, robot_handle=robot, goal_handle=goal)
+    assert world.objects[chair]['alias'] == "Chair"  # Los objetos del usuario no se renombran
+
+    # Cambiar la escena después de guardar
+    controller.eliminar_cubos()
+    world.setObjectPosition(robot, -1, [1.0, 1.0, 0.1388])
+
+    restored = controller.restore_snapshot(path)
+    assert restored is not None
+    objects = restored['objects']
+    assert set(objects) == {(0, 0), (9, 9), (5, 5), (2, 2), (4, 4), (4, 5)}
+    assert world.objects[restored['robot']]['alias'] == "PioneerP3DX"
+    assert world.objects[restored['robot']]['position'][:2] == list(transform.cell_to_world(0, 0))
+    assert restored['goal'] == objects[(9, 9)]
+    assert world.objects[objects[(5, 5)]]['alias'] == "Chair"
+    assert objects[(4, 4)] == objects[(4, 5)]
+    assert restored['merged'] == [([(4, 4), (4, 5)], objects[(4, 4)])]
+    # Solo los cubos de la aplicación vuelven al registro de cubos creados
+    assert controller.created_cubes == {objects[(2, 2)], objects[(4, 4)]}
+    assert controller.object_descriptors[objects[(2, 2)]]['cell'] == (2, 2)
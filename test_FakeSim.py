@@ -0,0 +1,75 @@
+"""
+Pruebas del controlador contra FakeSim (sin CoppeliaSim).
+
+Se ejecutan con 'python -m pytest'; las fixtures 'world' (FakeSim) y 'controller'
+(CoppeliaSimController conectado a él) están en conftest.py.
+"""
+import threading
+import time
+
+import pytest
+
+from CoppeliaSimController import CoppeliaSimController, SimTimeoutError
+from FakeSim import FakeSim, FakeRemoteAPIClient
+
+
+def test_call_timeout(world, controller):
+    world.latency = 5.0
+    start = time.monotonic()
+    with pytest.raises(SimTimeoutError):
+        controller.call('getSimulationTime', timeout=0.3)
+    assert time.monotonic() - start < 2.0
+
+    # El cliente que quedó esperando se descarta y el siguiente responde
+    world.latency = 0.0
+    assert controller.call('getSimulationTime', timeout=1.0) == 0.0
+
+
+@pytest.mark.parametrize("sandbox", [True, False])
+def test_check_handles(world, controller, sandbox):
+    if not sandbox:
+        controller.capabilities['executeScriptString'] = False
+    kept = world.createPrimitiveShape(world.primitiveshape_cuboid, [0.5, 0.5, 0.5])
+    removed = world.createPrimitiveShape(world.primitiveshape_cuboid, [0.5, 0.5, 0.5])
+    world.removeObject(removed)
+
+    alive, dead = controller.check_handles([kept, removed, None])
+    assert alive == {kept}
+    assert dead == {removed}
+    assert controller.check_handles([]) == (set(), set())
+
+
+def test_clear_scene_single_remove(world, controller):
+    floor = world._new_object(world.object_shape_type, "Floor", size=[5, 5, 0.1])
+    floor_box = world._new_object(world.object_shape_type, "box", parent=floor)
+    robot = world.add_robot()
+    for i in range(20):
+        world.createPrimitiveShape(world.primitiveshape_cuboid, [0.5, 0.5, 0.5])
+    world.call_counts.clear()
+
+    assert controller.clear_scene()
+    assert world.call_counts.get('removeObjects') == 1
+    assert 'removeObject' not in world.call_counts
+    assert set(world.objects) == {floor, floor_box}
+    assert robot not in world.objects
+
+
+def test_heartbeat_waits_for_slow_calls(tmp_path):
+    # Servidor de una petición a la vez con un saveScene lento
+    world = FakeSim(serial=True, latencies={'saveScene': 1.0})
+    controller = CoppeliaSimController(client_factory=FakeRemoteAPIClient.factory(world))
+    assert controller.connect()
+    events = []
+    controller.connection_listeners.append(lambda state, message: events.append(state))
+    controller.start_heartbeat(interval=0.05, deadline=0.2)
+    try:
+        saver = threading.Thread(target=controller.call, args=('saveScene', str(tmp_path / 'scene.ttt')))
+        saver.start()
+        saver.join()
+        time.sleep(0.2)
+    finally:
+        controller.stop_heartbeat()
+        controller.disconnect()
+
+    # Sin el plazo ampliado, el latido expiraría en cola y reconectaría a mitad del guardado
+    assert events == []
@@ -0,0 +1,38 @@
+"""Pruebas de la detección de objetos de MainWindow contra FakeSim"""
+import types
+
+from GridManager import GridManager
+from MainWindow import MainWindow
+from RectangleDecomposition import ObstacleRectangles
+from constants import OBSTACLE
+
+
+def make_window(controller):
+    window = types.SimpleNamespace(
+        is_connected=True, sim_controller=controller, transform=controller.transform,
+        grid_manager=GridManager(), objects={}, robot_handle=None, goal_handle=None,
+        robot_position=None, goal_position=None, obstacle_rects=ObstacleRectangles(),
+        grid_widget=types.SimpleNamespace(update=lambda: None, obstacles=[]))
+    for name in ('clean_interface', 'query_scene_index', 'apply_scene_objects'):
+        setattr(window, name, getattr(MainWindow, name).__get__(window))
+    return window
+
+
+def test_detect_marks_thin_obstacles_but_not_scenery(world, controller):
+    floor = world._new_object(world.object_shape_type, "Floor", size=[10.0, 10.0, 0.01])
+    world._new_object(world.object_shape_type, "box", parent=floor, size=[10.0, 10.0, 0.01])
+    decal = world.createPrimitiveShape(world.primitiveshape_cuboid, [1.0, 1.0, 0.001])
+    world.setObjectAlias(decal, "IA_decal_arrow_box")
+
+    # Un muro muy bajo (1 cm) sigue siendo un obstáculo
+    wall = world.createPrimitiveShape(world.primitiveshape_cuboid, [1.4, 0.1, 0.01])
+    x, y = controller.transform.cell_to_world(2, 3)
+    world.setObjectPosition(wall, -1, [x, y, 0.005])
+
+    window = make_window(controller)
+    MainWindow.detect_scene_objects(window)
+
+    obstacles = {(row, col) for row in range(10) for col in range(10)
+                 if window.grid_manager.grid[row][col] == OBSTACLE}
+    assert obstacles == {(2, 2), (2, 3), (2, 4)}
+    assert set(window.objects.values()) == {wall}
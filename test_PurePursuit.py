@@ -0,0 +1,53 @@
+"""Pruebas del seguidor pure-pursuit con un modelo cinemático del robot diferencial"""
+import math
+
+import pytest
+
+from PurePursuit import PurePursuitFollower
+
+
+def drive(follower, x, y, yaw, duration, dt=0.05, goal=None):
+    """Simula el robot durante 'duration' s; 'goal(t)' mueve el objetivo (opcional)"""
+    t = 0.0
+    while t < duration and not follower.is_finished(x, y):
+        if goal is not None:
+            follower.set_goal(goal(t))
+        linear, angular, _ = follower.compute(x, y, yaw)
+        left, right = follower.wheel_velocities(linear, angular)
+        v = (left + right) / 2 * follower.wheel_radius
+        w = (right - left) / follower.wheel_base * follower.wheel_radius
+        x += v * math.cos(yaw) * dt
+        y += v * math.sin(yaw) * dt
+        yaw += w * dt
+        t += dt
+    return x, y, yaw, t
+
+
+@pytest.mark.parametrize("yaw", [0.0, 2.8, math.pi, -math.pi])
+def test_reaches_goal_from_any_heading(yaw):
+    follower = PurePursuitFollower([[0, 0], [2, 0]])
+    x, y, _, t = drive(follower, 0.0, 0.0, yaw, 60.0)
+    assert follower.is_finished(x, y)
+    assert t < 15.0
+
+
+def test_follows_multi_point_path():
+    waypoints = [[0, 0], [1, 0], [1, 1], [2, 1]]
+    follower = PurePursuitFollower(waypoints)
+    x, y, _, _ = drive(follower, 0.0, 0.0, 0.0, 60.0)
+    assert follower.is_finished(x, y)
+    assert len(follower.path) > len(waypoints)
+
+
+def test_set_goal_tracks_moving_goal():
+    follower = PurePursuitFollower([[0, 0], [1, 0], [2, 0]])
+    x, y, yaw, _ = drive(follower, 0.0, 0.0, 0.0, 2.0)
+    progress = follower._index
+
+    follower.set_goal([2.0, 1.0, 0.1])
+    assert list(follower.goal) == [2.0, 1.0]
+    assert list(follower.waypoints[1]) == [1.0, 0.0]  # Los puntos intermedios no cambian
+    assert abs(follower._index - progress) <= 1  # Se conserva el avance
+
+    x, y, _, _ = drive(follower, x, y, yaw, 60.0, goal=lambda t: [2.0, 1.0 + min(t, 2.0) * 0.1])
+    assert math.hypot(x - 2.0, y - 1.2) < follower.goal_tolerance
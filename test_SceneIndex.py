@@ -0,0 +1,62 @@
+"""Pruebas de SceneIndex contra FakeSim, con y sin el script sandbox"""
+import numpy as np
+import pytest
+
+from SceneIndex import SceneIndex
+
+
+def build_scene(world):
+    world.add_robot(position=(1.0, 0.5, 0.1388), yaw=0.3)
+    wall = world.createPrimitiveShape(world.primitiveshape_cuboid, [2.0, 0.1, 0.5])
+    world.setObjectPosition(wall, -1, [-1.0, 2.0, 0.25])
+    world.createDummy()
+    return wall
+
+
+def disable_sandbox(world, controller, how):
+    if how == 'capability':
+        controller.capabilities['executeScriptString'] = False
+    else:
+        def fail(source, script_type):
+            raise Exception("sandbox script not available")
+        world.executeScriptString = fail
+        controller.installed_helpers = set()
+
+
+@pytest.mark.parametrize("how", ['capability', 'install'])
+def test_load_without_sandbox(world, controller, how):
+    wall = build_scene(world)
+    expected = SceneIndex(controller)
+    expected.load()
+
+    disable_sandbox(world, controller, how)
+    world.call_counts.clear()
+    index = SceneIndex(controller)
+    assert index.load() == len(world.objects)
+    assert 'callScriptFunction' not in world.call_counts
+
+    assert index.handles.tolist() == expected.handles.tolist()
+    assert index.aliases == expected.aliases
+    assert index.types.tolist() == expected.types.tolist()
+    assert np.allclose(index.poses, expected.poses)
+    assert np.allclose(index.sizes, expected.sizes)
+    assert index.get(wall)['size'] == [2.0, 0.1, 0.5]
+
+
+def test_refresh_without_sandbox(world, controller):
+    wall = build_scene(world)
+    disable_sandbox(world, controller, 'capability')
+    index = SceneIndex(controller)
+    index.load()
+
+    world.setObjectPosition(wall, -1, [0.0, 0.0, 0.25])
+    cube = world.createPrimitiveShape(world.primitiveshape_cuboid, [0.4, 0.4, 0.4])
+    dummy = max(h for h, obj in world.objects.items() if obj['type'] == world.object_dummy_type)
+    world.removeObject(dummy)
+
+    added, changed, removed = index.refresh()
+    assert added == {cube}
+    assert changed == {wall}
+    assert removed == {dummy}
+    assert index.get(cube)['size'] == [0.4, 0.4, 0.4]
+    assert index.get(wall)['position'] == [0.0, 0.0, 0.25]
@@ -0,0 +1,45 @@
+"""Pruebas de SimPipeline contra FakeSim, con y sin el script sandbox"""
+import pytest
+
+
+@pytest.mark.parametrize("sandbox", [True, False])
+def test_pipeline_results_and_errors(world, controller, sandbox):
+    if not sandbox:
+        controller.capabilities['executeScriptString'] = False
+    cubes = [world.createPrimitiveShape(world.primitiveshape_cuboid, [0.5, 0.5, 0.5]) for _ in range(3)]
+    world.call_counts.clear()
+
+    with controller.pipeline() as batch:
+        moves = [batch.setObjectPosition(cube, -1, [float(i), 1.0, 0.25]) for i, cube in enumerate(cubes)]
+        alias = batch.getObjectAlias(cubes[0], 1)
+        missing = batch.getObjectPosition(987654, -1)
+        assert not alias.done
+
+    assert all(move.ok for move in moves)
+    assert [world.objects[cube]['position'] for cube in cubes] == [[float(i), 1.0, 0.25] for i in range(3)]
+    assert alias.value == '/' + world.objects[cubes[0]]['alias']
+    assert not missing.ok and missing.error
+    with pytest.raises(RuntimeError):
+        missing.value
+    with pytest.raises(RuntimeError):
+        batch.check()
+
+    if sandbox:
+        # Una sola petición iaBatch en lugar de una por llamada
+        assert world.call_counts.get('callScriptFunction') == 1
+        assert 'setObjectPosition' not in world.call_counts
+    else:
+        assert world.call_counts.get('setObjectPosition') == 3
+        assert 'callScriptFunction' not in world.call_counts
+
+
+def test_pipeline_discarded_on_exception(world, controller):
+    cube = world.createPrimitiveShape(world.primitiveshape_cuboid, [0.5, 0.5, 0.5])
+    with pytest.raises(ValueError):
+        with controller.pipeline() as batch:
+            pending = batch.setObjectPosition(cube, -1, [3.0, 3.0, 0.25])
+            raise ValueError("abortado")
+
+    assert not pending.done
+    assert batch.calls == []
+    assert world.objects[cube]['position'] != [3.0, 3.0, 0.25]
@@ -0,0 +1,53 @@
+"""Pruebas de TrajectoryRecorder: columnas por campo, volcado por bloques y carga mapeada"""
+import numpy as np
+
+from TrajectoryRecorder import TRAJECTORY_DTYPE, TrajectoryRecorder, export_trajectory_npz, load_trajectory
+
+
+def record_samples(recorder, count, start=0):
+    for i in range(start, start + count):
+        robot = 15 if i % 2 == 0 else 16
+        recorder.record(robot, x=0.1 * i, y=-0.1 * i, yaw=0.01 * i, left=1.0, right=2.0,
+                        goal_x=1.5, goal_y=-1.5, timestamp=float(i))
+
+
+def test_columns_flush_in_chunks(tmp_path):
+    path = str(tmp_path / 'run')
+    recorder = TrajectoryRecorder(path, chunk_size=4)
+
+    assert set(recorder.columns) == set(TRAJECTORY_DTYPE.names)
+    assert all(len(column) == 4 for column in recorder.columns.values())
+
+    record_samples(recorder, 10)
+    assert recorder.written == 8 and recorder.pending == 2 and len(recorder) == 10
+
+    # Legible durante la grabación, con lo ya volcado
+    data = load_trajectory(path)
+    assert all(isinstance(column, np.memmap) for column in data.values())
+    assert len(data['x']) == 8
+    assert data['time'].tolist() == [float(i) for i in range(8)]
+
+    recorder.close()
+    data = load_trajectory(path)
+    assert len(data['x']) == 10
+    assert np.allclose(data['x'], [0.1 * i for i in range(10)])
+    assert data['robot'].dtype == np.int64
+    assert data['robot'].tolist() == [15, 16] * 5
+
+    # Cerrado: las muestras nuevas se ignoran
+    record_samples(recorder, 3, start=10)
+    assert len(load_trajectory(path)['x']) == 10
+
+
+def test_export_npz_per_robot(tmp_path):
+    path = str(tmp_path / 'run')
+    with TrajectoryRecorder(path, chunk_size=3) as recorder:
+        record_samples(recorder, 7)
+
+    output = tmp_path / 'run.npz'
+    export_trajectory_npz(path, str(output))
+    with np.load(output) as exported:
+        assert exported['robot_15_time'].tolist() == [0.0, 2.0, 4.0, 6.0]
+        assert exported['robot_16_time'].tolist() == [1.0, 3.0, 5.0]
+        assert np.allclose(exported['robot_16_y'], [-0.1, -0.3, -0.5])
+        assert 'robot_15_robot' not in exported